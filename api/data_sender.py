@@ -1,98 +1,157 @@
+import gzip
+import json
+import random
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import requests
-from data.json_manager import JSONManager
-from config.settings import (
-    TRACK_TEMP_FILE,
-    TRACKING_DATA_FILE,
-    CHECK_TRACKING_DATA_FILE,
-)
+from requests.adapters import HTTPAdapter
+from utils.metrics import NullRecorder
 from config.constants import (
     API_URL,
     HEADERS,
     API_RETRY_COUNT,
     API_TIMEOUT,
     API_BATCH_SIZE,
+    API_MAX_IN_FLIGHT,
+    API_GZIP,
+    API_BACKOFF_BASE,
+    API_BACKOFF_MAX,
+    EVENT_FETCH_LIMIT,
+    EVENT_SENDER_MAX_WAIT,
 )
 
 
 class DataSender:
-    def __init__(self):
-        self.api_url = API_URL
+    def __init__(self, event_outbox, api_url=API_URL, metrics=None):
+        self.api_url = api_url
         self.headers = HEADERS
         self.retry_count = API_RETRY_COUNT
         self.timeout = API_TIMEOUT
         self.batch_size = API_BATCH_SIZE
+        self.max_in_flight = API_MAX_IN_FLIGHT
+        self.use_gzip = API_GZIP
+        self.event_outbox = event_outbox
+        self.session = None
+        self.executor = None
+        self.stage_timer = (
+            metrics.recorder("data_sender") if metrics is not None else NullRecorder()
+        )
+
+    def _start_session(self):
+        """Keep-alive session and batch pool, created in the sender process"""
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=self.max_in_flight, max_retries=0
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update(self.headers)
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.max_in_flight, thread_name_prefix="data-sender"
+        )
 
     def send_track_data(self, stop_event):
-        """Send track data to API periodically with retry logic"""
+        """Deliver track events from the outbox as they arrive, with retry logic"""
+        self._start_session()
         while not stop_event.is_set():
-            time.sleep(10)
             try:
-                tracking_data = JSONManager.safe_load_json(TRACK_TEMP_FILE, default=[])
-
-                if not tracking_data:
-                    continue
-
-                # Clear temporary file
-                JSONManager.safe_write_json(TRACK_TEMP_FILE, [])
+                with self.stage_timer.span("api_fetch"):
+                    pending = self.event_outbox.fetch(EVENT_FETCH_LIMIT)
 
-                # Verify data was cleared
-                tracking_data_check = JSONManager.safe_load_json(
-                    TRACK_TEMP_FILE, default=[]
-                )
-                if tracking_data_check:
-                    print(
-                        f"Verification Failed: data.json is NOT empty! Data: {tracking_data_check}"
-                    )
+                if not pending:
+                    # Sleep until a camera process signals new events
+                    self.event_outbox.wait(EVENT_SENDER_MAX_WAIT)
                     continue
 
-                print(
-                    f"Verification Passed: data.json is empty! Sending {len(tracking_data)} records."
-                )
-
-                # Update tracking files
-                all_data = JSONManager.safe_load_json(TRACKING_DATA_FILE, default=[])
-                check_all_data = JSONManager.safe_load_json(
-                    CHECK_TRACKING_DATA_FILE, default=[]
-                )
-
-                all_data.extend(tracking_data)
-                check_all_data.extend(tracking_data)
+                # Events stay in the outbox until their batch is acknowledged
+                sent, failed = self._deliver(pending)
 
-                JSONManager.safe_write_json(TRACKING_DATA_FILE, all_data)
-                JSONManager.safe_write_json(CHECK_TRACKING_DATA_FILE, check_all_data)
-
-                # Send to API with retry logic
-                success = self._send_with_retry(all_data)
-
-                if success:
-                    print("Track Data sent successfully.")
-                    JSONManager.safe_write_json(TRACKING_DATA_FILE, [])
-                else:
-                    print("Failed to send track data after retries.")
+                if sent:
+                    print(f"Track Data sent successfully ({sent} records).")
+                if failed:
+                    print(f"Failed to send {failed} records after retries.")
+                    stop_event.wait(EVENT_SENDER_MAX_WAIT)
 
             except Exception as e:
                 print(f"Error in send_track_data: {e}")
+                stop_event.wait(EVENT_SENDER_MAX_WAIT)
+
+        self.executor.shutdown(wait=True)
+        self.session.close()
+
+    def _deliver(self, pending):
+        """
+        Send outbox rows in API_BATCH_SIZE chunks with a bounded number in flight
+
+        Each batch is acknowledged on its own as soon as it succeeds, so a
+        failure only leaves that batch's rows for the next attempt.
+
+        Returns:
+            Tuple of (records sent, records left for retry)
+        """
+        batches = [
+            pending[start : start + self.batch_size]
+            for start in range(0, len(pending), self.batch_size)
+        ]
+        futures = {
+            self.executor.submit(
+                self._timed_send, [self._payload(event) for _, event in batch]
+            ): batch
+            for batch in batches
+        }
+
+        sent = failed = 0
+        for future in as_completed(futures):
+            batch = futures[future]
+            if future.result():
+                # Ack from the sender loop rather than the pool threads
+                with self.stage_timer.span("api_ack"):
+                    self.event_outbox.ack([row_id for row_id, _ in batch])
+                sent += len(batch)
+            else:
+                failed += len(batch)
+        return sent, failed
+
+    @staticmethod
+    def _payload(event):
+        """Event as posted to the API, without the local eventId"""
+        return {key: value for key, value in event.items() if key != "eventId"}
+
+    def _timed_send(self, data):
+        with self.stage_timer.span("api_post"):
+            return self._send_with_retry(data)
+
+    def _encode(self, data):
+        """JSON body, gzip-compressed when enabled"""
+        body = json.dumps(data).encode()
+        headers = {"Content-Type": "application/json"}
+        if self.use_gzip:
+            body = gzip.compress(body)
+            headers["Content-Encoding"] = "gzip"
+        return body, headers
 
     def _send_with_retry(self, data):
-        """Send data with retry logic"""
+        """Send one batch with retry logic and jittered exponential backoff"""
+        body, headers = self._encode(data)
         for attempt in range(self.retry_count):
             try:
-                response = requests.post(
-                    self.api_url, json=data, headers=self.headers, timeout=self.timeout
+                response = self.session.post(
+                    self.api_url, data=body, headers=headers, timeout=self.timeout
                 )
 
                 if response.status_code == 200:
                     return True
                 else:
                     print(
-                        f"Attempt {attempt + 1} failed: Status {response.status_code}, Response: {response.text}"
+                        f"Attempt {attempt + 1} failed: Status {response.status_code}, Response: {response.text[:200]}"
                     )
 
             except requests.exceptions.RequestException as e:
                 print(f"Attempt {attempt + 1} failed with exception: {e}")
 
             if attempt < self.retry_count - 1:
-                time.sleep(2**attempt)  # Exponential backoff
+                # Full jitter keeps concurrent batches from retrying in lockstep
+                backoff = min(API_BACKOFF_MAX, API_BACKOFF_BASE * 2**attempt)
+                time.sleep(random.uniform(0, backoff))
 
         return False
@@ -0,0 +1,94 @@
+"""
+Recall@1 and throughput of the IVF index against brute-force search
+
+Usage:
+    python -m benchmarks.bench_ann --sizes 10000 50000 100000 --nprobe 4 8 16 32
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.common import (
+    measure,
+    noisy_queries,
+    print_table,
+    synthetic_embeddings,
+    write_results,
+)
+from core.ann_index import IVFIndex
+from core.face_matcher import FaceMatcher
+
+
+def run(sizes, nprobes, n_queries, dim, batch_size):
+    results = []
+    for size in sizes:
+        gallery = synthetic_embeddings(size, dim)
+        queries = noisy_queries(gallery, n_queries)
+        user_ids = [str(i) for i in range(size)]
+
+        flat = FaceMatcher(backend="numpy", index="flat")
+        flat.set_gallery(user_ids, gallery)
+        truth, _ = flat.search(queries, k=1)
+
+        def run_flat():
+            for start in range(0, n_queries, batch_size):
+                flat.search(queries[start : start + batch_size], k=1)
+
+        flat_seconds = measure(run_flat)
+        results.append(
+            {
+                "gallery": size,
+                "index": "flat",
+                "nprobe": "-",
+                "recall@1": 1.0,
+                "qps": n_queries / flat_seconds,
+                "build_s": 0.0,
+            }
+        )
+
+        start = time.perf_counter()
+        index = IVFIndex().build(flat.gallery)
+        build_seconds = time.perf_counter() - start
+
+        for nprobe in nprobes:
+            found, _ = index.search(queries, k=1, nprobe=nprobe)
+
+            def run_ivf():
+                for start in range(0, n_queries, batch_size):
+                    index.search(
+                        queries[start : start + batch_size], k=1, nprobe=nprobe
+                    )
+
+            seconds = measure(run_ivf)
+            results.append(
+                {
+                    "gallery": size,
+                    "index": f"ivf{len(index.centroids)}",
+                    "nprobe": nprobe,
+                    "recall@1": float(np.mean(found[:, 0] == truth[:, 0])),
+                    "qps": n_queries / seconds,
+                    "build_s": build_seconds,
+                }
+            )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 50000, 100000])
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--batch-size", type=int, default=10)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.nprobe, args.queries, args.dim, args.batch_size)
+    print_table(results, ["gallery", "index", "nprobe", "recall@1", "qps", "build_s"])
+    print(f"Results written to {write_results('ann', results, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Track event throughput as the day's volume grows: event log vs JSON rewrite
+
+Usage:
+    python -m benchmarks.bench_event_log --events 100000 --window 10000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime
+
+from benchmarks.common import print_table, write_results
+from data.event_log import EventLog, EventLogReader
+from data.json_manager import JSONManager
+
+
+def make_event(i):
+    now = datetime.now()
+    return {
+        "userPin": f"{i % 300:05d}",
+        "date": now.strftime("%Y-%m-%d"),
+        "time": now.strftime("%H:%M:%S"),
+        "camIP": f"172.14.0.{100 + i % 12}",
+        "region": str(i % 8),
+        "seat": str(i % 200),
+    }
+
+
+def legacy_mark(directory, event):
+    """The previous TrackManager: rewrite three JSON files per event"""
+    for name in (f"{event['userPin']}.json", "data.json", "check_data.json"):
+        path = os.path.join(directory, name)
+        data = JSONManager.safe_load_json(path, default=[])
+        data.append(event)
+        JSONManager.safe_write_json(path, data)
+
+
+def run_windows(label, total, window, mark):
+    results = []
+    for start in range(0, total, window):
+        begin = time.perf_counter()
+        for i in range(start, start + window):
+            mark(i)
+        seconds = time.perf_counter() - begin
+        results.append(
+            {
+                "writer": label,
+                "events_so_far": start + window,
+                "events_per_s": window / seconds,
+            }
+        )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--events", type=int, default=100000)
+    parser.add_argument("--window", type=int, default=10000)
+    parser.add_argument("--legacy-events", type=int, default=3000)
+    parser.add_argument("--legacy-window", type=int, default=500)
+    parser.add_argument("--fsync", action="store_true")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        log = EventLog(directory, fsync=args.fsync)
+        results = run_windows(
+            "event_log",
+            args.events,
+            args.window,
+            lambda i: log.append(make_event(i)),
+        )
+        log.close()
+        logged = len(EventLogReader(directory).read_new()[0])
+        print(f"Event log holds {logged} of {args.events} events")
+
+        legacy_dir = os.path.join(directory, "legacy")
+        results += run_windows(
+            "json_rewrite",
+            args.legacy_events,
+            args.legacy_window,
+            lambda i: legacy_mark(legacy_dir, make_event(i)),
+        )
+
+    print_table(results, ["writer", "events_so_far", "events_per_s"])
+    print(f"Results written to {write_results('event_log', results, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
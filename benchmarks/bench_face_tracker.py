@@ -0,0 +1,126 @@
+"""
+Embedding calls with and without the face tracker
+
+Runs detection on every processed frame of a recorded clip and counts how
+many faces the tracker sends to recognition compared with embedding every
+detected face, as the pipeline did before tracking.
+
+Usage:
+    python -m benchmarks.bench_face_tracker --video office.mp4
+    python -m benchmarks.bench_face_tracker   # simulated office, no models
+"""
+
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from benchmarks.common import print_table, write_results
+from config.constants import SKIP_FRAMES_WORKING
+from core.face_tracker import FaceTracker
+
+
+class SyntheticFace(dict):
+    """Minimal stand-in for insightface's Face (attribute access to keys)"""
+
+    __getattr__ = dict.get
+
+
+def synthetic_detections(frames, people=12, walkers=3, fps=5.0, seed=0):
+    """
+    Seated people with detector jitter and dropouts plus people walking by
+
+    Yields:
+        Tuple of (timestamp, detected faces)
+    """
+    rng = np.random.default_rng(seed)
+    seats = rng.uniform([50, 50], [1800, 950], size=(people, 2))
+    for index in range(frames):
+        faces = []
+        for x, y in seats:
+            if rng.random() < 0.05:
+                continue  # missed detection (turned away, occluded)
+            jitter = rng.normal(0, 3, size=4)
+            score = 0.45 if rng.random() < 0.1 else 0.8
+            bbox = np.array([x, y, x + 80, y + 100]) + jitter
+            faces.append(SyntheticFace(bbox=bbox, det_score=score))
+        for walker in range(walkers):
+            # Each walker crosses the frame in 200 frames, then a new one enters
+            progress = (index + walker * 70) % 200
+            x = progress * 9.0
+            y = 300 + walker * 200
+            bbox = np.array([x, y, x + 70, y + 90])
+            faces.append(SyntheticFace(bbox=bbox, det_score=0.75))
+        yield index / fps, faces
+
+
+def video_detections(path, skip_frames):
+    """Detect faces on every (skip_frames + 1)-th frame of a video"""
+    from core.face_analyzer import FaceAnalyzer
+
+    face_analyzer = FaceAnalyzer()
+    capture = cv2.VideoCapture(path)
+    fps = capture.get(cv2.CAP_PROP_FPS) or 25.0
+    index = 0
+    while True:
+        ret, frame = capture.read()
+        if not ret:
+            break
+        if index % (skip_frames + 1) == 0:
+            yield index / fps, face_analyzer.detect(frame)
+        index += 1
+    capture.release()
+
+
+def run(detections):
+    face_tracker = FaceTracker()
+    frames = detected = embedded = 0
+    track_ids = set()
+    start = time.perf_counter()
+    for timestamp, faces in detections:
+        tracks = face_tracker.update(faces)
+        for track in tracks:
+            track_ids.add(track.track_id)
+            if face_tracker.needs_recognition(track, timestamp):
+                # Unknown/low-confidence tracks would be retried; treat every
+                # recognized track as a confident match
+                face_tracker.set_identity(track, "user", 0.9, timestamp)
+                embedded += 1
+        frames += 1
+        detected += len(faces)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "frames": frames,
+        "faces_detected": detected,
+        "embeddings_before": detected,
+        "embeddings_tracked": embedded,
+        "reduction": 1 - embedded / detected if detected else 0.0,
+        "tracks": len(track_ids),
+        "tracker_ms_per_frame": elapsed / max(frames, 1) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--video", default=None, help="recorded camera clip")
+    parser.add_argument("--skip-frames", type=int, default=SKIP_FRAMES_WORKING)
+    parser.add_argument("--frames", type=int, default=3000)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    if args.video:
+        source = args.video
+        detections = video_detections(args.video, args.skip_frames)
+    else:
+        source = "synthetic"
+        detections = synthetic_detections(args.frames)
+
+    result = {"source": source, **run(detections)}
+    print_table([result], list(result.keys()))
+    print(f"Results written to {write_results('face_tracker', [result], args.output)}")
+
+
+if __name__ == "__main__":
+    main()
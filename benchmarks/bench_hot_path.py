@@ -0,0 +1,316 @@
+"""
+Micro-benchmarks of the per-frame and per-event hot path (no GPU or models)
+
+Sweeps gallery size, faces per frame, region count and events per day over
+synthetic embeddings, regions and events, and measures the cost of one
+recorded stage span. Pass --baseline with the results
+of an earlier run to print the relative change of every measurement.
+
+Usage:
+    python -m benchmarks.bench_hot_path
+    python -m benchmarks.bench_hot_path --quick --only matcher,regions
+    python -m benchmarks.bench_hot_path --baseline old_hot_path.json
+"""
+
+import argparse
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from benchmarks.bench_event_log import make_event
+from benchmarks.bench_region_lookup import synthetic_regions
+from benchmarks.common import (
+    measure,
+    noisy_queries,
+    print_table,
+    synthetic_embeddings,
+    write_results,
+)
+from core.face_matcher import FaceMatcher
+from core.recognition_cooldown import RecognitionCooldown
+from core.region_detector import RegionDetector
+from data.event_log import EventLog, EventLogReader
+from data.event_outbox import EventOutbox
+from data.json_manager import JSONManager
+from data.track_manager import TrackManager
+from utils.image_utils import ImageUtils
+from utils.metrics import NullRecorder, StageMetrics
+
+WIDTH, HEIGHT = 1920, 1080
+
+
+def face_boxes(faces, seed=0):
+    """Random face boxes of plausible size inside a 1080p frame"""
+    rng = np.random.default_rng(seed)
+    xy = rng.uniform([0, 0], [WIDTH - 120, HEIGHT - 150], (faces, 2))
+    size = rng.uniform(40, 120, (faces, 1))
+    return np.hstack([xy, xy + size * [1.0, 1.25]]).astype(np.float32)
+
+
+def row(component, operation, seconds, ops, **params):
+    return {
+        "component": component,
+        "operation": operation,
+        **params,
+        "us_per_op": seconds / ops * 1e6,
+    }
+
+
+def bench_matcher(gallery_sizes, face_counts):
+    results = []
+    for size in gallery_sizes:
+        gallery = synthetic_embeddings(size)
+        face_matcher = FaceMatcher(backend="numpy")
+        face_matcher.set_gallery([str(i) for i in range(size)], gallery)
+        for faces in face_counts:
+            queries = noisy_queries(gallery, faces)
+
+            def per_face():
+                for embedding in queries:
+                    face_matcher.match(embedding)
+
+            params = dict(gallery=size, faces=faces)
+            results.append(
+                row("matcher", "match_per_face", measure(per_face), faces, **params)
+            )
+            results.append(
+                row(
+                    "matcher",
+                    "match_batch",
+                    measure(lambda: face_matcher.match_batch(queries)),
+                    faces,
+                    **params,
+                )
+            )
+    return results
+
+
+def bench_regions(seat_counts, face_counts):
+    results = []
+    for seats in seat_counts:
+        block_regions, seat_regions = synthetic_regions(seats, max(1, seats // 16))
+        region_detector = RegionDetector(draw=False)
+        region_detector.update_regions(block_regions, seat_regions, WIDTH, HEIGHT)
+        frame = np.zeros((HEIGHT, WIDTH, 3), dtype=np.uint8)
+        for faces in face_counts:
+            centers = [
+                ImageUtils.get_face_center(box.astype(int)) for box in face_boxes(faces)
+            ]
+
+            def per_face():
+                for center in centers:
+                    region_detector.check_block_region(frame, center)
+                    region_detector.check_seat_region(frame, center)
+
+            params = dict(seats=seats, faces=faces)
+            results.append(
+                row("regions", "check_per_face", measure(per_face), faces, **params)
+            )
+            results.append(
+                row(
+                    "regions",
+                    "lookup_regions",
+                    measure(lambda: region_detector.lookup_regions(centers)),
+                    faces,
+                    **params,
+                )
+            )
+    return results
+
+
+def bench_image_utils(face_counts):
+    results = []
+    frame = np.zeros((HEIGHT, WIDTH, 3), dtype=np.uint8)
+    for faces in face_counts:
+        boxes = face_boxes(faces)
+
+        def per_face():
+            for bbox in boxes:
+                box = ImageUtils.get_coordinates(WIDTH, HEIGHT, bbox)
+                ImageUtils.get_face_center(box)
+                ImageUtils.add_padding(frame, WIDTH, HEIGHT, box)
+
+        results.append(
+            row(
+                "image_utils",
+                "coordinates_center_padding",
+                measure(per_face),
+                faces,
+                faces=faces,
+            )
+        )
+    return results
+
+
+def bench_events(events_per_day):
+    results = []
+    for events in events_per_day:
+        with tempfile.TemporaryDirectory() as directory:
+            event_log = EventLog(directory, fsync=False)
+            for i in range(events):
+                event_log.append(make_event(i))
+            event_log.flush()
+
+            reader = EventLogReader(directory)
+            date = make_event(0)["date"]
+            results.append(
+                row(
+                    "event_log",
+                    "day_view",
+                    measure(lambda: reader.day_view(date), min_runs=1),
+                    1,
+                    events_per_day=events,
+                )
+            )
+
+            path = os.path.join(directory, "day.json")
+            day = [make_event(i) for i in range(events)]
+
+            def round_trip():
+                JSONManager.safe_write_json(path, day)
+                JSONManager.safe_load_json(path)
+
+            results.append(
+                row(
+                    "json_manager",
+                    "write_load_round_trip",
+                    measure(round_trip, min_runs=1),
+                    1,
+                    events_per_day=events,
+                )
+            )
+
+            # Last: marking appends to the day measured above
+            outbox = EventOutbox(os.path.join(directory, "outbox.sqlite3"))
+            track_manager = TrackManager(outbox, event_log)
+            counter = iter(range(events, 10**9))
+
+            def mark():
+                i = next(counter)
+                track_manager.mark_track_data(
+                    f"{i % 300:05d}", "172.14.0.112", str(i % 8), str(i % 200)
+                )
+
+            results.append(
+                row(
+                    "track_manager",
+                    "mark_track_data",
+                    measure(mark),
+                    1,
+                    events_per_day=events,
+                )
+            )
+    return results
+
+
+def bench_cooldown(face_counts):
+    results = []
+    cooldown = RecognitionCooldown()
+    for faces in face_counts:
+        identities = [f"{i:05d}" for i in range(faces)]
+
+        def check():
+            for identity in identities:
+                cooldown.should_fire(identity, "172.14.0.112", "1")
+
+        results.append(
+            row("cooldown", "should_fire", measure(check), faces, faces=faces)
+        )
+    return results
+
+
+def bench_metrics():
+    metrics = StageMetrics(["camera", "data_sender"])
+    results = []
+    for name, recorder in (
+        ("stage_recorder", metrics.recorder("camera")),
+        ("null_recorder", NullRecorder()),
+    ):
+
+        def span():
+            with recorder.span("match"):
+                pass
+
+        results.append(
+            row(
+                "metrics",
+                f"{name}_observe",
+                measure(lambda: recorder.observe("match", 0.004)),
+                1,
+            )
+        )
+        results.append(row("metrics", f"{name}_span", measure(span), 1))
+    results.append(row("metrics", "render", measure(metrics.render), 1))
+    return results
+
+
+def compare(results, baseline_path):
+    """Add the relative change against a previous run's matching rows"""
+    with open(baseline_path) as file:
+        baseline = json.load(file)["results"]
+
+    def key(entry):
+        return tuple(
+            sorted((k, v) for k, v in entry.items() if k not in ("us_per_op", "change"))
+        )
+
+    previous = {key(entry): entry["us_per_op"] for entry in baseline}
+    for entry in results:
+        before = previous.get(key(entry))
+        entry["change"] = f"{entry['us_per_op'] / before - 1:+.1%}" if before else "new"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--only",
+        default="matcher,regions,image_utils,events,cooldown,metrics",
+        help="comma-separated components to run",
+    )
+    parser.add_argument("--gallery-sizes", type=int, nargs="+", default=None)
+    parser.add_argument("--faces", type=int, nargs="+", default=None)
+    parser.add_argument("--seats", type=int, nargs="+", default=None)
+    parser.add_argument("--events-per-day", type=int, nargs="+", default=None)
+    parser.add_argument("--quick", action="store_true", help="small sweeps")
+    parser.add_argument("--baseline", default=None, help="earlier results JSON")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    gallery_sizes = args.gallery_sizes or (
+        [1000] if args.quick else [1000, 10000, 50000]
+    )
+    face_counts = args.faces or ([1, 8] if args.quick else [1, 8, 32])
+    seat_counts = args.seats or ([50] if args.quick else [10, 50, 200])
+    events_per_day = args.events_per_day or (
+        [1000] if args.quick else [1000, 10000, 50000]
+    )
+    components = args.only.split(",")
+
+    results = []
+    if "matcher" in components:
+        results += bench_matcher(gallery_sizes, face_counts)
+    if "regions" in components:
+        results += bench_regions(seat_counts, face_counts)
+    if "image_utils" in components:
+        results += bench_image_utils(face_counts)
+    if "events" in components:
+        results += bench_events(events_per_day)
+    if "cooldown" in components:
+        results += bench_cooldown(face_counts)
+    if "metrics" in components:
+        results += bench_metrics()
+
+    if args.baseline:
+        compare(results, args.baseline)
+
+    for component in dict.fromkeys(entry["component"] for entry in results):
+        rows = [entry for entry in results if entry["component"] == component]
+        print_table(rows, list(rows[0].keys()))
+        print()
+    print(f"Results written to {write_results('hot_path', results, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Throughput and memory vs camera count: one model per camera vs shared inference server
+
+Usage:
+    python -m benchmarks.bench_inference_server --cameras 1 2 4 8 12 --image office.jpg
+    python -m benchmarks.bench_inference_server --synthetic   # IPC overhead only
+"""
+
+import argparse
+import time
+from multiprocessing import Event, Process, Queue
+
+import cv2
+import numpy as np
+
+from benchmarks.common import print_table, process_rss_mb, write_results
+from core.inference_server import InferenceServer
+
+
+class SyntheticAnalyzer:
+    """Model-free stand-in with a fixed detect cost and a per-call embed cost"""
+
+    def __init__(self, detect_ms=20.0, embed_call_ms=5.0, embed_face_ms=1.0):
+        self.detect_ms = detect_ms
+        self.embed_call_ms = embed_call_ms
+        self.embed_face_ms = embed_face_ms
+
+    def detect(self, frame, rois=None):
+        time.sleep(self.detect_ms / 1000)
+        return [{"bbox": np.array([10, 10, 60, 60], dtype=np.float32)}] * 3
+
+    def crop(self, frame, faces):
+        return [None] * len(faces)
+
+    def embed_crops(self, crops, faces):
+        time.sleep((self.embed_call_ms + len(crops) * self.embed_face_ms) / 1000)
+
+    def embed_batch(self, items):
+        faces = [face for _, frame_faces in items for face in frame_faces]
+        self.embed_crops(self.crop(None, faces), faces)
+
+    def get_faces(self, frame, rois=None):
+        faces = self.detect(frame, rois)
+        self.embed_batch([(frame, faces)])
+        return faces
+
+
+def make_analyzer(synthetic):
+    if synthetic:
+        return SyntheticAnalyzer()
+    from core.face_analyzer import FaceAnalyzer
+
+    return FaceAnalyzer()
+
+
+def camera_loop(analyzer, analyzer_args, frame, duration, start_event, results):
+    if analyzer is None:
+        analyzer = make_analyzer(*analyzer_args)
+    analyzer.get_faces(frame)  # warm-up
+    start_event.wait()
+    frames, deadline = 0, time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        analyzer.get_faces(frame)
+        frames += 1
+    results.put((frames, process_rss_mb()))
+
+
+def server_worker(server, stop_event, synthetic, results):
+    def factory():
+        return make_analyzer(synthetic)
+
+    server.serve(stop_event, factory)
+    results.put((0, process_rss_mb()))
+
+
+def run_layout(layout, cameras, frame, duration, synthetic, workers):
+    results, start_event, stop_event = Queue(), Event(), Event()
+    server, server_processes = None, []
+    if layout == "server":
+        server = InferenceServer(range(cameras))
+        server_processes = [
+            Process(target=server_worker, args=(server, stop_event, synthetic, Queue()))
+            for _ in range(workers)
+        ]
+        for process in server_processes:
+            process.start()
+
+    camera_processes = [
+        Process(
+            target=camera_loop,
+            args=(
+                server.client(i) if server else None,
+                (synthetic,),
+                frame,
+                duration,
+                start_event,
+                results,
+            ),
+        )
+        for i in range(cameras)
+    ]
+    for process in camera_processes:
+        process.start()
+
+    time.sleep(2 if synthetic else 20)  # let every process load its models
+    server_rss = sum(process_rss_mb(p.pid) for p in server_processes)
+    start_event.set()
+    outcomes = [results.get() for _ in camera_processes]
+    for process in camera_processes:
+        process.join()
+    stop_event.set()
+    for process in server_processes:
+        process.join()
+    if server:
+        server.pool.close(unlink=True)
+
+    total_frames = sum(frames for frames, _ in outcomes)
+    return {
+        "layout": layout,
+        "cameras": cameras,
+        "fps_total": total_frames / duration,
+        "fps_per_camera": total_frames / duration / cameras,
+        "rss_total_mb": sum(rss for _, rss in outcomes) + server_rss,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--cameras", type=int, nargs="+", default=[1, 2, 4, 8, 12])
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--image", default=None, help="frame with faces to analyze")
+    parser.add_argument("--synthetic", action="store_true", help="no models")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    frame = cv2.imread(args.image) if args.image else None
+    if frame is None:
+        frame = np.random.default_rng(0).integers(0, 255, (720, 1280, 3), np.uint8)
+
+    results = []
+    for cameras in args.cameras:
+        for layout in ("per_camera", "server"):
+            results.append(
+                run_layout(
+                    layout, cameras, frame, args.duration, args.synthetic, args.workers
+                )
+            )
+            print_table(results[-1:], list(results[-1].keys()))
+
+    print_table(
+        results, ["layout", "cameras", "fps_total", "fps_per_camera", "rss_total_mb"]
+    )
+    print(
+        f"Results written to {write_results('inference_server', results, args.output)}"
+    )
+
+
+if __name__ == "__main__":
+    main()
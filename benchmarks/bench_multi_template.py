@@ -0,0 +1,94 @@
+"""
+Multi-template matching (GEMM + segment max) against one template per identity
+
+Both galleries hold the same total number of templates: the baseline has one
+template per identity, the multi-template gallery groups them into identities
+of 1 to 2 * --templates - 1 templates (--templates on average). Every face of
+a batch is scored with one GEMM; the multi-template gallery then reduces each
+identity's segment to its best template.
+
+Usage:
+    python -m benchmarks.bench_multi_template --sizes 10000 50000 --templates 4
+    python -m benchmarks.bench_multi_template --backend cupy --faces 1 8 32
+"""
+
+import argparse
+
+import numpy as np
+
+from benchmarks.common import (
+    measure,
+    noisy_queries,
+    print_table,
+    synthetic_embeddings,
+    write_results,
+)
+from core.face_matcher import FaceMatcher
+
+
+def template_row_ids(total, templates, seed=0):
+    """Row ids of a gallery of `total` rows, `templates` per identity on average"""
+    rng = np.random.default_rng(seed)
+    row_ids = []
+    identity = 0
+    while len(row_ids) < total:
+        count = int(rng.integers(1, 2 * templates))
+        row_ids.extend([str(identity)] * min(count, total - len(row_ids)))
+        identity += 1
+    return row_ids
+
+
+def run(sizes, templates, face_counts, backend, k):
+    results = []
+    for size in sizes:
+        gallery = synthetic_embeddings(size)
+        galleries = {
+            "one_template": [str(i) for i in range(size)],
+            "multi_template": template_row_ids(size, templates),
+        }
+        for layout, row_ids in galleries.items():
+            face_matcher = FaceMatcher(backend=backend, index="flat")
+            face_matcher.set_gallery(row_ids, gallery)
+            for faces in face_counts:
+                queries = noisy_queries(gallery, faces)
+                seconds = measure(lambda: face_matcher.match_batch(queries, k=k))
+                results.append(
+                    {
+                        "layout": layout,
+                        "templates": size,
+                        "identities": len(face_matcher.user_ids),
+                        "faces": faces,
+                        "ms_per_batch": seconds * 1000,
+                        "us_per_face": seconds * 1e6 / faces,
+                    }
+                )
+
+    # Relative cost of the segment reduction at equal template count
+    baseline = {
+        (entry["templates"], entry["faces"]): entry["ms_per_batch"]
+        for entry in results
+        if entry["layout"] == "one_template"
+    }
+    for entry in results:
+        before = baseline[(entry["templates"], entry["faces"])]
+        entry["vs_one_template"] = f"{entry['ms_per_batch'] / before - 1:+.1%}"
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 50000])
+    parser.add_argument("--templates", type=int, default=4, help="average per id")
+    parser.add_argument("--faces", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--backend", default="numpy", choices=["numpy", "cupy"])
+    parser.add_argument("--k", type=int, default=1)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.templates, args.faces, args.backend, args.k)
+    print_table(results, list(results[0].keys()))
+    print(f"Results written to {write_results('multi_template', results, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
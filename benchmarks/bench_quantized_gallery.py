@@ -0,0 +1,109 @@
+"""
+Quantized (float16 / int8) gallery scan against the float32 gallery
+
+For every precision the benchmark reports the memory of the scanned gallery,
+the match throughput for batches of faces and the top-1 agreement with the
+float32 search, both straight from the low-precision scan and after the
+exact float32 re-rank of the best --rerank candidates.
+
+Usage:
+    python -m benchmarks.bench_quantized_gallery --sizes 100000 --faces 1 8 32
+    python -m benchmarks.bench_quantized_gallery --backend cupy --rerank 32
+"""
+
+import argparse
+
+import numpy as np
+
+from benchmarks.common import (
+    measure,
+    noisy_queries,
+    print_table,
+    synthetic_embeddings,
+    write_results,
+)
+from core.face_matcher import FaceMatcher
+from data.gallery_store import GalleryStore
+
+
+def agreement(face_matcher, queries, reference):
+    """Fraction of queries whose top-1 row matches the float32 search"""
+    indices, _ = face_matcher.search(queries, k=1)
+    return float(np.mean(indices[:, 0] == reference))
+
+
+def run(sizes, face_counts, backend, rerank, agreement_faces):
+    results = []
+    for size in sizes:
+        gallery = synthetic_embeddings(size)
+        user_ids = [str(i) for i in range(size)]
+        checks = noisy_queries(gallery, agreement_faces)
+        reference = None
+        for precision in FaceMatcher.PRECISIONS:
+            face_matcher = FaceMatcher(
+                backend=backend, index="flat", precision=precision, rerank=rerank
+            )
+            # Quantize once up front, as the gallery loader does
+            normalized = FaceMatcher.normalize_rows(np, gallery)
+            quantized = (
+                None
+                if precision == "float32"
+                else GalleryStore.quantize(normalized, precision)
+            )
+            face_matcher.set_gallery(
+                user_ids, normalized, normalized=True, quantized=quantized
+            )
+            scan_bytes = face_matcher.gallery.nbytes + (
+                0 if face_matcher.scales is None else face_matcher.scales.nbytes
+            )
+
+            if reference is None:
+                reference = face_matcher.search(checks, k=1)[0][:, 0]
+            top1_scan = top1_rerank = 1.0
+            if precision != "float32":
+                top1_rerank = agreement(face_matcher, checks, reference)
+                face_matcher.rerank = 0
+                top1_scan = agreement(face_matcher, checks, reference)
+                face_matcher.rerank = rerank
+
+            for faces in face_counts:
+                queries = noisy_queries(gallery, faces)
+                seconds = measure(lambda: face_matcher.match_batch(queries))
+                results.append(
+                    {
+                        "precision": precision,
+                        "gallery": size,
+                        "scan_mb": scan_bytes / 2**20,
+                        "faces": faces,
+                        "ms_per_batch": seconds * 1000,
+                        "faces_per_s": faces / seconds,
+                        "top1_scan": top1_scan,
+                        "top1_rerank": top1_rerank,
+                    }
+                )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100000])
+    parser.add_argument("--faces", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--backend", default="numpy", choices=["numpy", "cupy"])
+    parser.add_argument("--rerank", type=int, default=16)
+    parser.add_argument(
+        "--agreement-faces", type=int, default=1000, help="queries for top-1"
+    )
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    results = run(
+        args.sizes, args.faces, args.backend, args.rerank, args.agreement_faces
+    )
+    print_table(results, list(results[0].keys()))
+    print(
+        f"Results written to {write_results('quantized_gallery', results, args.output)}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Region lookup cost: per-face polygon/rectangle loops vs precomputed label maps
+
+Usage:
+    python -m benchmarks.bench_region_lookup --seats 200 --blocks 12 --faces 30
+"""
+
+import argparse
+
+import cv2
+import numpy as np
+
+from benchmarks.common import measure, print_table, write_results
+from core.region_detector import RegionDetector
+from utils.geometry_utils import is_point_in_polygon
+
+
+def synthetic_regions(seats, blocks, seed=0):
+    """Seat rectangles on a grid and quadrilateral blocks, in relative units"""
+    rng = np.random.default_rng(seed)
+    columns = int(np.ceil(np.sqrt(seats)))
+    seat_regions = []
+    for i in range(seats):
+        row, col = divmod(i, columns)
+        x, y = col / columns, row / columns
+        seat_regions.append({f"S{i}": [x, y, 0.8 / columns, 0.8 / columns]})
+
+    block_regions = []
+    for i in range(blocks):
+        x, y = rng.uniform(0, 0.8, 2)
+        w, h = rng.uniform(0.1, 0.2, 2)
+        block_regions.append(
+            {f"B{i}": [[x, y], [x + w, y], [x + w, y + h], [x, y + h]]}
+        )
+    return block_regions, seat_regions
+
+
+def legacy_lookup(frame, block_points, seat_points, center, draw=True):
+    """Per-face checks as done before label maps, optionally with their drawing"""
+    block_no = None
+    for number, points in block_points:
+        if draw:
+            cv2.polylines(
+                frame, [points], isClosed=True, color=(0, 255, 0), thickness=2
+            )
+        if is_point_in_polygon(center, points):
+            block_no = number
+            break
+
+    seat_no = None
+    xcenter, ycenter = center
+    for number, x_min, y_min, x_max, y_max in seat_points:
+        if draw:
+            cv2.rectangle(frame, (x_min, y_min), (x_max, y_max), (255, 0, 0), 2)
+            cv2.putText(
+                frame,
+                number,
+                (x_min, y_min - 10),
+                cv2.FONT_HERSHEY_SIMPLEX,
+                0.6,
+                (255, 0, 0),
+                2,
+                cv2.LINE_AA,
+            )
+        if x_min < xcenter < x_max and y_min < ycenter < y_max:
+            seat_no = number
+            break
+    return block_no, seat_no
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seats", type=int, default=200)
+    parser.add_argument("--blocks", type=int, default=12)
+    parser.add_argument("--faces", type=int, default=30)
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    block_regions, seat_regions = synthetic_regions(args.seats, args.blocks)
+    frame = np.zeros((args.height, args.width, 3), dtype=np.uint8)
+    rng = np.random.default_rng(1)
+    centers = np.column_stack(
+        [
+            rng.integers(0, args.width, args.faces),
+            rng.integers(0, args.height, args.faces),
+        ]
+    )
+    center_tuples = [(int(x), int(y)) for x, y in centers]
+
+    region_detector = RegionDetector(draw=False)
+    build_seconds = measure(
+        lambda: (
+            setattr(region_detector, "last_frame_width", 0),
+            region_detector.update_regions(
+                block_regions, seat_regions, args.width, args.height
+            ),
+        )
+    )
+
+    def run_legacy(draw=True):
+        for center in center_tuples:
+            legacy_lookup(
+                frame,
+                region_detector.block_points,
+                region_detector.seat_points,
+                center,
+                draw,
+            )
+
+    def run_batch():
+        region_detector.lookup_regions(centers)
+
+    # Label maps below full scale can differ within a map pixel of an edge
+    blocks, seats = region_detector.lookup_regions(centers)
+    exact = [
+        legacy_lookup(
+            frame, region_detector.block_points, region_detector.seat_points, c
+        )
+        for c in center_tuples
+    ]
+    agreement = np.mean([(b, s) == e for b, s, e in zip(blocks, seats, exact)])
+
+    results = []
+    for method, fn in (
+        ("legacy_loop", run_legacy),
+        ("legacy_loop_no_draw", lambda: run_legacy(draw=False)),
+        ("label_map", run_batch),
+    ):
+        seconds = measure(fn)
+        results.append(
+            {
+                "method": method,
+                "seats": args.seats,
+                "blocks": args.blocks,
+                "faces": args.faces,
+                "us_per_frame": seconds * 1e6,
+                "us_per_face": seconds * 1e6 / args.faces,
+            }
+        )
+    results[-1]["build_ms"] = build_seconds * 1000
+    results[-1]["agreement"] = float(agreement)
+
+    print_table(results, list(results[-1].keys()))
+    print(f"Results written to {write_results('region_lookup', results, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
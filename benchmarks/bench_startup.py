@@ -0,0 +1,153 @@
+"""
+Startup time of a camera worker, broken down by phase
+
+Every measurement runs in a fresh interpreter, so imports are cold (the OS
+page cache is warm after the first repeat). Phases:
+
+    import_base        OpenCV (numpy is already loaded)
+    torch_probe        import torch + torch.cuda.is_available(), the old
+                       provider check (skipped when torch is not installed)
+    import_onnxruntime onnxruntime alone
+    providers          provider detection through onnxruntime
+    import_insightface insightface and its dependencies
+    load_all_modules   FaceAnalyzer loading every model of the pack
+    load_used_modules  FaceAnalyzer loading MODEL_MODULES only
+    first_inference    first detection + recognition (session warm-up)
+    worker_cold        forked worker: load the model, run one frame
+    worker_prewarmed   forked worker inheriting the pre-warmed model
+
+Usage:
+    python -m benchmarks.bench_startup --repeats 3
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.common import print_table, write_results
+
+PHASES = (
+    "import_base",
+    "torch_probe",
+    "import_onnxruntime",
+    "providers",
+    "import_insightface",
+    "load_all_modules",
+    "load_used_modules",
+    "first_inference",
+    "worker_cold",
+    "worker_prewarmed",
+)
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return (time.perf_counter() - start) * 1000, result
+
+
+def _worker(face_analyzer_factory, frame, results):
+    start = time.perf_counter()
+    face_analyzer_factory().get_faces(frame)
+    results.put((time.perf_counter() - start) * 1000)
+
+
+def _fork_worker(face_analyzer_factory):
+    """Milliseconds from forking a worker until it has processed one frame"""
+    from multiprocessing import get_context
+
+    context = get_context("fork")
+    results = context.Queue()
+    frame = np.zeros((720, 1280, 3), dtype=np.uint8)
+    start = time.perf_counter()
+    process = context.Process(
+        target=_worker, args=(face_analyzer_factory, frame, results)
+    )
+    process.start()
+    results.get()
+    elapsed = (time.perf_counter() - start) * 1000
+    process.join()
+    return elapsed
+
+
+def child(phase):
+    """Measure one phase in this (fresh) interpreter, in milliseconds"""
+    ms, _ = _timed(lambda: __import__("cv2"))
+    if phase == "import_base":
+        return ms
+    if phase == "torch_probe":
+        try:
+            return _timed(lambda: __import__("torch").cuda.is_available())[0]
+        except ImportError:
+            return None
+
+    ms, _ = _timed(lambda: __import__("onnxruntime"))
+    if phase == "import_onnxruntime":
+        return ms
+    from core.face_analyzer import FaceAnalyzer, available_providers
+
+    ms, _ = _timed(available_providers)
+    if phase == "providers":
+        return ms
+    ms, _ = _timed(lambda: __import__("insightface.app"))
+    if phase == "import_insightface":
+        return ms
+
+    if phase == "load_all_modules":
+        return _timed(lambda: FaceAnalyzer(modules=[]))[0]
+    if phase == "load_used_modules":
+        return _timed(FaceAnalyzer)[0]
+    if phase == "first_inference":
+        return _timed(FaceAnalyzer().warm_up)[0]
+    if phase == "worker_cold":
+        return _fork_worker(FaceAnalyzer)
+    if phase == "worker_prewarmed":
+        return _fork_worker(FaceAnalyzer.shared_factory())
+    raise ValueError(f"Unknown phase: {phase}")
+
+
+def run_phase(phase, repeats):
+    """Median of the phase over fresh interpreters, None if unavailable"""
+    samples = []
+    for _ in range(repeats):
+        completed = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_startup", "--child", phase],
+            capture_output=True,
+            text=True,
+        )
+        if completed.returncode != 0:
+            raise RuntimeError(f"{phase} failed:\n{completed.stderr}")
+        # Model loading prints to stdout; the result is the last line
+        value = json.loads(completed.stdout.strip().splitlines()[-1])
+        if value is None:
+            return None
+        samples.append(value)
+    return float(np.median(samples))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--phases", nargs="+", default=list(PHASES), choices=PHASES)
+    parser.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(child(args.child)))
+        return
+
+    results = []
+    for phase in args.phases:
+        ms = run_phase(phase, args.repeats)
+        results.append({"phase": phase, "ms": "n/a" if ms is None else ms})
+    print_table(results, ["phase", "ms"])
+    print(f"Results written to {write_results('startup', results, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
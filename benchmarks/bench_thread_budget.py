@@ -0,0 +1,130 @@
+"""
+Aggregate FPS of concurrent workers with the CPU thread budget on and off
+
+Each worker is a freshly spawned process (so BLAS reads the exported pool
+size when numpy loads) that processes frames as fast as it can. With
+--image the frame is the face model's detection + embedding; otherwise a
+synthetic frame exercises the same native thread pools: an OpenCV resize
+and blur of a 1080p frame plus the matcher GEMM against a gallery. With the
+budget off every worker's pools default to all cores.
+
+Usage:
+    python -m benchmarks.bench_thread_budget --workers 4 8 12 --image office.jpg
+    python -m benchmarks.bench_thread_budget --workers 2 4 --gallery 50000
+"""
+
+import argparse
+import os
+import time
+from multiprocessing import get_context
+
+from benchmarks.common import print_table, write_results
+from utils.thread_budget import BLAS_ENV_VARS, ThreadBudget
+
+
+def make_workload(image, gallery_size, thread_budget):
+    """One frame of work, as a callable"""
+    import cv2
+    import numpy as np
+
+    if image:
+        from core.face_analyzer import FaceAnalyzer
+
+        face_analyzer = FaceAnalyzer(thread_budget=thread_budget)
+        frame = cv2.imread(image)
+        return lambda: face_analyzer.get_faces(frame)
+
+    from benchmarks.common import noisy_queries, synthetic_embeddings
+
+    gallery = synthetic_embeddings(gallery_size)
+    queries = noisy_queries(gallery, 8)
+    frame = np.random.default_rng(0).integers(0, 255, (1080, 1920, 3), np.uint8)
+
+    def synthetic_frame():
+        cv2.GaussianBlur(cv2.resize(frame, (960, 540)), (5, 5), 0)
+        return queries @ gallery.T
+
+    return synthetic_frame
+
+
+def worker_loop(slot, thread_budget, args, ready, start_event, results):
+    if thread_budget is not None:
+        thread_budget.apply(slot)
+    frame = make_workload(args.image, args.gallery, thread_budget)
+    frame()  # warm-up
+    ready.put(slot)
+    start_event.wait()
+    frames, deadline = 0, time.perf_counter() + args.duration
+    while time.perf_counter() < deadline:
+        frame()
+        frames += 1
+    results.put(frames)
+
+
+def run_workers(workers, budget_on, args):
+    """Aggregate frames per second of `workers` concurrent processes"""
+    thread_budget = (
+        ThreadBudget(workers, enabled=True, affinity=args.affinity)
+        if budget_on
+        else None
+    )
+    saved = {name: os.environ.pop(name, None) for name in BLAS_ENV_VARS}
+    if thread_budget is not None:
+        thread_budget.export_env()
+
+    context = get_context("spawn")
+    ready, results, start_event = context.Queue(), context.Queue(), context.Event()
+    processes = [
+        context.Process(
+            target=worker_loop,
+            args=(slot, thread_budget, args, ready, start_event, results),
+        )
+        for slot in range(workers)
+    ]
+    try:
+        for process in processes:
+            process.start()
+        for _ in processes:
+            ready.get()
+        start_event.set()
+        frames = sum(results.get() for _ in processes)
+        for process in processes:
+            process.join()
+    finally:
+        for name, value in saved.items():
+            os.environ.pop(name, None)
+            if value is not None:
+                os.environ[name] = value
+
+    return {
+        "workers": workers,
+        "budget": "on" if budget_on else "off",
+        "threads_each": thread_budget.threads_for(0) if budget_on else os.cpu_count(),
+        "fps_total": frames / args.duration,
+        "fps_per_worker": frames / args.duration / workers,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4, 8])
+    parser.add_argument("--image", default=None, help="frame for the face model")
+    parser.add_argument("--gallery", type=int, default=20000)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--affinity", action="store_true", help="pin workers")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    results = []
+    for workers in args.workers:
+        off = run_workers(workers, False, args)
+        on = run_workers(workers, True, args)
+        on["vs_off"] = f"{on['fps_total'] / off['fps_total'] - 1:+.1%}"
+        off["vs_off"] = ""
+        results += [off, on]
+    print_table(results, list(results[1].keys()))
+    print(f"Results written to {write_results('thread_budget', results, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
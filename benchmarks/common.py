@@ -0,0 +1,134 @@
+import json
+import os
+import platform
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+def synthetic_embeddings(
+    n: int, dim: int = 512, clusters: int = 0, spread: float = 0.6, seed: int = 0
+) -> np.ndarray:
+    """(n, dim) L2-normalized float32 embeddings around clusters (0 = sqrt(n))"""
+    rng = np.random.default_rng(seed)
+    clusters = clusters or max(1, int(np.sqrt(n)))
+    centres = rng.standard_normal((clusters, dim)).astype(np.float32)
+    centres /= np.linalg.norm(centres, axis=1, keepdims=True)
+    noise = rng.standard_normal((n, dim)).astype(np.float32) / np.sqrt(dim)
+    embeddings = centres[rng.integers(0, clusters, n)] + spread * noise
+    return embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+
+def noisy_queries(
+    gallery: np.ndarray, n: int, noise: float = 0.8, seed: int = 1
+) -> np.ndarray:
+    """Perturbed copies of random gallery rows, as seen by a camera"""
+    rng = np.random.default_rng(seed)
+    rows = gallery[rng.integers(0, len(gallery), n)]
+    jitter = rng.standard_normal(rows.shape).astype(np.float32)
+    queries = rows + noise * jitter / np.sqrt(gallery.shape[1])
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+
+def measure(fn: Callable, min_time: float = 0.5, min_runs: int = 3) -> float:
+    """Return the mean wall time of fn() in seconds"""
+    fn()  # warm-up
+    runs, start = 0, time.perf_counter()
+    while runs < min_runs or time.perf_counter() - start < min_time:
+        fn()
+        runs += 1
+    return (time.perf_counter() - start) / runs
+
+
+def process_rss_mb(pid="self") -> float:
+    """Resident set size of a process in MB (Linux /proc), 0 if unavailable"""
+    try:
+        with open(f"/proc/{pid}/status") as file:
+            for line in file:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+
+def process_cpu_seconds(pid="self") -> float:
+    """User plus system CPU time of a process in seconds (Linux /proc)"""
+    try:
+        with open(f"/proc/{pid}/stat") as file:
+            # Fields after the parenthesized command name, which may hold spaces
+            fields = file.read().rsplit(")", 1)[1].split()
+    except OSError:
+        return 0.0
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def descendant_pids(pid: int) -> List[int]:
+    """All live descendants of a process (Linux /proc)"""
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as file:
+                parent = int(file.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(parent, []).append(int(entry))
+
+    found, pending = [], [pid]
+    while pending:
+        for child in children.get(pending.pop(), []):
+            found.append(child)
+            pending.append(child)
+    return found
+
+
+def print_table(rows: List[Dict], columns: List[str]) -> None:
+    """Print result rows as an aligned text table"""
+    cells = [[_format(row.get(column)) for column in columns] for row in rows]
+    widths = [
+        max([len(column)] + [len(line[i]) for line in cells])
+        for i, column in enumerate(columns)
+    ]
+    print("  ".join(column.rjust(w) for column, w in zip(columns, widths)))
+    for line in cells:
+        print("  ".join(cell.rjust(w) for cell, w in zip(line, widths)))
+
+
+def _format(value) -> str:
+    if isinstance(value, float):
+        return f"{value:.4g}"
+    return str(value)
+
+
+def write_results(name: str, results: List[Dict], path: Optional[str] = None) -> Path:
+    """
+    Write benchmark results as JSON so runs can be compared between versions
+
+    Args:
+        name: Benchmark name
+        results: List of result rows
+        path: Output file (defaults to benchmarks/results/<name>.json)
+
+    Returns:
+        Path of the written file
+    """
+    output = Path(path) if path else RESULTS_DIR / f"{name}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    payload = {
+        "benchmark": name,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "results": results,
+    }
+    with open(output, "w") as file:
+        json.dump(payload, file, indent=4)
+    return output
@@ -0,0 +1,383 @@
+"""
+Multi-camera load and soak run of the full main.py topology on synthetic sources
+
+Generates a looping video per camera (or reuses a recorded clip), starts a
+stand-in API for API_URL and launches main.py headless against them with its
+own DATA_ROOT (track data and binary gallery) and metrics port. While it runs, CPU and RSS of every process in the tree are
+sampled from /proc and the per-camera frame stats main prints are collected.
+The report covers sustained FPS per camera, event delivery latency, CPU/RSS
+per process and events lost between the event log and the API.
+
+Faces are only recognized (and events produced) when --faces-dir holds face
+crops of people enrolled in the gallery; without it the frames carry
+placeholder shapes and the run measures decode/detect load only.
+
+Usage:
+    python -m benchmarks.soak --cameras 12 --duration 600 --faces-dir enrolled/
+    python -m benchmarks.soak --cameras 50 --width 1280 --height 720 --fps 10
+    python -m benchmarks.soak --cameras 4 --video office.mp4 --env INFERENCE_MODE=server
+"""
+
+import argparse
+import os
+import re
+import json
+import signal
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from benchmarks.common import (
+    descendant_pids,
+    print_table,
+    process_cpu_seconds,
+    process_rss_mb,
+    write_results,
+)
+from benchmarks.stress_data_sender import StandInAPI
+from api.data_sender import DataSender
+
+PROJECT_DIR = Path(__file__).parent.parent
+STATS_LINE = re.compile(
+    r"Camera (\S+): (\d+) decoded, (\d+) processed, (\d+) skipped, "
+    r"(\d+) dropped, frame age (\d+) ms"
+)
+
+
+def load_faces(faces_dir, face_height):
+    """Face crops to paste, scaled to face_height"""
+    faces = []
+    for path in sorted(Path(faces_dir).glob("*")) if faces_dir else []:
+        image = cv2.imread(str(path))
+        if image is not None:
+            scale = face_height / image.shape[0]
+            faces.append(cv2.resize(image, None, fx=scale, fy=scale))
+    return faces
+
+
+def synthetic_video(path, width, height, fps, seconds, density, faces, seed):
+    """
+    Write a static office-like background with faces drifting in place
+
+    Args:
+        density: Faces per frame
+        faces: Face crops to paste; placeholder ellipses when empty
+    """
+    rng = np.random.default_rng(seed)
+    noise = rng.integers(0, 255, (height // 8, width // 8, 3), dtype=np.uint8)
+    background = cv2.GaussianBlur(cv2.resize(noise, (width, height)), (0, 0), 5)
+
+    face_height = max(32, height // 8)
+    anchors = rng.uniform(
+        [0, 0], [width - face_height, height - face_height], (density, 2)
+    )
+    phases = rng.uniform(0, 2 * np.pi, density)
+    crops = [faces[i % len(faces)] for i in range(density)] if faces else []
+
+    writer = cv2.VideoWriter(
+        str(path), cv2.VideoWriter_fourcc(*"MJPG"), fps, (width, height)
+    )
+    for index in range(int(seconds * fps)):
+        frame = background.copy()
+        t = index / fps
+        for i, (x, y) in enumerate(anchors):
+            # Small seated movements, like people working at their desks
+            x = int(x + 10 * np.sin(0.5 * t + phases[i]))
+            y = int(y + 5 * np.cos(0.3 * t + phases[i]))
+            if crops:
+                crop = crops[i][: height - y, : width - x]
+                frame[y : y + crop.shape[0], x : x + crop.shape[1]] = crop
+            else:
+                center = (x + face_height // 2, y + face_height // 2)
+                axes = (face_height // 3, face_height // 2)
+                cv2.ellipse(frame, center, axes, 0, 0, 360, (150, 170, 200), -1)
+        writer.write(frame)
+    writer.release()
+
+
+def camera_sources(args, workdir):
+    """One file per camera, named after a fake IP so stats stay per camera"""
+    faces = load_faces(args.faces_dir, max(32, args.height // 8))
+    clips = []
+    if args.video:
+        clips.append(Path(args.video).resolve())
+    else:
+        for seed in range(min(args.cameras, args.distinct_clips)):
+            clip = workdir / f"clip-{seed}.avi"
+            synthetic_video(
+                clip,
+                args.width,
+                args.height,
+                args.fps,
+                args.clip_seconds,
+                args.density,
+                faces,
+                seed,
+            )
+            clips.append(clip)
+
+    sources = []
+    for i in range(args.cameras):
+        source = (
+            workdir
+            / f"cam-10.99.{i // 250}.{i % 250 + 1}{clips[i % len(clips)].suffix}"
+        )
+        source.symlink_to(clips[i % len(clips)])
+        sources.append(str(source))
+    return sources
+
+
+class ProcessSampler:
+    """CPU and RSS of a process tree, sampled from /proc"""
+
+    def __init__(self, root_pid):
+        self.root_pid = root_pid
+        self.samples = {}  # pid -> list of (time, cpu seconds, rss MB)
+
+    def sample(self):
+        now = time.time()
+        for pid in [self.root_pid] + descendant_pids(self.root_pid):
+            rss = process_rss_mb(pid)
+            if rss:
+                self.samples.setdefault(pid, []).append(
+                    (now, process_cpu_seconds(pid), rss)
+                )
+
+    def report(self):
+        rows = []
+        for pid, samples in sorted(self.samples.items()):
+            (start, cpu_start, _), (end, cpu_end, _) = samples[0], samples[-1]
+            rows.append(
+                {
+                    "pid": pid,
+                    "role": "main" if pid == self.root_pid else "child",
+                    "cpu_percent": (
+                        100 * (cpu_end - cpu_start) / (end - start)
+                        if end > start
+                        else 0.0
+                    ),
+                    "rss_mb_max": max(rss for _, _, rss in samples),
+                    "rss_mb_last": samples[-1][2],
+                    "samples": len(samples),
+                }
+            )
+        return rows
+
+
+def collect_output(stream, log_file, stats):
+    """Echo main's output to a log and keep its per-camera frame stats"""
+    for line in stream:
+        log_file.write(line)
+        match = STATS_LINE.search(line)
+        if match:
+            camera, *counters = match.groups()
+            stats.setdefault(camera, []).append(
+                (time.time(), *(int(counter) for counter in counters))
+            )
+
+
+def camera_report(stats):
+    rows = []
+    for camera, samples in sorted(stats.items()):
+        if len(samples) < 2:
+            continue
+        t0, decoded0, processed0, skipped0, dropped0, _ = samples[0]
+        t1, decoded1, processed1, skipped1, dropped1, _ = samples[-1]
+        rows.append(
+            {
+                "camera": camera,
+                "decoded_fps": (decoded1 - decoded0) / (t1 - t0),
+                "processed_fps": (processed1 - processed0) / (t1 - t0),
+                "grabber_skipped": skipped1 - skipped0,
+                "grabber_dropped": dropped1 - dropped0,
+                "frame_age_ms_avg": float(np.mean([s[5] for s in samples])),
+                "frame_age_ms_max": max(s[5] for s in samples),
+            }
+        )
+    return rows
+
+
+def free_port():
+    """A TCP port nothing listens on right now"""
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def event_key(event):
+    """Content of an event as the API sees it"""
+    return json.dumps(DataSender._payload(event), sort_keys=True)
+
+
+def event_report(data_root, server):
+    """
+    Events logged vs delivered vs still pending, and delivery latency
+
+    Pending events are matched by their local eventId. The API never sees
+    that id, so delivered events are matched by content, counting repeats:
+    a retried duplicate can hide the loss of an identical event.
+    """
+    logged = {}
+    for segment in (data_root / "track_records").glob("*/events-*.jsonl"):
+        with open(segment, "rb") as file:
+            for line in file:
+                if line.endswith(b"\n"):
+                    event = json.loads(line)
+                    logged[event["eventId"]] = event
+
+    pending = set()
+    outbox = data_root / "track_data" / "outbox.sqlite3"
+    if outbox.exists():
+        with sqlite3.connect(outbox) as connection:
+            pending = {
+                json.loads(payload)["eventId"]
+                for (payload,) in connection.execute("SELECT payload FROM outbox")
+            }
+
+    with server.lock:
+        received = list(zip(server.received, server.receive_times))
+    received_counts = Counter(event_key(e) for e, _ in received)
+    expected = Counter(
+        event_key(event)
+        for event_id, event in logged.items()
+        if event_id not in pending
+    )
+    delivered = expected & received_counts
+    # Events carry second-resolution timestamps, so latency is +-1 s
+    latencies = [
+        received_at
+        - datetime.strptime(f"{e['date']} {e['time']}", "%Y-%m-%d %H:%M:%S").timestamp()
+        for e, received_at in received
+        if e.get("date") and e.get("time")
+    ]
+    return {
+        "events_logged": len(logged),
+        "events_received": len(received),
+        "events_unique": sum(delivered.values()),
+        "events_pending": len(pending & logged.keys()),
+        "events_lost": sum((expected - delivered).values()),
+        "latency_s_p50": float(np.percentile(latencies, 50)) if latencies else None,
+        "latency_s_p95": float(np.percentile(latencies, 95)) if latencies else None,
+        "latency_s_max": float(max(latencies)) if latencies else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--cameras", type=int, default=12)
+    parser.add_argument("--duration", type=float, default=600, help="seconds")
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--fps", type=float, default=25)
+    parser.add_argument("--density", type=int, default=6, help="faces per frame")
+    parser.add_argument("--faces-dir", default=None, help="enrolled face crops")
+    parser.add_argument("--video", default=None, help="recorded clip for all cameras")
+    parser.add_argument("--clip-seconds", type=float, default=20)
+    parser.add_argument("--distinct-clips", type=int, default=4)
+    parser.add_argument("--sample-interval", type=float, default=10)
+    parser.add_argument("--api-error-rate", type=float, default=0.0)
+    parser.add_argument("--api-latency", type=float, default=0.02)
+    parser.add_argument(
+        "--env", action="append", default=[], help="KEY=VALUE passed to main.py"
+    )
+    parser.add_argument("--workdir", default=None, help="keep sources/data here")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    workdir = Path(args.workdir or tempfile.mkdtemp(prefix="soak-"))
+    workdir.mkdir(parents=True, exist_ok=True)
+    data_root = workdir / "data"
+    print(f"Preparing {args.cameras} camera sources in {workdir}...")
+    sources = camera_sources(args, workdir)
+
+    server = StandInAPI(args.api_error_rate, args.api_latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    env = dict(os.environ)
+    metrics_port = free_port()
+    print(f"Metrics of the run at http://127.0.0.1:{metrics_port}/metrics")
+    env.update(
+        CAMERA_URLS=",".join(sources),
+        API_URL=server.url,
+        DATA_ROOT=str(data_root),
+        METRICS_ENABLED="true",
+        METRICS_PORT=str(metrics_port),
+        LOOP_VIDEO_FILES="true",
+        DISPLAY_MODE="headless",
+        FRAME_STATS_INTERVAL=str(args.sample_interval),
+        PYTHONUNBUFFERED="1",
+    )
+    env.update(item.split("=", 1) for item in args.env)
+
+    camera_stats = {}
+    with open(workdir / "main.log", "w") as log_file:
+        process = subprocess.Popen(
+            [sys.executable, str(PROJECT_DIR / "main.py")],
+            cwd=PROJECT_DIR,
+            env=env,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+        )
+        reader = threading.Thread(
+            target=collect_output,
+            args=(process.stdout, log_file, camera_stats),
+            daemon=True,
+        )
+        reader.start()
+
+        sampler = ProcessSampler(process.pid)
+        deadline = time.time() + args.duration
+        while time.time() < deadline and process.poll() is None:
+            sampler.sample()
+            time.sleep(min(args.sample_interval, max(0.0, deadline - time.time())))
+        sampler.sample()
+
+        process.send_signal(signal.SIGINT)
+        try:
+            process.wait(timeout=60)
+        except subprocess.TimeoutExpired:
+            print("main.py did not stop within 60 s, killing it")
+            for pid in descendant_pids(process.pid):
+                os.kill(pid, signal.SIGKILL)
+            process.kill()
+        reader.join(timeout=5)
+    server.shutdown()
+
+    cameras = camera_report(camera_stats)
+    processes = sampler.report()
+    summary = {
+        "cameras": args.cameras,
+        "duration_s": args.duration,
+        "resolution": f"{args.width}x{args.height}",
+        "source_fps": args.fps,
+        "processed_fps_total": sum(row["processed_fps"] for row in cameras),
+        "cpu_percent_total": sum(row["cpu_percent"] for row in processes),
+        "rss_mb_total": sum(row["rss_mb_last"] for row in processes),
+        "exit_code": process.returncode,
+        **event_report(data_root, server),
+    }
+
+    if cameras:
+        print_table(cameras, list(cameras[0].keys()))
+    if processes:
+        print_table(processes, list(processes[0].keys()))
+    for key, value in summary.items():
+        print(f"{key:>20}: {value}")
+    print(f"Log and data kept in {workdir}")
+    results = [{"summary": summary, "cameras": cameras, "processes": processes}]
+    print(f"Results written to {write_results('soak', results, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Drive DataSender against a local stand-in API that injects latency and 5xx errors
+
+Usage:
+    python -m benchmarks.stress_data_sender --events 5000 --error-rate 0.2 --latency 0.05
+"""
+
+import argparse
+import gzip
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.common import write_results
+from data.event_outbox import EventOutbox
+from api.data_sender import DataSender
+
+
+class StandInAPI(ThreadingHTTPServer):
+    """Records delivered events; fails or delays requests at configured rates"""
+
+    daemon_threads = True
+
+    def __init__(self, error_rate, latency):
+        super().__init__(("127.0.0.1", 0), StandInHandler)
+        self.error_rate = error_rate
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.received = []
+        self.receive_times = []
+        self.requests = 0
+        self.errors = 0
+        self.largest_batch = 0
+        self.bytes_received = 0
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/api/track"
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def do_POST(self):
+        server = self.server
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(random.uniform(0, 2 * server.latency))
+
+        with server.lock:
+            server.requests += 1
+            server.bytes_received += len(body)
+            fail = random.random() < server.error_rate
+            if fail:
+                server.errors += 1
+        if fail:
+            self._reply(random.choice([500, 502, 503]), b"injected failure")
+            return
+
+        if self.headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+        events = json.loads(body)
+        with server.lock:
+            server.received.extend(events)
+            server.receive_times.extend([time.time()] * len(events))
+            server.largest_batch = max(server.largest_batch, len(events))
+        self._reply(200, b"ok")
+
+    def _reply(self, status, body):
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--error-rate", type=float, default=0.2)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--gzip", action="store_true")
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    server = StandInAPI(args.error_rate, args.latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    with tempfile.TemporaryDirectory() as directory:
+        outbox = EventOutbox(os.path.join(directory, "outbox.sqlite3"))
+        for seq in range(args.events):
+            outbox.put({"userPin": f"{seq % 300:05d}", "seq": seq})
+
+        sender = DataSender(outbox, api_url=server.url)
+        sender.use_gzip = args.gzip
+        stop_event = threading.Event()
+        start = time.time()
+        thread = threading.Thread(target=sender.send_track_data, args=(stop_event,))
+        thread.start()
+
+        while time.time() - start < args.timeout:
+            with server.lock:
+                unique = len({event["seq"] for event in server.received})
+            if unique == args.events:
+                break
+            time.sleep(0.1)
+        elapsed = time.time() - start
+        stop_event.set()
+        outbox.put({"seq": -1})  # wake the sender so it sees the stop event
+        thread.join()
+        server.shutdown()
+
+    seqs = [event["seq"] for event in server.received if event["seq"] >= 0]
+    result = {
+        "events": args.events,
+        "delivered_unique": len(set(seqs)),
+        "lost": args.events - len(set(seqs)),
+        "duplicates": len(seqs) - len(set(seqs)),
+        "requests": server.requests,
+        "injected_5xx": server.errors,
+        "largest_batch": server.largest_batch,
+        "bytes_received": server.bytes_received,
+        "gzip": args.gzip,
+        "events_per_s": args.events / elapsed,
+    }
+    for key, value in result.items():
+        print(f"{key:>16}: {value}")
+    print(f"Results written to {write_results('data_sender', [result], args.output)}")
+    sys.exit(0 if result["lost"] == 0 else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Stress the camera -> DataSender outbox with concurrent producers and check for loss
+
+Producers commit uniquely numbered events while a consumer drains the outbox
+and "fails" a fraction of deliveries, which must then be redelivered.
+
+Usage:
+    python -m benchmarks.stress_event_outbox --producers 12 --events 2000
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from multiprocessing import Process
+
+from benchmarks.common import write_results
+from data.event_outbox import EventOutbox
+
+
+def produce(outbox, producer, events, delay):
+    for seq in range(events):
+        outbox.put({"producer": producer, "seq": seq, "sent": time.time()})
+        if delay:
+            time.sleep(random.uniform(0, delay))
+
+
+def consume(outbox, expected, page_size, failure_rate, timeout):
+    """Drain the outbox; return (unique keys, deliveries, redeliveries, latencies)"""
+    seen, deliveries, failures, latencies = set(), 0, 0, []
+    deadline = time.time() + timeout
+    while len(seen) < expected and time.time() < deadline:
+        pending = outbox.fetch(page_size)
+        if not pending:
+            outbox.wait(0.5)
+            continue
+        if random.random() < failure_rate:
+            failures += 1  # Simulated send failure: nothing is acked
+            continue
+        now = time.time()
+        for _, event in pending:
+            seen.add((event["producer"], event["seq"]))
+            latencies.append(now - event["sent"])
+        deliveries += len(pending)
+        outbox.ack([row_id for row_id, _ in pending])
+    return seen, deliveries, failures, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--producers", type=int, default=12)
+    parser.add_argument("--events", type=int, default=2000, help="per producer")
+    parser.add_argument("--delay", type=float, default=0.002)
+    parser.add_argument("--page-size", type=int, default=200)
+    parser.add_argument("--failure-rate", type=float, default=0.1)
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        outbox = EventOutbox(os.path.join(directory, "outbox.sqlite3"))
+        outbox.pending()  # Create the schema before producers start
+
+        start = time.time()
+        producers = [
+            Process(target=produce, args=(outbox, i, args.events, args.delay))
+            for i in range(args.producers)
+        ]
+        for process in producers:
+            process.start()
+
+        expected = args.producers * args.events
+        seen, deliveries, failures, latencies = consume(
+            outbox, expected, args.page_size, args.failure_rate, args.timeout
+        )
+        for process in producers:
+            process.join()
+        elapsed = time.time() - start
+        left_over = outbox.pending()
+
+    latencies.sort()
+    result = {
+        "producers": args.producers,
+        "expected": expected,
+        "delivered_unique": len(seen),
+        "lost": expected - len(seen),
+        "duplicates": deliveries - len(seen),
+        "failed_pages": failures,
+        "left_in_outbox": left_over,
+        "events_per_s": expected / elapsed,
+        "latency_p50_ms": latencies[len(latencies) // 2] * 1000 if latencies else None,
+        "latency_p99_ms": (
+            latencies[int(len(latencies) * 0.99)] * 1000 if latencies else None
+        ),
+    }
+    for key, value in result.items():
+        print(f"{key:>18}: {value}")
+    print(f"Results written to {write_results('event_outbox', [result], args.output)}")
+    sys.exit(0 if result["lost"] == 0 else 1)
+
+
+if __name__ == "__main__":
+    main()
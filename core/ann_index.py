@@ -0,0 +1,116 @@
+import numpy as np
+from config.constants import IVF_NLIST, IVF_NPROBE, IVF_TRAIN_ITERATIONS
+
+
+class IVFIndex:
+    """Inverted lists of row numbers into a shared, L2-normalized gallery"""
+
+    def __init__(
+        self,
+        nlist: int = IVF_NLIST,
+        nprobe: int = IVF_NPROBE,
+        train_iterations: int = IVF_TRAIN_ITERATIONS,
+        seed: int = 0,
+    ):
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.train_iterations = train_iterations
+        self.seed = seed
+        self.centroids = None
+        self.vectors = None
+        self.labels = None
+        self.row_ids = None
+        self.offsets = None
+
+    def build(self, gallery: np.ndarray) -> "IVFIndex":
+        """Train the coarse centroids and list every row of the gallery"""
+        nlist = self.nlist or int(4 * np.sqrt(len(gallery)))
+        nlist = max(1, min(nlist, len(gallery)))
+        self.centroids = self._train(gallery, nlist)
+        return self._lay_out(gallery, self._assign(gallery))
+
+    def updated(self, gallery: np.ndarray, source: np.ndarray) -> "IVFIndex":
+        """New index over a changed gallery, keeping the trained centroids"""
+        # source[i] is the current row new row i comes from, -1 for new rows
+        index = IVFIndex(self.nlist, self.nprobe, self.train_iterations, self.seed)
+        index.centroids = self.centroids
+        source = np.asarray(source, dtype=np.int64)
+        labels = np.empty(len(source), dtype=np.int32)
+        kept = source >= 0
+        labels[kept] = self.labels[source[kept]]
+        added = np.flatnonzero(~kept)
+        if len(added):
+            labels[added] = index._assign(gallery[added])
+        return index._lay_out(gallery, labels)
+
+    def _lay_out(self, gallery, labels):
+        """Group row numbers by list; the gallery is referenced, not copied"""
+        self.vectors = gallery
+        self.labels = labels
+        self.row_ids = np.argsort(labels, kind="stable").astype(np.int32)
+        counts = np.bincount(labels, minlength=len(self.centroids))
+        self.offsets = np.concatenate(([0], np.cumsum(counts)))
+        return self
+
+    def _train(self, gallery: np.ndarray, nlist: int) -> np.ndarray:
+        """Spherical k-means on a sample of the gallery"""
+        rng = np.random.default_rng(self.seed)
+        sample_size = min(len(gallery), nlist * 64)
+        rows = np.sort(rng.choice(len(gallery), sample_size, replace=False))
+        sample = np.asarray(gallery[rows], dtype=np.float32)
+        centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+
+        for _ in range(self.train_iterations):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+
+            # Re-seed empty lists with random sample rows
+            empty = norms[:, 0] == 0
+            if empty.any():
+                sums[empty] = sample[rng.choice(sample_size, int(empty.sum()))]
+                norms[empty] = 1.0
+            centroids = sums / norms
+        return centroids.astype(np.float32)
+
+    def _assign(self, gallery: np.ndarray, chunk_size: int = 65536) -> np.ndarray:
+        """Closest centroid of every gallery row"""
+        labels = np.empty(len(gallery), dtype=np.int32)
+        for start in range(0, len(gallery), chunk_size):
+            chunk = np.asarray(gallery[start : start + chunk_size], dtype=np.float32)
+            labels[start : start + chunk_size] = np.argmax(
+                chunk @ self.centroids.T, axis=1
+            )
+        return labels
+
+    def search(self, queries: np.ndarray, k: int = 1, nprobe: int = None):
+        """Top-k (indices, scores) among the nprobe closest lists, -1/-inf padded"""
+        nprobe = max(1, min(nprobe or self.nprobe, len(self.centroids)))
+        coarse = queries @ self.centroids.T
+        if nprobe < coarse.shape[1]:
+            probes = np.argpartition(-coarse, nprobe - 1, axis=1)[:, :nprobe]
+        else:
+            probes = np.broadcast_to(np.arange(coarse.shape[1]), coarse.shape)
+
+        indices = np.full((len(queries), k), -1, dtype=np.int64)
+        scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        starts, ends = self.offsets[:-1], self.offsets[1:]
+
+        for row, (query, lists) in enumerate(zip(queries, probes)):
+            shortlist = np.concatenate(
+                [self.row_ids[starts[l] : ends[l]] for l in lists]
+            )
+            if len(shortlist) == 0:
+                continue
+            # Sorted rows read a memory-mapped gallery sequentially
+            shortlist.sort()
+            candidate_scores = (
+                np.asarray(self.vectors[shortlist], dtype=np.float32) @ query
+            )
+            top = min(k, len(shortlist))
+            best = np.argpartition(-candidate_scores, top - 1)[:top]
+            best = best[np.argsort(-candidate_scores[best])]
+            indices[row, :top] = shortlist[best]
+            scores[row, :top] = candidate_scores[best]
+        return indices, scores
@@ -1,41 +1,249 @@
-import torch
-from insightface.app import FaceAnalysis
+import glob
+import os
+import numpy as np
 from config.settings import MODELS_DIR
-from config.constants import MODEL_PROVIDERS, DETECTION_THRESHOLD, USE_GPU
+from config.constants import (
+    MODEL_PROVIDERS,
+    MODEL_MODULES,
+    DETECTION_THRESHOLD,
+    USE_GPU,
+)
+
+
+def available_providers(requested=MODEL_PROVIDERS):
+    """
+    Requested onnxruntime execution providers usable here, in order
+
+    Asks onnxruntime itself instead of importing torch to probe CUDA; the
+    CUDA provider is dropped when USE_GPU is off.
+    """
+    import onnxruntime
+
+    available = set(onnxruntime.get_available_providers())
+    providers = [
+        provider
+        for provider in requested
+        if provider in available and (USE_GPU or provider != "CUDAExecutionProvider")
+    ]
+    # Fallback to CPU if no providers are available
+    return providers or ["CPUExecutionProvider"]
+
+
+def model_taskname(onnx_file):
+    """
+    Task of a model pack file, read from its graph without loading weights
+
+    Mirrors the rules insightface's ModelRouter applies to a live session,
+    so files can be picked before any session is created. None for files
+    the router would not load either.
+    """
+    import onnx
+
+    graph = onnx.load(onnx_file, load_external_data=False).graph
+    initializers = {initializer.name for initializer in graph.initializer}
+    inputs = [value for value in graph.input if value.name not in initializers]
+    if not inputs:
+        return None
+
+    def dims(value):
+        return [dim.dim_value for dim in value.type.tensor_type.shape.dim]
+
+    shape = dims(inputs[0])
+    if len(graph.output) >= 5:
+        return "detection"
+    if len(shape) < 4:
+        return None
+    height, width = shape[2], shape[3]
+    if height == width == 192:
+        output_shape = dims(graph.output[0])
+        return "landmark_3d_68" if output_shape[1:2] == [3309] else "landmark_2d_106"
+    if height == width == 96:
+        return "genderage"
+    if len(inputs) == 2 and height == width == 128:
+        return "inswapper"
+    if height == width and height >= 112 and height % 16 == 0:
+        return "recognition"
+    return None
 
 
 class FaceAnalyzer:
-    def __init__(self):
-        self.app = None
+    """
+    Face detection and recognition with insightface
+
+    insightface and onnxruntime are imported on the first model load, so
+    importing this module is cheap. Only the model modules the pipeline uses
+    (MODEL_MODULES) are kept and prepared, and the pack is read only until
+    all of them are found. A fork-safe analyzer runs single-threaded
+    sessions, which start no thread pool, so a process can load it once and
+    hand it to the workers it forks; otherwise session threads follow the
+    worker's ThreadBudget, when given.
+    """
+
+    def __init__(self, modules=MODEL_MODULES, fork_safe=False, thread_budget=None):
+        self.modules = modules
+        self.fork_safe = fork_safe
+        self.thread_budget = thread_budget
+        self.models = {}
         self.load_model()
 
+    @classmethod
+    def shared_factory(cls):
+        """
+        Factory handing forked workers one model loaded and warmed up here
+
+        Every worker, restarted ones included, then skips the model load and
+        the first slow inference; the weights are shared copy-on-write. CUDA
+        contexts do not survive a fork, so with the CUDA provider workers
+        keep loading their own model.
+        """
+        if "CUDAExecutionProvider" in available_providers():
+            print("Model pre-warming skipped: CUDA sessions cannot be forked")
+            return cls
+        face_analyzer = cls(fork_safe=True)
+        face_analyzer.warm_up()
+        return lambda: face_analyzer
+
+    def _session_options(self):
+        """onnxruntime session options passed to every model of the pack"""
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        if self.thread_budget is not None:
+            self.thread_budget.session_options(options)
+        if self.fork_safe:
+            options.intra_op_num_threads = 1
+            options.inter_op_num_threads = 1
+        return options
+
     def load_model(self):
-        """Load the face analysis model with environment-based configuration"""
-        device = torch.device(
-            "cuda" if torch.cuda.is_available() and USE_GPU else "cpu"
-        )
+        """
+        Load the model pack's modules with environment-based configuration
+
+        Each file's task is read from its graph first, and sessions are
+        created only for the files kept. Sessions are created through
+        insightface's model router, as FaceAnalysis does, but with this
+        analyzer's session options, which FaceAnalysis does not pass on.
+        """
+        from insightface.app.common import Face
+        from insightface.model_zoo.model_zoo import ModelRouter
+        from insightface.utils import face_align
+
+        self.face_type = Face
+        self.norm_crop = face_align.norm_crop
+
+        providers = available_providers()
+        options = self._session_options()
+        wanted = set(self.modules or ())
+        selected = {}
+        for onnx_file in sorted(glob.glob(os.path.join(MODELS_DIR, "*.onnx"))):
+            taskname = model_taskname(onnx_file)
+            if taskname is None or taskname in selected:
+                continue
+            if wanted and taskname not in wanted:
+                continue
+            selected[taskname] = onnx_file
+            if wanted and wanted <= selected.keys():
+                break
+
+        self.models = {}
+        for onnx_file in selected.values():
+            model = ModelRouter(onnx_file).get_model(
+                providers=providers, sess_options=options
+            )
+            if model is not None:
+                self.models[model.taskname] = model
+        if "detection" not in self.models:
+            raise RuntimeError(f"No detection model found in {MODELS_DIR}")
 
-        # Use available providers based on environment configuration
-        available_providers = []
-        for provider in MODEL_PROVIDERS:
-            if provider == "CUDAExecutionProvider" and device.type == "cuda":
-                available_providers.append(provider)
-            elif provider == "CPUExecutionProvider":
-                available_providers.append(provider)
+        ctx_id = 0 if "CUDAExecutionProvider" in providers else -1
+        for taskname, model in self.models.items():
+            if taskname == "detection":
+                model.prepare(
+                    ctx_id, input_size=(640, 640), det_thresh=DETECTION_THRESHOLD
+                )
+            else:
+                model.prepare(ctx_id)
+        return self.models
 
-        # Fallback to CPU if no providers are available
-        if not available_providers:
-            available_providers = ["CPUExecutionProvider"]
+    def warm_up(self):
+        """Run detection and recognition once so the first frame is not slow"""
+        self._detect(np.zeros((640, 640, 3), dtype=np.uint8))
+        recognition = self.models["recognition"]
+        size = recognition.input_size[0]
+        recognition.get_feat([np.zeros((size, size, 3), dtype=np.uint8)])
 
-        self.app = FaceAnalysis(name=str(MODELS_DIR), providers=available_providers)
+    def detect(self, frame, rois=None):
+        """
+        Detect faces (box, landmarks, score) without running recognition
 
-        self.app.prepare(
-            ctx_id=0 if device.type == "cuda" else -1,
-            det_thresh=DETECTION_THRESHOLD,
-            det_size=(640, 640),
+        Args:
+            rois: Optional [x1, y1, x2, y2] crops to detect in instead of the
+                whole frame; each crop is letterboxed into the detection size
+                on its own and the faces are mapped back to frame coordinates
+        """
+        if not rois:
+            return self._detect(frame)
+        faces = []
+        for x1, y1, x2, y2 in rois:
+            for face in self._detect(frame[y1:y2, x1:x2]):
+                face.bbox = face.bbox + np.array([x1, y1, x1, y1], dtype=np.float32)
+                if face.kps is not None:
+                    face.kps = face.kps + np.array([x1, y1], dtype=np.float32)
+                faces.append(face)
+        return faces
+
+    def _detect(self, frame):
+        bboxes, kpss = self.models["detection"].detect(
+            frame, max_num=0, metric="default"
         )
-        return self.app
+        faces = []
+        for i in range(bboxes.shape[0]):
+            faces.append(
+                self.face_type(
+                    bbox=bboxes[i, 0:4],
+                    kps=kpss[i] if kpss is not None else None,
+                    det_score=bboxes[i, 4],
+                )
+            )
+        return faces
+
+    @property
+    def crop_size(self):
+        """Side of the aligned face crops the recognition model takes"""
+        return self.models["recognition"].input_size[0]
+
+    def crop(self, frame, faces):
+        """Aligned recognition crops of the faces of one frame"""
+        return [self.norm_crop(frame, face.kps, self.crop_size) for face in faces]
+
+    def embed_crops(self, crops, faces):
+        """Embed aligned crops in one recognition call; faces get .embedding set"""
+        if not crops:
+            return
+        recognition = self.models["recognition"]
+        for face, embedding in zip(faces, recognition.get_feat(crops)):
+            face.embedding = embedding
+
+    def embed_batch(self, items):
+        """
+        Compute embeddings for faces of one or more frames in a single batch
+
+        Args:
+            items: List of (frame, faces) pairs; faces get .embedding set
+        """
+        crops, targets = [], []
+        for frame, faces in items:
+            crops.extend(self.crop(frame, faces))
+            targets.extend(faces)
+        self.embed_crops(crops, targets)
+
+    def embed(self, frame, faces):
+        """Compute embeddings for the faces of one frame"""
+        self.embed_batch([(frame, faces)])
+        return faces
 
-    def get_faces(self, frame):
+    def get_faces(self, frame, rois=None):
         """Extract faces from frame"""
-        return self.app.get(frame) if self.app else None
+        if not self.models:
+            return None
+        return self.embed(frame, self.detect(frame, rois))
@@ -1,25 +1,465 @@
-import cupy as cp
+import threading
 import numpy as np
-from config.constants import SIMILARITY_THRESHOLD
+from core.ann_index import IVFIndex
+from data.gallery_store import GalleryStore
+from config.constants import (
+    SIMILARITY_THRESHOLD,
+    MATCHER_BACKEND,
+    MATCHER_INDEX,
+    MATCHER_PRECISION,
+    MATCHER_RERANK,
+    IVF_MIN_GALLERY_SIZE,
+    USE_GPU,
+)
+
+
+def get_array_module(backend=MATCHER_BACKEND):
+    """Resolve the array module ("numpy" or "cupy") for a matcher backend"""
+    if backend not in ("auto", "cupy", "numpy"):
+        raise ValueError(f"Unknown matcher backend: {backend}")
+
+    if backend == "cupy" or (backend == "auto" and USE_GPU):
+        try:
+            import cupy as cp
+
+            if cp.cuda.runtime.getDeviceCount() > 0:
+                return cp
+        except Exception:
+            if backend == "cupy":
+                raise
+    return np
 
 
 class FaceMatcher:
+    """
+    Cosine-similarity matcher of face embeddings against a gallery
+
+    The gallery may hold several templates per identity (glasses, masks,
+    lighting). Its id table then repeats an identity's id for each of its
+    rows; the matcher groups the rows into contiguous per-identity segments
+    described by an offsets table, scores all templates with one GEMM and
+    reduces each segment to its maximum. A gallery with one template per
+    identity skips the reduction entirely.
+
+    At float16 or int8 precision the scanned gallery is a quantized copy
+    (int8 with one scale per row) and the best `rerank` candidates of the
+    scan are re-scored exactly against the float32 gallery, which stays on
+    the host and is only read for those rows.
+    """
+
+    PRECISIONS = ("float32", "float16", "int8")
+    # Rows dequantized per GEMM when scanning an int8 or host float16 gallery
+    SCAN_BLOCK = 8192
+
+    def __init__(
+        self,
+        backend=MATCHER_BACKEND,
+        index=MATCHER_INDEX,
+        precision=MATCHER_PRECISION,
+        rerank=MATCHER_RERANK,
+    ):
+        if index not in ("flat", "ivf"):
+            raise ValueError(f"Unknown matcher index: {index}")
+        if precision not in self.PRECISIONS:
+            raise ValueError(f"Unknown matcher precision: {precision}")
+        self.backend = backend
+        self.index_type = index
+        self.precision = precision
+        self.rerank = rerank
+        self.xp = None
+        self.user_ids = []
+        self.row_ids = []
+        self.gallery = None
+        self.scales = None
+        self.exact = None
+        self.offsets = None
+        self.row_owner = None
+        self.index = None
+        self._segments = None
+        self._source = None
+        # Cameras sharing the matcher load the gallery and apply each delta
+        # version once, under the lock
+        self.loaded = False
+        self.version = 0
+        self.lock = threading.Lock()
+
     @staticmethod
-    def cosine_similarity_cupy(A, B):
-        """Calculate cosine similarity using CuPy"""
-        A_norm = cp.linalg.norm(A, axis=1, keepdims=True)
-        B_norm = cp.linalg.norm(B, axis=1, keepdims=True)
-        similarity = cp.dot(A, B.T) / (A_norm * B_norm.T)
-        return similarity
+    def normalize_rows(xp, matrix):
+        """L2-normalize rows of a matrix as float32"""
+        matrix = xp.asarray(matrix, dtype=xp.float32)
+        if matrix.ndim == 1:
+            matrix = matrix.reshape(1, -1)
+        norms = xp.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / xp.maximum(norms, 1e-12)
+
+    def set_gallery(self, user_ids, feature_matrix, normalized=False, quantized=None):
+        """
+        Normalize the gallery once and keep it on the backend device
+
+        A float32 gallery that is already normalized (e.g. a memory-mapped
+        SharedGallery) is used in place by the NumPy backend, without a copy.
+
+        Args:
+            user_ids: Id of every gallery row; repeated for the rows of an
+                identity with several templates
+            quantized: Optional (matrix, scales) produced by the gallery
+                loader for this precision; quantized here when missing
+        """
+        if self.xp is None:
+            self.xp = get_array_module(self.backend)
+        self._source = feature_matrix
+        self.loaded = True
+        row_ids = list(user_ids)
+        gallery = scales = exact = None
+        if not row_ids:
+            pass
+        elif self.precision != "float32":
+            exact = (
+                feature_matrix
+                if normalized
+                else self.normalize_rows(np, feature_matrix)
+            )
+            if quantized is None or quantized[0].dtype != np.dtype(self.precision):
+                quantized = GalleryStore.quantize(exact, self.precision)
+            gallery, scales = self._to_device(*quantized)
+        elif normalized and self.xp is np and feature_matrix.dtype == np.float32:
+            gallery = feature_matrix
+        elif normalized:
+            gallery = self.xp.asarray(feature_matrix, dtype=self.xp.float32)
+        else:
+            gallery = self.normalize_rows(self.xp, feature_matrix)
+
+        # Large galleries are searched through the in-process ANN index
+        self._set_templates(row_ids, gallery, scales, exact)
+
+    def _to_device(self, quantized, scales):
+        """Quantized gallery and scales on the backend device"""
+        if self.xp is np:
+            return quantized, scales
+        return self.xp.asarray(quantized), (
+            None if scales is None else self.xp.asarray(scales)
+        )
+
+    def apply_delta(self, removed_ids, upsert_ids, upsert_vectors):
+        """
+        Apply identity removals and additions/changes without a full reload
+
+        The new id table and gallery are built aside and swapped in together,
+        so a match never sees a half-applied delta.
+
+        Returns:
+            Number of gallery rows affected
+        """
+        removed = set(removed_ids) & set(self.user_ids)
+        dropped = removed | set(upsert_ids)
+        keep = [row for row, uid in enumerate(self.row_ids) if uid not in dropped]
+        row_ids = [self.row_ids[row] for row in keep] + list(upsert_ids)
+        # Row of the current gallery behind each new row, for the ANN index
+        source = np.array(keep + [-1] * len(upsert_ids), dtype=np.int64)
+
+        xp = self.xp or get_array_module(self.backend)
+        self.xp = xp
+        if self.precision == "float32":
+            parts = []
+            if self.gallery is not None and keep:
+                parts.append(self.gallery[xp.asarray(keep)])
+            if len(upsert_ids):
+                parts.append(self.normalize_rows(xp, upsert_vectors))
+            gallery = xp.concatenate(parts) if parts else None
+            self._set_templates(row_ids, gallery, source=source)
+            return len(removed) + len(upsert_ids)
+
+        # Quantized: update the exact host rows and quantize only new ones
+        exact_parts, parts = [], []
+        if self.exact is not None and keep:
+            exact_parts.append(np.asarray(self.exact[keep], dtype=np.float32))
+            parts.append(
+                (
+                    self.gallery[xp.asarray(keep)],
+                    None if self.scales is None else self.scales[xp.asarray(keep)],
+                )
+            )
+        if len(upsert_ids):
+            vectors = self.normalize_rows(np, upsert_vectors)
+            exact_parts.append(vectors)
+            parts.append(
+                self._to_device(*GalleryStore.quantize(vectors, self.precision))
+            )
+        gallery = scales = exact = None
+        if parts:
+            exact = np.concatenate(exact_parts)
+            gallery = xp.concatenate([part[0] for part in parts])
+            if self.precision == "int8":
+                scales = xp.concatenate([part[1] for part in parts])
+        self._set_templates(row_ids, gallery, scales, exact, source)
+        return len(removed) + len(upsert_ids)
+
+    def _set_templates(self, row_ids, gallery, scales=None, exact=None, source=None):
+        """
+        Group template rows into contiguous per-identity segments
+
+        Rows of one identity that are not adjacent are moved together (a
+        stable reorder, so the first template listed stays first). The id
+        table, gallery, offsets and index are swapped in together, so a
+        match never sees a half-applied update.
+
+        Args:
+            source: Row of the current gallery behind each row, -1 for new
+                rows; given for a delta, so the ANN index is updated rather
+                than retrained
+        """
+        first_rows = {}
+        for row, user_id in enumerate(row_ids):
+            first_rows.setdefault(user_id, row)
+        user_ids = list(first_rows)
+        offsets = row_owner = None
+
+        if len(user_ids) < len(row_ids):
+            identity = {user_id: i for i, user_id in enumerate(user_ids)}
+            owners = np.array([identity[user_id] for user_id in row_ids])
+            if np.any(np.diff(owners) < 0):
+                order = np.argsort(owners, kind="stable")
+                gallery = gallery[self.xp.asarray(order)]
+                if scales is not None:
+                    scales = scales[self.xp.asarray(order)]
+                if exact is not None:
+                    exact = exact[order]
+                if source is not None:
+                    source = source[order]
+                row_ids = [row_ids[row] for row in order]
+                owners = owners[order]
+            counts = np.bincount(owners, minlength=len(user_ids))
+            offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+            row_owner = owners
+
+        index = self._build_index(row_ids, gallery, exact, source)
+        (
+            self.index,
+            self.user_ids,
+            self.row_ids,
+            self.gallery,
+            self.scales,
+            self.exact,
+            self.offsets,
+            self.row_owner,
+            self._segments,
+        ) = (index, user_ids, row_ids, gallery, scales, exact, offsets, row_owner, None)
+
+    def _build_index(self, row_ids, gallery, exact, source):
+        """ANN index when configured and the gallery is large enough"""
+        if self.index_type != "ivf" or len(row_ids) < IVF_MIN_GALLERY_SIZE:
+            return None
+        # Lists hold row numbers; candidates are scored against the
+        # full-precision rows, shared with the gallery where possible
+        vectors = self._to_host(gallery) if exact is None else exact
+        if self.index is not None and source is not None:
+            # A delta keeps the trained centroids: kept rows keep their
+            # list, new rows join their closest one
+            return self.index.updated(vectors, source)
+        return IVFIndex().build(vectors)
+
+    def _scan(self, queries):
+        """
+        Scores of every gallery row, (n_faces, n_rows) float32
+
+        int8 rows, and float16 rows on the host where NumPy has no fast
+        float16 GEMM, are converted to float32 one block at a time, so the
+        full-precision gallery never exists in memory. The GPU multiplies
+        float16 directly.
+        """
+        xp = self.xp
+        gallery = self.gallery
+        if gallery.dtype == xp.float32:
+            return queries @ gallery.T
+        if gallery.dtype == xp.float16 and xp is not np:
+            return (queries.astype(xp.float16) @ gallery.T).astype(xp.float32)
+
+        scores = xp.empty((len(queries), len(gallery)), dtype=xp.float32)
+        for start in range(0, len(gallery), self.SCAN_BLOCK):
+            block = gallery[start : start + self.SCAN_BLOCK].astype(xp.float32)
+            scores[:, start : start + self.SCAN_BLOCK] = queries @ block.T
+        if self.scales is not None:
+            scores *= self.scales
+        return scores
+
+    def _top_k(self, scores, k):
+        """Best k columns per row, sorted, as host (indices, scores)"""
+        xp = self.xp
+        k = min(k, scores.shape[1])
+        if k == 1:
+            indices = xp.argmax(scores, axis=1).reshape(-1, 1)
+        else:
+            indices = xp.argpartition(-scores, k - 1, axis=1)[:, :k]
+            order = xp.argsort(-xp.take_along_axis(scores, indices, axis=1), axis=1)
+            indices = xp.take_along_axis(indices, order, axis=1)
+        top_scores = xp.take_along_axis(scores, indices, axis=1)
+
+        # Single device-to-host transfer for the whole frame
+        if xp is not np:
+            indices, top_scores = xp.asnumpy(indices), xp.asnumpy(top_scores)
+        return indices, top_scores
+
+    def _rerank(self, queries, candidates, k):
+        """
+        Re-score candidate identities exactly in float32 and keep the best k
+
+        Args:
+            queries: Normalized host queries, (n_faces, dim)
+            candidates: Identity indices from the low-precision scan
+        """
+        if self.offsets is None:
+            vectors = np.asarray(self.exact[candidates.ravel()], dtype=np.float32)
+            exact = np.einsum(
+                "fd,fcd->fc", queries, vectors.reshape(*candidates.shape, -1)
+            )
+        else:
+            exact = np.empty(candidates.shape, dtype=np.float32)
+            for face, face_candidates in enumerate(candidates):
+                for column, identity in enumerate(face_candidates):
+                    start, end = self.offsets[identity], self.offsets[identity + 1]
+                    templates = np.asarray(self.exact[start:end], dtype=np.float32)
+                    exact[face, column] = (templates @ queries[face]).max()
+        order = np.argsort(-exact, axis=1)[:, :k]
+        return (
+            np.take_along_axis(candidates, order, axis=1),
+            np.take_along_axis(exact, order, axis=1),
+        )
+
+    def _segment_max(self, scores):
+        """
+        Reduce (n_faces, n_templates) scores to (n_faces, n_identities)
+
+        On the CPU the reduction runs per template slot: every identity
+        starts from its first template's score and takes the maximum with
+        its j-th template for j = 1 .. max templates - 1, each step one
+        gather over the identities that have that many templates. This is
+        several times faster than maximum.reduceat over many short segments.
+        On the GPU the segments are gathered into one padded (identities,
+        max templates) block, padding pointing at a -inf column, and reduced
+        with a single max over the last axis.
+        """
+        xp = self.xp
+        counts = np.diff(self.offsets)
+        starts = self.offsets[:-1]
+        if xp is np:
+            if self._segments is None:
+                self._segments = [
+                    (np.flatnonzero(counts > slot), starts[counts > slot] + slot)
+                    for slot in range(1, int(counts.max()))
+                ]
+            best = scores[:, starts]
+            for identities, rows in self._segments:
+                best[:, identities] = np.maximum(best[:, identities], scores[:, rows])
+            return best
+
+        if self._segments is None:
+            slots = np.arange(int(counts.max()))
+            self._segments = xp.asarray(
+                np.where(
+                    slots < counts[:, None], starts[:, None] + slots, len(self.row_ids)
+                )
+            )
+        padded = xp.concatenate(
+            [scores, xp.full((len(scores), 1), -xp.inf, dtype=scores.dtype)], axis=1
+        )
+        return padded[:, self._segments].max(axis=2)
+
+    def _best_per_identity(self, rows, scores, k):
+        """Collapse ranked template rows to the top-k distinct identities"""
+        k = min(k, len(self.user_ids))
+        indices = np.full((len(rows), k), -1, dtype=np.int64)
+        top_scores = np.full((len(rows), k), -np.inf, dtype=np.float32)
+        for face, (face_rows, face_scores) in enumerate(zip(rows, scores)):
+            seen = 0
+            found = set()
+            for row, score in zip(face_rows, face_scores):
+                if row < 0 or seen == k:
+                    break
+                owner = int(self.row_owner[row])
+                if owner not in found:
+                    found.add(owner)
+                    indices[face, seen], top_scores[face, seen] = owner, score
+                    seen += 1
+        return indices, top_scores
+
+    def _to_host(self, array):
+        """Return a NumPy view or copy of a backend array"""
+        return array if self.xp is np else self.xp.asnumpy(array)
+
+    def search(self, embeddings, k=1):
+        """
+        Score a batch of embeddings against the gallery with one GEMM
+
+        Args:
+            embeddings: Array of shape (n_faces, dim)
+            k: Number of candidates to return per face
+
+        Returns:
+            Tuple of (indices, scores) as host arrays of shape (n_faces, k),
+            sorted by descending score; indices refer to self.user_ids, and
+            an identity scores its best-matching template
+        """
+        if self.index is not None:
+            queries = self.normalize_rows(np, embeddings)
+            if self.offsets is None:
+                return self.index.search(queries, k)
+            # Enough template candidates to cover k distinct identities
+            width = int(np.diff(self.offsets).max())
+            rows, scores = self.index.search(queries, k * width)
+            return self._best_per_identity(rows, scores, k)
+
+        queries = self.normalize_rows(self.xp, embeddings)
+        scores = self._scan(queries)
+        if self.offsets is not None:
+            scores = self._segment_max(scores)
+        if self.exact is None or not self.rerank:
+            return self._top_k(scores, k)
+
+        candidates, _ = self._top_k(scores, max(k, self.rerank))
+        return self._rerank(self._to_host(queries), candidates, k)
+
+    def match_batch(self, embeddings, k=1, threshold=SIMILARITY_THRESHOLD):
+        """
+        Match every face of a frame in one call
+
+        Args:
+            embeddings: Sequence or array of face embeddings
+            k: Number of candidates to return per face
+            threshold: Minimum similarity for a known identity
+
+        Returns:
+            Tuple of (top_ids, top_scores): top_ids is a list of per-face id
+            lists ("Unknown" below threshold), top_scores an (n_faces, k) array
+        """
+        if len(embeddings) == 0:
+            return [], np.zeros((0, 1), dtype=np.float32)
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if embeddings.ndim == 1:
+            embeddings = embeddings.reshape(1, -1)
+        if self.gallery is None:
+            return [["Unknown"] for _ in range(len(embeddings))], np.zeros(
+                (len(embeddings), 1), dtype=np.float32
+            )
+
+        indices, scores = self.search(embeddings, k)
+        top_ids = [
+            [
+                self.user_ids[index] if score >= threshold else "Unknown"
+                for index, score in zip(row_indices, row_scores)
+            ]
+            for row_indices, row_scores in zip(indices.tolist(), scores.tolist())
+        ]
+        return top_ids, scores
 
     def match(
-        self, embedding, user_ids, feature_matrix, threshold=SIMILARITY_THRESHOLD
+        self,
+        embedding,
+        user_ids=None,
+        feature_matrix=None,
+        threshold=SIMILARITY_THRESHOLD,
     ):
-        """Match face embedding against feature matrix"""
-        embedding = cp.asarray(embedding).reshape(1, -1)
-        similarities = self.cosine_similarity_cupy(embedding, feature_matrix)[0]
-        max_index = int(cp.argmax(similarities).item())
-        max_score = similarities[max_index].item()
-
-        sim_user_id = user_ids[max_index] if max_score >= threshold else "Unknown"
-        return sim_user_id, max_score
+        """Match a single face embedding against the gallery"""
+        if feature_matrix is not None and feature_matrix is not self._source:
+            self.set_gallery(user_ids, feature_matrix)
+        top_ids, top_scores = self.match_batch([embedding], threshold=threshold)
+        return top_ids[0][0], float(top_scores[0][0])
@@ -0,0 +1,135 @@
+import numpy as np
+from utils.geometry_utils import calculate_iou_matrix
+from config.constants import (
+    TRACKER_IOU_THRESHOLD,
+    TRACKER_HIGH_SCORE,
+    TRACKER_MAX_MISSES,
+    TRACKER_REFRESH_INTERVAL,
+    TRACKER_RETRY_INTERVAL,
+    TRACKER_MIN_CONFIDENCE,
+)
+
+
+class Track:
+    """A face followed across frames, with its cached identity"""
+
+    def __init__(self, track_id, face):
+        self.track_id = track_id
+        self.face = face
+        self.bbox = np.asarray(face.bbox, dtype=np.float32)
+        self.velocity = np.zeros(4, dtype=np.float32)
+        self.hits = 1
+        self.misses = 0
+        self.identity = None
+        self.score = 0.0
+        self.recognized_at = None
+
+    def predict(self):
+        """Box expected in the next processed frame (constant velocity)"""
+        return self.bbox + self.velocity
+
+    def update(self, face):
+        bbox = np.asarray(face.bbox, dtype=np.float32)
+        # Smooth the motion estimate so detector jitter does not dominate it
+        self.velocity = 0.5 * self.velocity + 0.5 * (bbox - self.bbox)
+        self.bbox = bbox
+        self.face = face
+        self.hits += 1
+        self.misses = 0
+
+    def mark_missed(self):
+        self.misses += 1
+        self.bbox = self.predict()
+        self.face = None
+
+
+class FaceTracker:
+    """Per-camera IoU face tracker with a ByteTrack-style low-score pass"""
+
+    def __init__(
+        self,
+        iou_threshold=TRACKER_IOU_THRESHOLD,
+        high_score=TRACKER_HIGH_SCORE,
+        max_misses=TRACKER_MAX_MISSES,
+        refresh_interval=TRACKER_REFRESH_INTERVAL,
+        retry_interval=TRACKER_RETRY_INTERVAL,
+        min_confidence=TRACKER_MIN_CONFIDENCE,
+    ):
+        self.iou_threshold = iou_threshold
+        self.high_score = high_score
+        self.max_misses = max_misses
+        self.refresh_interval = refresh_interval
+        self.retry_interval = retry_interval
+        self.min_confidence = min_confidence
+        self.tracks = []
+        self.next_track_id = 1
+
+    def reset(self):
+        """Forget all tracks, e.g. after the stream reconnects"""
+        self.tracks = []
+
+    def _associate(self, tracks, faces):
+        """Greedy IoU matching, best overlaps first: (pairs, tracks, faces) left"""
+        if not tracks or not faces:
+            return [], list(tracks), list(faces)
+
+        ious = calculate_iou_matrix(
+            [track.predict() for track in tracks], [face.bbox for face in faces]
+        )
+        matches, used_tracks, used_faces = [], set(), set()
+        for flat in np.argsort(-ious, axis=None):
+            t, f = divmod(int(flat), len(faces))
+            if ious[t, f] < self.iou_threshold:
+                break
+            if t in used_tracks or f in used_faces:
+                continue
+            used_tracks.add(t)
+            used_faces.add(f)
+            matches.append((tracks[t], faces[f]))
+
+        return (
+            matches,
+            [track for t, track in enumerate(tracks) if t not in used_tracks],
+            [face for f, face in enumerate(faces) if f not in used_faces],
+        )
+
+    def update(self, faces):
+        """Associate detections with the tracks; returns the tracks seen"""
+        # Low-score detections only keep unmatched tracks alive, never start one
+        high = [face for face in faces if face.det_score >= self.high_score]
+        low = [face for face in faces if face.det_score < self.high_score]
+
+        matches, remaining, new_faces = self._associate(self.tracks, high)
+        low_matches, unmatched, _ = self._associate(remaining, low)
+
+        for track, face in matches + low_matches:
+            track.update(face)
+        for track in unmatched:
+            track.mark_missed()
+
+        for face in new_faces:
+            self.tracks.append(Track(self.next_track_id, face))
+            self.next_track_id += 1
+
+        self.tracks = [
+            track for track in self.tracks if track.misses <= self.max_misses
+        ]
+        return [track for track in self.tracks if track.misses == 0]
+
+    def invalidate_identities(self):
+        """Recognize every track again, e.g. after the gallery changed"""
+        for track in self.tracks:
+            track.recognized_at = None
+
+    def needs_recognition(self, track, now):
+        """Whether the track's identity must be (re)computed this frame"""
+        if track.recognized_at is None:
+            return True
+        confident = track.identity != "Unknown" and track.score >= self.min_confidence
+        interval = self.refresh_interval if confident else self.retry_interval
+        return now - track.recognized_at >= interval
+
+    def set_identity(self, track, identity, score, now):
+        track.identity = identity
+        track.score = score
+        track.recognized_at = now
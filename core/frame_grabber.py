@@ -0,0 +1,131 @@
+import os
+import threading
+import time
+import cv2
+
+
+class FrameGrabber:
+    """
+    Background capture thread that keeps only the newest decoded frame
+
+    Decoding runs continuously on its own thread so the RTSP buffer never
+    backs up behind inference; the consumer always gets the freshest frame.
+    Frames it left out on purpose (skip_frames) are counted as skipped, the
+    others it never saw as dropped. Local video files are
+    paced at their native FPS (and can loop) so they behave like a camera.
+    """
+
+    def __init__(self, source, loop=False):
+        self.source = source
+        self.is_file = os.path.isfile(str(source))
+        self.loop = loop
+        self.capture = None
+        self.thread = None
+        self.running = False
+        self.ended = False
+        self.condition = threading.Condition()
+        self.frame = None
+        self.timestamp = 0.0
+        self.seq = 0
+        self.last_read_seq = 0
+        self.frames_decoded = 0
+        self.frames_read = 0
+        self.frames_skipped = 0
+        self.frames_dropped = 0
+
+    def start(self):
+        """Open the source and start the capture thread; False if it cannot open"""
+        self.capture = cv2.VideoCapture(str(self.source), cv2.CAP_FFMPEG)
+        self.capture.set(cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY)
+        if not self.capture.isOpened():
+            self.capture.release()
+            return False
+
+        self.running = True
+        self.ended = False
+        self.thread = threading.Thread(
+            target=self._run, name=f"grabber-{self.source}", daemon=True
+        )
+        self.thread.start()
+        return True
+
+    def _run(self):
+        fps = self.capture.get(cv2.CAP_PROP_FPS) if self.is_file else 0
+        interval = 1.0 / fps if fps and fps > 0 else 0
+        next_time = time.perf_counter()
+
+        while self.running:
+            ret, frame = self.capture.read()
+            if not ret:
+                if self.is_file and self.loop:
+                    self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    continue
+                break
+
+            with self.condition:
+                self.frame = frame
+                self.timestamp = time.time()
+                self.seq += 1
+                self.frames_decoded += 1
+                self.condition.notify_all()
+
+            if interval:
+                next_time += interval
+                delay = next_time - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    next_time = time.perf_counter()
+
+        # Released here, once no read() is in flight, even if stop() gave up
+        self.capture.release()
+        with self.condition:
+            self.ended = True
+            self.condition.notify_all()
+
+    def read(self, skip_frames=0, timeout=10.0):
+        """
+        Return the newest frame at least skip_frames + 1 frames after the last read
+
+        Args:
+            skip_frames: Minimum number of frames to leave out between reads
+            timeout: Seconds to wait for a new frame
+
+        Returns:
+            Tuple of (frame, capture_timestamp), or (None, None) if the stream
+            ended or stalled
+        """
+        wanted = self.last_read_seq + 1 + skip_frames
+        with self.condition:
+            ready = self.condition.wait_for(
+                lambda: self.seq >= wanted or self.ended, timeout=timeout
+            )
+            if not ready or self.seq < wanted:
+                return None, None
+            # Of the frames never seen, the first skip_frames were not wanted
+            unseen = self.seq - self.last_read_seq - 1
+            self.frames_skipped += min(unseen, skip_frames)
+            self.frames_dropped += max(0, unseen - skip_frames)
+            self.last_read_seq = self.seq
+            self.frames_read += 1
+            return self.frame, self.timestamp
+
+    def stats(self):
+        """Decoded, read, skipped and dropped frame counters"""
+        with self.condition:
+            return {
+                "decoded": self.frames_decoded,
+                "read": self.frames_read,
+                "skipped": self.frames_skipped,
+                "dropped": self.frames_dropped,
+            }
+
+    def stop(self):
+        """Stop the capture thread, which releases the capture as it exits"""
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout=5)
+            if self.thread.is_alive():
+                print(
+                    f"Capture of {self.source} still blocked, released when it returns"
+                )
@@ -0,0 +1,404 @@
+import os
+import queue
+import time
+from multiprocessing import Lock, Process, Queue, RawArray, RawValue, shared_memory
+
+import numpy as np
+from config.constants import (
+    INFERENCE_BATCH_SIZE,
+    INFERENCE_BATCH_WAIT,
+    INFERENCE_SLOTS,
+    INFERENCE_SLOT_BYTES,
+    INFERENCE_SLOT_TIMEOUT,
+    INFERENCE_TIMEOUT,
+    INFERENCE_WORKERS,
+)
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # the pid was reused by another user's process
+    return True
+
+
+class ReaderQueue:
+    """
+    Multiprocessing queue read by blocking in get(timeout), one reader at a time
+
+    A process killed while blocked in get() keeps the queue's read lock and
+    every other reader starves, so the pid of the reader is kept in shared
+    memory and the supervisor frees the locks once that process is gone.
+    """
+
+    def __init__(self):
+        self.items = Queue()
+        self.lock = Lock()
+        self.reader = RawValue("i", 0)
+
+    def put(self, item):
+        self.items.put(item)
+
+    def get(self, timeout):
+        """Next item within timeout, None if none came"""
+        deadline = time.perf_counter() + timeout
+        if not self.lock.acquire(timeout=timeout):
+            return None
+        self.reader.value = os.getpid()
+        try:
+            return self.items.get(timeout=max(0.0, deadline - time.perf_counter()))
+        except queue.Empty:
+            return None
+        finally:
+            self.reader.value = 0
+            self.lock.release()
+
+    def recover(self):
+        """Free the read locks of a reader that died in get(); True if one did"""
+        pid = self.reader.value
+        if not pid or _alive(pid):
+            return False
+        self.reader.value = 0
+        # Only the holder of self.lock takes the queue's own read lock, so
+        # whether free or still held by the dead reader, it is safe to drop
+        self.items._rlock.acquire(block=False)
+        self.items._rlock.release()
+        self.lock.release()
+        return True
+
+
+class FrameSlotPool:
+    """
+    Fixed pool of frame buffers in shared memory, handed out by index
+
+    The inference worker holding each slot is recorded in shared memory, so
+    the slots of a worker that dies mid-batch can be reclaimed.
+    """
+
+    def __init__(self, slots=INFERENCE_SLOTS, slot_bytes=INFERENCE_SLOT_BYTES):
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self.shm = shared_memory.SharedMemory(create=True, size=slots * slot_bytes)
+        self.name = self.shm.name
+        self.free_slots = ReaderQueue()
+        for slot in range(slots):
+            self.free_slots.put(slot)
+        # Inference worker processing each slot, -1 for none
+        self.holders = RawArray("i", [-1] * slots)
+
+    def _buffer(self):
+        if self.shm is None:
+            # Workers share the parent's resource tracker, see SharedGallery
+            self.shm = shared_memory.SharedMemory(name=self.name)
+        return self.shm.buf
+
+    def write(self, slot, frame):
+        """Copy a frame into a slot"""
+        view = np.ndarray(
+            frame.shape,
+            dtype=frame.dtype,
+            buffer=self._buffer(),
+            offset=slot * self.slot_bytes,
+        )
+        view[...] = frame
+
+    def view(self, slot, shape, dtype):
+        """Zero-copy view of the frame stored in a slot"""
+        return np.ndarray(
+            shape, dtype=dtype, buffer=self._buffer(), offset=slot * self.slot_bytes
+        )
+
+    def acquire(self, timeout=INFERENCE_SLOT_TIMEOUT):
+        """A free slot, or None when none frees up within timeout"""
+        return self.free_slots.get(timeout)
+
+    def take(self, slot, worker):
+        """Record that an inference worker now holds a slot"""
+        self.holders[slot] = worker
+
+    def release(self, slot):
+        self.holders[slot] = -1
+        self.free_slots.put(slot)
+
+    def reclaim(self, worker):
+        """Free the slots a dead inference worker held; returns their count"""
+        slots = [slot for slot in range(self.slots) if self.holders[slot] == worker]
+        for slot in slots:
+            self.release(slot)
+        return len(slots)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["shm"] = None
+        return state
+
+    def close(self, unlink=False):
+        if self.shm is not None:
+            self.shm.close()
+            if unlink:
+                self.shm.unlink()
+            self.shm = None
+
+
+class InferenceServer:
+    """
+    Shared detection and embedding service for all camera processes
+
+    Camera processes copy frames into a shared-memory slot and post the slot
+    index; one or a few inference workers, each holding the only copy of the
+    models in its process, pull requests from several cameras at once, detect
+    faces per frame, embed every face of the batch in one recognition call
+    and post the faces back on each camera's own result queue. Faces already
+    detected are aligned on the camera side and only their crops are sent.
+
+    The main process supervises the workers as StreamScheduler does its
+    own: a worker that dies is restarted and the frame slots it held are
+    returned to the pool. Its pending requests time out on the cameras. The
+    read locks of any process that dies blocked on one of the queues, camera
+    or worker, are freed on the same rounds.
+    """
+
+    # Minimum seconds between two restarts of a crashed worker
+    RESTART_DELAY = 5.0
+
+    def __init__(
+        self,
+        camera_ids,
+        batch_size=INFERENCE_BATCH_SIZE,
+        batch_wait=INFERENCE_BATCH_WAIT,
+        workers=INFERENCE_WORKERS,
+    ):
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.workers = workers
+        self.pool = FrameSlotPool()
+        self.request_queue = ReaderQueue()
+        self.result_queues = {camera_id: ReaderQueue() for camera_id in camera_ids}
+        # Side of the aligned face crops, published once a worker loads models
+        self.crop_size = RawValue("i", 0)
+        self.processes = []
+        self.restarted_at = [0.0] * workers
+
+    def client(self, camera_id):
+        """Face analyzer stand-in for a camera process"""
+        return RemoteFaceAnalyzer(
+            camera_id,
+            self.pool,
+            self.request_queue,
+            self.result_queues[camera_id],
+            self.crop_size,
+        )
+
+    def _start_worker(self, worker, stop_event):
+        process = Process(
+            target=self.run,
+            args=(worker, stop_event),
+            name=f"inference-worker-{worker}",
+        )
+        process.start()
+        return process
+
+    def start(
+        self, stop_event, face_analyzer_factory, thread_budget=None, first_slot=0
+    ):
+        """
+        Start the inference workers
+
+        Args:
+            thread_budget: Optional ThreadBudget; worker i takes budget slot
+                first_slot + i
+        """
+        self.face_analyzer_factory = face_analyzer_factory
+        self.thread_budget = thread_budget
+        self.first_slot = first_slot
+        self.processes = [
+            self._start_worker(worker, stop_event) for worker in range(self.workers)
+        ]
+
+    def run(self, worker, stop_event):
+        """Inference worker process: take its share of the cores, then serve"""
+        if self.thread_budget is not None:
+            self.thread_budget.apply(self.first_slot + worker)
+        self.serve(stop_event, self.face_analyzer_factory, worker)
+
+    def supervise(self, stop_event):
+        """Restart crashed workers and free dead readers' locks until stopped"""
+        while not stop_event.wait(1.0):
+            self._restart_crashed(stop_event)
+            self._recover_readers()
+
+    def join(self):
+        for process in self.processes:
+            process.join()
+
+    def _restart_crashed(self, stop_event):
+        for worker, process in enumerate(self.processes):
+            if process.is_alive() or stop_event.is_set():
+                continue
+            if time.monotonic() - self.restarted_at[worker] < self.RESTART_DELAY:
+                continue
+            reclaimed = self.pool.reclaim(worker)
+            print(
+                f"Inference worker {worker} exited with code {process.exitcode}, "
+                f"restarting; reclaimed {reclaimed} frame slots"
+            )
+            self.restarted_at[worker] = time.monotonic()
+            self.processes[worker] = self._start_worker(worker, stop_event)
+
+    def _recover_readers(self):
+        queues = [self.request_queue, self.pool.free_slots]
+        queues.extend(self.result_queues.values())
+        recovered = sum(reader_queue.recover() for reader_queue in queues)
+        if recovered:
+            print(f"Freed the read locks of {recovered} dead queue readers")
+
+    def serve(self, stop_event, face_analyzer_factory, worker=0):
+        """Inference worker loop: batch requests across cameras until stopped"""
+        face_analyzer = face_analyzer_factory()
+        self.crop_size.value = getattr(face_analyzer, "crop_size", 0)
+        while not stop_event.is_set():
+            batch = self._next_batch(worker)
+            if batch:
+                self._process_batch(face_analyzer, batch)
+
+    def _next_batch(self, worker):
+        """Wait for one request, then gather more for up to batch_wait seconds"""
+        batch = []
+        request = self.request_queue.get(1.0)
+        deadline = time.perf_counter() + self.batch_wait
+        while request is not None:
+            slot = request[3]
+            if slot is not None:
+                self.pool.take(slot, worker)
+            batch.append(request)
+            if len(batch) >= self.batch_size:
+                break
+            remaining = deadline - time.perf_counter()
+            request = self.request_queue.get(max(0.0, remaining))
+        return batch
+
+    def _process_batch(self, face_analyzer, batch):
+        items = []
+        for camera_id, seq, op, slot, shape, dtype, inline_frame, faces, rois in batch:
+            frame = (
+                inline_frame
+                if inline_frame is not None
+                else self.pool.view(slot, shape, dtype)
+            )
+            if op not in ("embed", "embed_crops"):
+                try:
+                    faces = face_analyzer.detect(frame, rois)
+                except Exception as e:
+                    print(f"Inference error for camera {camera_id}: {e}")
+                    faces = []
+            items.append((frame, faces))
+
+        # Detect-only requests are left out of the embedding batch; the
+        # frame of an "embed_crops" request is its faces' aligned crops
+        try:
+            crops, targets = [], []
+            for (_, _, op, *_), (frame, faces) in zip(batch, items):
+                if op == "detect":
+                    continue
+                crops.extend(
+                    frame if op == "embed_crops" else face_analyzer.crop(frame, faces)
+                )
+                targets.extend(faces)
+            face_analyzer.embed_crops(crops, targets)
+        except Exception as e:
+            print(f"Embedding error for batch of {len(batch)}: {e}")
+            items = [(frame, []) for frame, _ in items]
+
+        for (camera_id, seq, _, slot, *_), (_, faces) in zip(batch, items):
+            if slot is not None:
+                self.pool.release(slot)
+            self.result_queues[camera_id].put((seq, faces))
+
+
+class RemoteFaceAnalyzer:
+    """FaceAnalyzer interface backed by the shared inference server"""
+
+    def __init__(self, camera_id, pool, request_queue, result_queue, crop_size):
+        self.camera_id = camera_id
+        self.pool = pool
+        self.request_queue = request_queue
+        self.result_queue = result_queue
+        self.crop_size = crop_size
+        self.seq = 0
+
+    def get_faces(self, frame, rois=None, timeout=INFERENCE_TIMEOUT):
+        """Extract faces from frame via the inference server"""
+        return self._request("analyze", frame, None, timeout, rois)
+
+    def detect(self, frame, rois=None, timeout=INFERENCE_TIMEOUT):
+        """Detect faces without running recognition"""
+        return self._request("detect", frame, None, timeout, rois)
+
+    def embed(self, frame, faces, timeout=INFERENCE_TIMEOUT):
+        """
+        Compute embeddings for already detected faces of frame
+
+        Returns:
+            Copies of faces with .embedding set, in the same order
+        """
+        if not faces:
+            return faces
+        size = self.crop_size.value
+        if not size or any(face.kps is None for face in faces):
+            return self._request("embed", frame, faces, timeout)
+
+        # Only the aligned crops travel, inline, instead of the whole frame
+        from insightface.utils import face_align
+
+        crops = np.stack(
+            [face_align.norm_crop(frame, face.kps, size) for face in faces]
+        )
+        return self._request("embed_crops", crops, faces, timeout)
+
+    def _request(self, op, frame, faces, timeout, rois=None):
+        self.seq += 1
+        slot = None
+        if op != "embed_crops" and frame.nbytes <= self.pool.slot_bytes:
+            slot = self.pool.acquire()
+        if slot is None:
+            # Oversized frames, and frames finding no free slot in time,
+            # travel through the queue instead
+            request = (
+                self.camera_id,
+                self.seq,
+                op,
+                None,
+                None,
+                None,
+                frame,
+                faces,
+                rois,
+            )
+        else:
+            self.pool.write(slot, frame)
+            request = (
+                self.camera_id,
+                self.seq,
+                op,
+                slot,
+                frame.shape,
+                frame.dtype.str,
+                None,
+                faces,
+                rois,
+            )
+        self.request_queue.put(request)
+
+        # Discard late answers to requests that already timed out
+        deadline = time.perf_counter() + timeout
+        while True:
+            result = self.result_queue.get(max(0.0, deadline - time.perf_counter()))
+            if result is None:
+                print(f"Inference server timed out for camera {self.camera_id}")
+                return []
+            seq, faces = result
+            if seq == self.seq:
+                return faces
@@ -0,0 +1,100 @@
+import math
+import queue
+import re
+import time
+from multiprocessing import Queue
+import cv2
+import numpy as np
+from utils.image_utils import ImageUtils
+from config.constants import (
+    VIEWER_FPS,
+    VIEWER_TILE_WIDTH,
+    VIEWER_TILE_HEIGHT,
+    VIEWER_COLUMNS,
+)
+
+
+class MosaicViewer:
+    """
+    Single display process showing every camera in one mosaic window
+
+    Camera processes publish a downscaled thumbnail at most VIEWER_FPS times
+    per second and never block on the viewer: when it falls behind, the
+    thumbnail is dropped. The viewer keeps the latest thumbnail per camera
+    and redraws the mosaic at the same capped rate.
+    """
+
+    WINDOW_NAME = "Cameras"
+
+    def __init__(self, camera_urls, fps=VIEWER_FPS):
+        self.camera_urls = list(camera_urls)
+        self.interval = 1.0 / fps if fps > 0 else 0
+        self.tile_size = (VIEWER_TILE_WIDTH, VIEWER_TILE_HEIGHT)
+        self.columns = max(1, min(VIEWER_COLUMNS, len(self.camera_urls)))
+        self.thumbnail_queue = Queue(maxsize=2 * len(self.camera_urls))
+        # Per camera, as a worker process may run several cameras
+        self.last_publish_time = {}
+
+    def due(self, camera_url):
+        """Whether this camera should publish its next frame"""
+        last = self.last_publish_time.get(camera_url, 0.0)
+        return time.monotonic() - last >= self.interval
+
+    def publish(self, camera_url, frame):
+        """Send a thumbnail of the annotated frame if the rate limit allows it"""
+        if not self.due(camera_url):
+            return False
+        self.last_publish_time[camera_url] = time.monotonic()
+
+        thumbnail = cv2.resize(frame, self.tile_size, interpolation=cv2.INTER_AREA)
+        try:
+            self.thumbnail_queue.put_nowait((camera_url, thumbnail))
+        except queue.Full:
+            return False  # Viewer is behind, drop rather than stall the camera
+        return True
+
+    @staticmethod
+    def _label(camera_url):
+        ip_match = re.search(r"(\d+\.\d+\.\d+\.\d+)", camera_url)
+        return ip_match.group(1) if ip_match else camera_url
+
+    def run(self, stop_event):
+        """Viewer process loop: collect thumbnails and redraw the mosaic"""
+        tile_width, tile_height = self.tile_size
+        blank = np.zeros((tile_height, tile_width, 3), dtype=np.uint8)
+        grid_size = (math.ceil(len(self.camera_urls) / self.columns), self.columns)
+        tiles = {}
+
+        cv2.namedWindow(self.WINDOW_NAME, cv2.WINDOW_NORMAL)
+        while not stop_event.is_set():
+            deadline = time.monotonic() + self.interval
+            while True:
+                try:
+                    camera_url, thumbnail = self.thumbnail_queue.get(
+                        timeout=max(0.0, deadline - time.monotonic())
+                    )
+                except queue.Empty:
+                    break
+                cv2.putText(
+                    thumbnail,
+                    self._label(camera_url),
+                    (8, 20),
+                    cv2.FONT_HERSHEY_SIMPLEX,
+                    0.5,
+                    (255, 255, 255),
+                    1,
+                    cv2.LINE_AA,
+                )
+                tiles[camera_url] = thumbnail
+
+            montage = ImageUtils.create_montage(
+                [tiles.get(url, blank) for url in self.camera_urls],
+                grid_size=grid_size,
+                tile_size=self.tile_size,
+            )
+            cv2.imshow(self.WINDOW_NAME, montage)
+            if cv2.waitKey(1) == ord("q"):
+                print("Exit command received.")
+                stop_event.set()
+
+        cv2.destroyWindow(self.WINDOW_NAME)
@@ -0,0 +1,106 @@
+import time
+import cv2
+import numpy as np
+from config.constants import (
+    MOTION_FRAME_WIDTH,
+    MOTION_PIXEL_THRESHOLD,
+    MOTION_MIN_CHANGED,
+    MOTION_HOLD_SECONDS,
+    MOTION_KEYFRAME_INTERVAL,
+    MOTION_MAX_SKIP_FRAMES,
+)
+
+
+class MotionGate:
+    """
+    Cheap per-frame decision whether to run face detection
+
+    Each frame is shrunk to a tiny grayscale image and differenced against
+    the previous one. Detection runs while there is motion, for
+    MOTION_HOLD_SECONDS after the last motion or face, and on a keyframe
+    every MOTION_KEYFRAME_INTERVAL seconds so people sitting still keep
+    being seen. While a camera stays idle the frame skip doubles from the
+    camera's base skip up to MOTION_MAX_SKIP_FRAMES, and drops back to the
+    base skip as soon as anything moves.
+    """
+
+    def __init__(
+        self,
+        min_skip_frames,
+        max_skip_frames=MOTION_MAX_SKIP_FRAMES,
+        frame_width=MOTION_FRAME_WIDTH,
+        pixel_threshold=MOTION_PIXEL_THRESHOLD,
+        min_changed=MOTION_MIN_CHANGED,
+        hold_seconds=MOTION_HOLD_SECONDS,
+        keyframe_interval=MOTION_KEYFRAME_INTERVAL,
+    ):
+        self.min_skip_frames = min_skip_frames
+        self.max_skip_frames = max(min_skip_frames, max_skip_frames)
+        self.frame_width = frame_width
+        self.pixel_threshold = pixel_threshold
+        self.min_changed = min_changed
+        self.hold_seconds = hold_seconds
+        self.keyframe_interval = keyframe_interval
+        self.skip_frames = min_skip_frames
+        self.reference = None
+        self.last_activity = 0.0
+        self.last_analyzed = 0.0
+        self.frames_checked = 0
+        self.frames_analyzed = 0
+        self.frames_with_motion = 0
+
+    def reset(self):
+        """Drop the reference frame, e.g. after the stream reconnects"""
+        self.reference = None
+        self.skip_frames = self.min_skip_frames
+
+    def _motion(self, frame):
+        """Fraction of tiny-frame pixels that changed since the last check"""
+        height, width = frame.shape[:2]
+        size = (self.frame_width, max(1, height * self.frame_width // width))
+        small = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+        reference, self.reference = self.reference, gray
+        if reference is None or reference.shape != gray.shape:
+            return 1.0
+        diff = cv2.absdiff(gray, reference)
+        return np.count_nonzero(diff > self.pixel_threshold) / diff.size
+
+    def should_analyze(self, frame, now=None):
+        """Whether face detection should run on this frame"""
+        now = time.time() if now is None else now
+        self.frames_checked += 1
+
+        if self._motion(frame) >= self.min_changed:
+            self.frames_with_motion += 1
+            self.last_activity = now
+
+        active = now - self.last_activity < self.hold_seconds
+        keyframe = now - self.last_analyzed >= self.keyframe_interval
+        if active:
+            self.skip_frames = self.min_skip_frames
+        else:
+            self.skip_frames = min(self.max_skip_frames, self.skip_frames * 2 + 1)
+
+        if active or keyframe:
+            self.frames_analyzed += 1
+            self.last_analyzed = now
+            return True
+        return False
+
+    def record_faces(self, face_count, now=None):
+        """Faces in view keep the camera active like motion does"""
+        if face_count:
+            self.last_activity = time.time() if now is None else now
+            self.skip_frames = self.min_skip_frames
+
+    def stats(self):
+        """Checked/analyzed frame counters and the detector duty cycle"""
+        return {
+            "checked": self.frames_checked,
+            "analyzed": self.frames_analyzed,
+            "motion": self.frames_with_motion,
+            "duty_cycle": self.frames_analyzed / max(self.frames_checked, 1),
+            "skip_frames": self.skip_frames,
+        }
@@ -0,0 +1,85 @@
+import hashlib
+import time
+from multiprocessing import Lock, RawArray
+import numpy as np
+from config.constants import (
+    RECOGNITION_COOLDOWN,
+    COOLDOWN_DEDUP_POLICY,
+    COOLDOWN_TABLE_SLOTS,
+    COOLDOWN_TABLE_STRIPES,
+)
+
+
+class RecognitionCooldown:
+    """Recognition cooldown shared by all camera processes"""
+
+    # Policies key events by identity and camera, identity and block (so
+    # overlapping cameras report a person once) or identity alone. Last event
+    # times live in a fixed size shared table of separately locked stripes
+    POLICIES = ("camera", "block", "identity")
+    DTYPE = np.dtype([("key", "<u8"), ("time", "<f8")])
+
+    def __init__(
+        self,
+        cooldown=RECOGNITION_COOLDOWN,
+        policy=COOLDOWN_DEDUP_POLICY,
+        slots=COOLDOWN_TABLE_SLOTS,
+        stripes=COOLDOWN_TABLE_STRIPES,
+    ):
+        if policy not in self.POLICIES:
+            raise ValueError(
+                f"Unknown cooldown dedup policy {policy!r}, "
+                f"expected one of {', '.join(self.POLICIES)}"
+            )
+        self.cooldown = cooldown
+        self.policy = policy
+        self.stripes = stripes
+        self.stripe_slots = max(1, slots // stripes)
+        self.raw = RawArray("b", stripes * self.stripe_slots * self.DTYPE.itemsize)
+        self.locks = [Lock() for _ in range(stripes)]
+        self._table = None
+        self.fired = 0
+        self.suppressed = 0
+
+    @property
+    def table(self):
+        if self._table is None:
+            self._table = np.frombuffer(self.raw, dtype=self.DTYPE).reshape(
+                self.stripes, self.stripe_slots
+            )
+        return self._table
+
+    def _key(self, identity, camera, block):
+        """Process-independent 64-bit hash of the cooldown key, never 0"""
+        scope = {"camera": camera, "block": block}.get(self.policy)
+        value = repr((str(identity), None if scope is None else str(scope)))
+        digest = hashlib.blake2b(value.encode(), digest_size=8).digest()
+        return int.from_bytes(digest, "little") or 1
+
+    def should_fire(self, identity, camera, block=None, now=None):
+        """Record an event unless the cooldown suppresses it; True if it fired"""
+        # Check and update are atomic across processes: one camera fires per key
+        now = time.time() if now is None else now
+        key = self._key(identity, camera, block)
+        stripe = key % self.stripes
+        with self.locks[stripe]:
+            slots = self.table[stripe]
+            live = slots["time"] > now - self.cooldown
+            if np.any((slots["key"] == key) & live):
+                self.suppressed += 1
+                return False
+            # Reuse a free or expired slot; evict the oldest when full
+            free = np.flatnonzero(~live | (slots["key"] == 0))
+            index = free[0] if len(free) else int(np.argmin(slots["time"]))
+            slots[index] = (key, now)
+        self.fired += 1
+        return True
+
+    def stats(self):
+        """Events fired and suppressed by this process"""
+        return {"fired": self.fired, "suppressed": self.suppressed}
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_table"] = None
+        return state
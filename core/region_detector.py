@@ -1,17 +1,32 @@
 import cv2
 import numpy as np
 from typing import List, Optional, Tuple
+from utils.image_utils import ImageUtils
+from config.constants import (
+    HEADLESS,
+    REGION_MAP_SCALE,
+    ROI_MARGIN,
+    ROI_MAX_CROPS,
+    ROI_MAX_AREA,
+)
 from utils.geometry_utils import (
     get_face_center,
-    is_point_in_polygon,
     calculate_polygon_center,
+    merge_rectangles,
 )
 
 
 class RegionDetector:
-    def __init__(self):
+    def __init__(self, draw: bool = not HEADLESS, map_scale: float = REGION_MAP_SCALE):
+        self.draw = draw
+        self.map_scale = map_scale
         self.block_points = None
         self.seat_points = None
+        self.block_map = None
+        self.seat_map = None
+        self.block_labels = np.array([None], dtype=object)
+        self.seat_labels = np.array([None], dtype=object)
+        self.detection_rois = None
         self.last_frame_width = 0
         self.last_frame_height = 0
 
@@ -33,9 +48,114 @@ class RegionDetector:
                     seat_regions, width, height
                 )
 
+            self._build_label_maps(width, height)
+            self.detection_rois = self._build_detection_rois(width, height)
             self.last_frame_width = width
             self.last_frame_height = height
 
+    def _build_label_maps(self, width: int, height: int) -> None:
+        """Rasterize regions into label maps, 0 = none, i = i-th region"""
+        # Painted last to first, so the first region listed wins an overlap
+        scale = self.map_scale
+        map_size = (
+            max(1, int(round(height * scale))),
+            max(1, int(round(width * scale))),
+        )
+
+        self.block_map, self.block_labels = None, np.array([None], dtype=object)
+        if self.block_points:
+            self.block_map = np.zeros(map_size, dtype=np.uint16)
+            for label in range(len(self.block_points), 0, -1):
+                points = self.block_points[label - 1][1]
+                scaled = np.round(points * scale).astype(np.int32)
+                cv2.fillPoly(self.block_map, [scaled], label)
+            self.block_labels = np.array(
+                [None] + [block_no for block_no, _ in self.block_points], dtype=object
+            )
+
+        self.seat_map, self.seat_labels = None, np.array([None], dtype=object)
+        if self.seat_points:
+            self.seat_map = np.zeros(map_size, dtype=np.uint16)
+            for label in range(len(self.seat_points), 0, -1):
+                _, x_min, y_min, x_max, y_max = self.seat_points[label - 1]
+                # Seat bounds are exclusive, as in check_seat_region
+                self.seat_map[
+                    int((y_min + 1) * scale) : int((y_max - 1) * scale) + 1,
+                    int((x_min + 1) * scale) : int((x_max - 1) * scale) + 1,
+                ] = label
+            self.seat_labels = np.array(
+                [None] + [seat[0] for seat in self.seat_points], dtype=object
+            )
+
+    def _build_detection_rois(
+        self,
+        width: int,
+        height: int,
+        margin: float = ROI_MARGIN,
+        max_crops: int = ROI_MAX_CROPS,
+        max_area: float = ROI_MAX_AREA,
+    ) -> Optional[List[List[int]]]:
+        """
+        Crop rectangles around all regions for region-of-interest detection
+
+        Returns:
+            Disjoint [x1, y1, x2, y2] crops, or None to detect on the whole
+            frame (no regions, or crops covering more than max_area of it)
+        """
+        rects = [
+            [*points.reshape(-1, 2).min(axis=0), *points.reshape(-1, 2).max(axis=0)]
+            for _, points in self.block_points or []
+        ]
+        rects += [
+            [x_min, y_min, x_max, y_max]
+            for _, x_min, y_min, x_max, y_max in (self.seat_points or [])
+        ]
+        if not rects:
+            return None
+
+        pad_x, pad_y = int(margin * width), int(margin * height)
+        rects = [
+            [
+                max(0, int(x1) - pad_x),
+                max(0, int(y1) - pad_y),
+                min(width, int(x2) + pad_x),
+                min(height, int(y2) + pad_y),
+            ]
+            for x1, y1, x2, y2 in rects
+        ]
+        rois = [
+            rect
+            for rect in merge_rectangles(rects, max_crops)
+            if rect[2] > rect[0] and rect[3] > rect[1]
+        ]
+        covered = sum((x2 - x1) * (y2 - y1) for x1, y1, x2, y2 in rois)
+        if not rois or covered > max_area * width * height:
+            return None
+        return rois
+
+    def _lookup(self, label_map, labels, centers: np.ndarray) -> List:
+        if label_map is None or not len(centers):
+            return [None] * len(centers)
+        scaled = (centers * self.map_scale).astype(np.intp)
+        xs = np.clip(scaled[:, 0], 0, label_map.shape[1] - 1)
+        ys = np.clip(scaled[:, 1], 0, label_map.shape[0] - 1)
+        return labels[label_map[ys, xs]].tolist()
+
+    def lookup_regions(self, face_centers) -> Tuple[List, List]:
+        """Block and seat ids (None outside any region) of many (x, y) centers"""
+        centers = np.asarray(face_centers, dtype=np.float32).reshape(-1, 2)
+        return (
+            self._lookup(self.block_map, self.block_labels, centers),
+            self._lookup(self.seat_map, self.seat_labels, centers),
+        )
+
+    def draw_regions(self, frame: np.ndarray) -> None:
+        """Draw all block and seat regions onto the frame once"""
+        if self.draw:
+            ImageUtils.draw_regions(
+                frame, self.block_points or [], self.seat_points or []
+            )
+
     def _convert_block_regions(
         self, block_regions: List, width: int, height: int
     ) -> List:
@@ -74,13 +194,14 @@ class RegionDetector:
         if not self.block_points:
             return None
 
-        for block_no, points in self.block_points:
-            cv2.polylines(
-                frame, [points], isClosed=True, color=(0, 255, 0), thickness=2
-            )
-            if is_point_in_polygon(face_center, points):
-                return block_no
-        return None
+        if self.draw:
+            for _, points in self.block_points:
+                cv2.polylines(
+                    frame, [points], isClosed=True, color=(0, 255, 0), thickness=2
+                )
+        return self._lookup(
+            self.block_map, self.block_labels, np.array([face_center], np.float32)
+        )[0]
 
     def check_seat_region(
         self, frame: np.ndarray, face_center: Tuple[int, int]
@@ -89,25 +210,22 @@ class RegionDetector:
         if not self.seat_points:
             return None
 
-        xcenter, ycenter = face_center
-        for seat in self.seat_points:
-            seat_no, x_min, y_min, x_max, y_max = seat
-
-            cv2.rectangle(frame, (x_min, y_min), (x_max, y_max), (255, 0, 0), 2)
-            cv2.putText(
-                frame,
-                seat_no,
-                (x_min, y_min - 10),
-                cv2.FONT_HERSHEY_SIMPLEX,
-                0.6,
-                (255, 0, 0),
-                2,
-                cv2.LINE_AA,
-            )
-
-            if x_min < xcenter < x_max and y_min < ycenter < y_max:
-                return seat_no
-        return None
+        if self.draw:
+            for seat_no, x_min, y_min, x_max, y_max in self.seat_points:
+                cv2.rectangle(frame, (x_min, y_min), (x_max, y_max), (255, 0, 0), 2)
+                cv2.putText(
+                    frame,
+                    seat_no,
+                    (x_min, y_min - 10),
+                    cv2.FONT_HERSHEY_SIMPLEX,
+                    0.6,
+                    (255, 0, 0),
+                    2,
+                    cv2.LINE_AA,
+                )
+        return self._lookup(
+            self.seat_map, self.seat_labels, np.array([face_center], np.float32)
+        )[0]
 
     def get_all_regions_visualization(self, frame: np.ndarray) -> np.ndarray:
         """Get frame with all regions visualized"""
@@ -0,0 +1,298 @@
+import threading
+import time
+import traceback
+from multiprocessing import Process, RawArray
+import numpy as np
+from core.face_matcher import FaceMatcher
+from core.region_detector import RegionDetector
+from core.video_processor import VideoProcessor
+from data.image_manager import ImageManager
+from data.track_manager import TrackManager
+from config.constants import (
+    MAX_PROCESSES,
+    SCHEDULER_REBALANCE_INTERVAL,
+    SCHEDULER_REBALANCE_THRESHOLD,
+)
+
+
+class StreamScheduler:
+    """Fixed pool of worker processes servicing all camera streams"""
+
+    # Seconds between a worker's checks of its assignment
+    POLL_INTERVAL = 0.5
+    # Minimum seconds between two restarts of a crashed worker or stream
+    RESTART_DELAY = 5.0
+    # Weight of the latest interval in the smoothed camera load
+    LOAD_SMOOTHING = 0.5
+
+    def __init__(
+        self,
+        camera_urls,
+        stream_worker,
+        workers=MAX_PROCESSES,
+        rebalance_interval=SCHEDULER_REBALANCE_INTERVAL,
+        rebalance_threshold=SCHEDULER_REBALANCE_THRESHOLD,
+    ):
+        self.camera_urls = list(camera_urls)
+        self.stream_worker = stream_worker
+        cameras = len(self.camera_urls)
+        self.workers = min(workers, cameras) if workers > 0 else cameras
+        self.rebalance_interval = rebalance_interval
+        self.rebalance_threshold = rebalance_threshold
+        # Worker each camera is assigned to, and the one currently running it;
+        # a moved camera is released by its old worker before the new one opens it
+        self.raw_assignment = RawArray("i", cameras)
+        self.raw_owners = RawArray("i", cameras)
+        # Cumulative processing seconds of each camera, written by its owner
+        self.busy = RawArray("d", cameras)
+        self.assignment[:] = np.arange(cameras) % max(1, self.workers)
+        self.owners[:] = -1
+        self.loads = np.zeros(cameras)
+        self.processes = []
+        self.restarted_at = [0.0] * self.workers
+
+    @property
+    def assignment(self):
+        return np.frombuffer(self.raw_assignment, dtype=np.int32)
+
+    @property
+    def owners(self):
+        return np.frombuffer(self.raw_owners, dtype=np.int32)
+
+    def assigned_to(self, worker):
+        """Indices of the cameras assigned to a worker"""
+        return set(np.flatnonzero(self.assignment == worker).tolist())
+
+    def worker_loads(self):
+        """Smoothed load of every worker, in cores"""
+        return np.bincount(self.assignment, weights=self.loads, minlength=self.workers)
+
+    def _start_worker(self, worker, stop_event):
+        process = Process(
+            target=self.stream_worker.run,
+            args=(worker, self, stop_event),
+            name=f"stream-worker-{worker}",
+        )
+        process.start()
+        return process
+
+    def start(self, stop_event):
+        print(f"Scheduling {len(self.camera_urls)} cameras on {self.workers} workers")
+        self.processes = [
+            self._start_worker(worker, stop_event) for worker in range(self.workers)
+        ]
+
+    def supervise(self, stop_event):
+        """Restart crashed workers and rebalance cameras until stopped"""
+        last_busy = np.array(self.busy)
+        last_time = time.monotonic()
+        while not stop_event.wait(1.0):
+            self._restart_crashed(stop_event)
+
+            now = time.monotonic()
+            if now - last_time < self.rebalance_interval:
+                continue
+            busy = np.array(self.busy)
+            current = (busy - last_busy) / (now - last_time)
+            self.loads += self.LOAD_SMOOTHING * (current - self.loads)
+            last_busy, last_time = busy, now
+            self._rebalance()
+
+    def join(self):
+        for process in self.processes:
+            process.join()
+
+    def _restart_crashed(self, stop_event):
+        for worker, process in enumerate(self.processes):
+            if process.is_alive() or stop_event.is_set():
+                continue
+            if time.monotonic() - self.restarted_at[worker] < self.RESTART_DELAY:
+                continue
+            cameras = sorted(self.assigned_to(worker))
+            print(
+                f"Stream worker {worker} exited with code {process.exitcode}, "
+                f"restarting; reassigning {len(cameras)} cameras"
+            )
+            owners = self.owners
+            owners[owners == worker] = -1
+
+            # Spread the orphaned cameras, heaviest first, over the least
+            # loaded workers, the restarted one included
+            worker_loads = self.worker_loads()
+            worker_loads[worker] = 0.0
+            for camera in sorted(cameras, key=lambda c: -self.loads[c]):
+                target = int(np.argmin(worker_loads))
+                self.assignment[camera] = target
+                worker_loads[target] += self.loads[camera]
+
+            self.restarted_at[worker] = time.monotonic()
+            self.processes[worker] = self._start_worker(worker, stop_event)
+
+    def _rebalance(self):
+        """Move the one camera that best narrows the busiest/idlest worker gap"""
+        if self.workers < 2 or np.any(self.owners != self.assignment):
+            return  # a move or restart is still in progress
+        worker_loads = self.worker_loads()
+        busiest, idlest = int(np.argmax(worker_loads)), int(np.argmin(worker_loads))
+        high, low = worker_loads[busiest], worker_loads[idlest]
+
+        best_camera, best_gain = None, self.rebalance_threshold
+        for camera in self.assigned_to(busiest):
+            load = self.loads[camera]
+            gain = high - max(high - load, low + load)
+            if gain >= best_gain:
+                best_camera, best_gain = camera, gain
+        if best_camera is None:
+            return
+
+        self.assignment[best_camera] = idlest
+        print(
+            f"Scheduler: moving {self.camera_urls[best_camera]} "
+            f"({self.loads[best_camera]:.2f} cores) from worker {busiest} "
+            f"({high:.2f} cores) to worker {idlest} ({low:.2f} cores)"
+        )
+
+
+class StreamStop:
+    """Stop flag of one camera stream, released when its camera moves away"""
+
+    def __init__(self, stop_event):
+        self.stop_event = stop_event
+        self.released = threading.Event()
+
+    def is_set(self):
+        return self.released.is_set() or self.stop_event.is_set()
+
+    def set(self):
+        self.stop_event.set()
+
+    def release(self):
+        self.released.set()
+
+    def wait(self, timeout):
+        deadline = time.monotonic() + timeout
+        while not self.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            self.released.wait(min(remaining, 0.5))
+        return True
+
+
+class StreamLoad:
+    """Busy seconds of one camera, read by the scheduler to balance workers"""
+
+    def __init__(self, busy, camera):
+        self.busy = busy
+        self.camera = camera
+
+    def add(self, seconds):
+        self.busy[self.camera] += seconds
+
+
+class StreamWorker:
+    """Worker process body: run the cameras the scheduler assigns to it"""
+
+    def __init__(
+        self,
+        shared_data,
+        event_outbox,
+        viewer=None,
+        metrics=None,
+        face_analyzer_factory=None,
+        face_analyzers=None,
+        thread_budget=None,
+    ):
+        self.shared_data = shared_data
+        self.event_outbox = event_outbox
+        self.viewer = viewer
+        self.metrics = metrics
+        self.face_analyzer_factory = face_analyzer_factory
+        self.face_analyzers = face_analyzers
+        self.thread_budget = thread_budget
+
+    def run(self, worker, scheduler, stop_event):
+        if self.thread_budget is not None:
+            self.thread_budget.apply(worker)
+        face_analyzer = None
+        if self.face_analyzers is None:
+            face_analyzer = self.face_analyzer_factory()
+        face_matcher = FaceMatcher()
+        track_manager = TrackManager(self.event_outbox)
+
+        streams = {}
+        retry_at = {}
+        owners = scheduler.owners
+        while not stop_event.is_set():
+            assigned = scheduler.assigned_to(worker)
+            now = time.monotonic()
+
+            for camera, (thread, stop) in list(streams.items()):
+                if camera not in assigned:
+                    stop.release()
+                if thread.is_alive():
+                    continue
+                del streams[camera]
+                owners[camera] = -1
+                if camera in assigned and not stop.is_set():
+                    print(
+                        f"Stream {scheduler.camera_urls[camera]} failed on worker "
+                        f"{worker}, restarting in {scheduler.RESTART_DELAY:.0f} s"
+                    )
+                    retry_at[camera] = now + scheduler.RESTART_DELAY
+
+            for camera in sorted(assigned - streams.keys()):
+                # Wait for the previous worker to let go of a moved camera
+                if owners[camera] not in (-1, worker) or retry_at.get(camera, 0) > now:
+                    continue
+                owners[camera] = worker
+                stop = StreamStop(stop_event)
+                thread = threading.Thread(
+                    target=self._run_stream,
+                    args=(
+                        scheduler,
+                        camera,
+                        stop,
+                        (
+                            face_analyzer
+                            if self.face_analyzers is None
+                            else self.face_analyzers[camera]
+                        ),
+                        face_matcher,
+                        track_manager,
+                    ),
+                    name=f"camera-{camera}",
+                    daemon=True,
+                )
+                thread.start()
+                streams[camera] = (thread, stop)
+
+            # Not stop_event.wait(): a worker killed while waiting on the
+            # event would leave its set() blocked forever
+            time.sleep(scheduler.POLL_INTERVAL)
+
+        for thread, _ in streams.values():
+            thread.join()
+        track_manager.event_log.close()
+
+    def _run_stream(
+        self, scheduler, camera, stop, face_analyzer, face_matcher, track_manager
+    ):
+        try:
+            processor = VideoProcessor(
+                scheduler.camera_urls[camera],
+                self.shared_data,
+                stop,
+                self.viewer,
+                self.metrics,
+                StreamLoad(scheduler.busy, camera),
+            )
+            processor.process_stream(
+                face_analyzer,
+                face_matcher,
+                RegionDetector(),
+                track_manager,
+                ImageManager(),
+            )
+        except Exception:
+            traceback.print_exc()
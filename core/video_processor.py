@@ -2,17 +2,57 @@ import cv2
 import re
 import time
 from datetime import datetime
-from config.constants import SKIP_FRAMES_WORKING, SKIP_FRAMES_IDLE, RECOGNITION_COOLDOWN
+from core.frame_grabber import FrameGrabber
+from core.face_tracker import FaceTracker
+from core.motion_gate import MotionGate
+from core.face_quality import FaceQualityGate
+from core.recognition_cooldown import RecognitionCooldown
+from data.gallery_watcher import GalleryDelta
+from utils.metrics import NullRecorder
+from config.constants import (
+    SKIP_FRAMES_WORKING,
+    SKIP_FRAMES_IDLE,
+    MATCHER_TOP_K,
+    FRAME_STATS_INTERVAL,
+    LOOP_VIDEO_FILES,
+    DISPLAY_MODE,
+    HEADLESS,
+    TRACKER_ENABLED,
+    MOTION_GATE_ENABLED,
+    ROI_DETECTION_ENABLED,
+    QUALITY_GATE_ENABLED,
+)
 
 
 class VideoProcessor:
-    def __init__(self, camera_url, shared_data, stop_event):
+    def __init__(
+        self,
+        camera_url,
+        shared_data,
+        stop_event,
+        viewer=None,
+        metrics=None,
+        load=None,
+    ):
         self.camera_url = camera_url
         self.shared_data = shared_data
         self.stop_event = stop_event
+        self.viewer = viewer
+        self.stage_timer = (
+            metrics.recorder(camera_url) if metrics is not None else NullRecorder()
+        )
+        # Busy time reported to the stream scheduler
+        self.load = load
         self.ip_address = self._extract_ip_address()
         self.skip_frames = self._get_skip_frames()
-        self.last_recognition_times = {}
+        self.cooldown = shared_data.get("recognition_cooldown") or RecognitionCooldown()
+        self.gallery_version = 0
+        self.last_stats_time = time.time()
+        self.face_tracker = FaceTracker() if TRACKER_ENABLED else None
+        self.motion_gate = MotionGate(self.skip_frames) if MOTION_GATE_ENABLED else None
+        self.quality_gate = FaceQualityGate() if QUALITY_GATE_ENABLED else None
+        self.faces_detected = 0
+        self.faces_embedded = 0
 
     def _extract_ip_address(self):
         """Extract IP address from camera URL"""
@@ -30,26 +70,91 @@ class VideoProcessor:
             )
         return SKIP_FRAMES_IDLE
 
+    def _load_gallery(self, face_matcher):
+        """Normalize the gallery once per matcher instead of once per face"""
+        with face_matcher.lock:
+            if face_matcher.loaded:
+                return  # another camera of this worker loaded it
+            gallery = self.shared_data["features"]
+            user_ids, feature_matrix = gallery
+            face_matcher.set_gallery(
+                user_ids,
+                feature_matrix,
+                normalized=getattr(gallery, "normalized", False),
+                quantized=getattr(gallery, "quantized", None),
+            )
+
+    def _sync_gallery(self, face_matcher):
+        """Apply gallery deltas published since the last applied version"""
+        version = getattr(self.shared_data["features"], "version", None)
+        if version is None or version.value == self.gallery_version:
+            return
+
+        # The matcher may be shared with other cameras of the worker; while
+        # one of them applies the delta the others keep matching
+        if not face_matcher.lock.acquire(blocking=False):
+            return
+        names_list = self.shared_data["names"]
+        try:
+            for number in range(face_matcher.version + 1, version.value + 1):
+                try:
+                    delta = GalleryDelta.load(number)
+                except OSError as e:
+                    print(
+                        f"Gallery delta v{number} unavailable for "
+                        f"{self.ip_address}: {e}"
+                    )
+                    break
+
+                start = time.perf_counter()
+                rows = face_matcher.apply_delta(
+                    delta.removed_ids, delta.upsert_ids, delta.upsert_vectors
+                )
+                names_list.update(delta.names)
+                for user_id in delta.removed_names:
+                    names_list.pop(user_id, None)
+                face_matcher.version = number
+
+                print(
+                    f"Camera {self.ip_address}: gallery v{number} applied, {rows} "
+                    f"rows in {(time.perf_counter() - start) * 1000:.1f} ms "
+                    f"({time.time() - delta.created:.2f} s after publish)"
+                )
+        finally:
+            face_matcher.lock.release()
+
+        if face_matcher.version != self.gallery_version:
+            self.gallery_version = face_matcher.version
+            if self.face_tracker is not None:
+                self.face_tracker.invalidate_identities()
+
     def process_stream(
         self, face_analyzer, face_matcher, region_detector, track_manager, image_manager
     ):
         """Main video processing loop"""
+        self._load_gallery(face_matcher)
+
         while not self.stop_event.is_set():
-            capture = cv2.VideoCapture(self.camera_url, cv2.CAP_FFMPEG)
-            capture.set(cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY)
+            grabber = FrameGrabber(self.camera_url, loop=LOOP_VIDEO_FILES)
 
-            if not capture.isOpened():
+            if not grabber.start():
                 print(f"Failed to open {self.camera_url}, retrying in 10 seconds....")
-                time.sleep(10)
+                self.stop_event.wait(10)
                 continue
 
             print(f"Camera: {self.camera_url} is working.......")
-            window_name = f"Camera {self.camera_url}"
-            cv2.namedWindow(window_name, cv2.WINDOW_NORMAL)
-            cv2.resizeWindow(window_name, 400, 300)
+            if self.face_tracker is not None:
+                self.face_tracker.reset()
+            if self.motion_gate is not None:
+                self.motion_gate.reset()
+            window_name = None
+            if DISPLAY_MODE == "window":
+                window_name = f"Camera {self.camera_url}"
+                cv2.namedWindow(window_name, cv2.WINDOW_NORMAL)
+                cv2.resizeWindow(window_name, 400, 300)
 
             self._process_frames(
-                capture,
+                grabber,
                 window_name,
                 face_analyzer,
                 face_matcher,
@@ -58,12 +163,60 @@ class VideoProcessor:
                 image_manager,
             )
 
-            capture.release()
-            cv2.destroyWindow(window_name)
+            grabber.stop()
+            if window_name is not None:
+                cv2.destroyWindow(window_name)
+
+        image_manager.close()
+
+    def _report_frame_stats(self, grabber, image_manager, timestamp):
+        """Print frame, detector and face crop counters every FRAME_STATS_INTERVAL"""
+        now = time.time()
+        if now - self.last_stats_time < FRAME_STATS_INTERVAL:
+            return
+        self.last_stats_time = now
+        stats = grabber.stats()
+        print(
+            f"Camera {self.ip_address}: {stats['decoded']} decoded, "
+            f"{stats['read']} processed, {stats['skipped']} skipped, "
+            f"{stats['dropped']} dropped, "
+            f"frame age {(now - timestamp) * 1000:.0f} ms, "
+            f"{self.faces_embedded}/{self.faces_detected} faces embedded"
+        )
+        if self.quality_gate is not None:
+            quality = self.quality_gate.stats()
+            print(
+                f"Camera {self.ip_address}: face quality {quality['accepted']}/"
+                f"{quality['checked']} accepted, rejected {quality['rejected_size']} "
+                f"small, {quality['rejected_pose']} turned, "
+                f"{quality['rejected_blur']} blurred"
+            )
+        if self.motion_gate is not None:
+            gate = self.motion_gate.stats()
+            print(
+                f"Camera {self.ip_address}: detector duty cycle "
+                f"{gate['duty_cycle']:.0%} ({gate['analyzed']}/{gate['checked']} "
+                f"frames), {gate['motion']} with motion, "
+                f"skip {gate['skip_frames']}"
+            )
+        cooldown = self.cooldown.stats()
+        if cooldown["suppressed"]:
+            print(
+                f"Camera {self.ip_address}: {cooldown['fired']} events, "
+                f"{cooldown['suppressed']} suppressed by the shared cooldown"
+            )
+        writer = image_manager.image_writer.stats()
+        if writer["enqueued"]:
+            print(
+                f"Camera {self.ip_address}: face crops {writer['written']} written, "
+                f"{writer['dropped']} dropped, queue {writer['depth']} "
+                f"(max {writer['max_depth']}), write {writer['avg_write_ms']:.1f} ms "
+                f"avg / {writer['max_write_ms']:.1f} ms max"
+            )
 
     def _process_frames(
         self,
-        capture,
+        grabber,
         window_name,
         face_analyzer,
         face_matcher,
@@ -71,46 +224,151 @@ class VideoProcessor:
         track_manager,
         image_manager,
     ):
-        """Process individual frames from video stream"""
+        """Process the freshest frames from the capture thread"""
         while not self.stop_event.is_set():
-            # Skip frames
-            for _ in range(self.skip_frames):
-                capture.grab()
-
-            ret, frame = capture.read()
-            if not ret:
+            skip_frames = (
+                self.motion_gate.skip_frames
+                if self.motion_gate is not None
+                else self.skip_frames
+            )
+            wait_start = time.perf_counter()
+            frame, timestamp = grabber.read(skip_frames)
+            if frame is None:
                 print(
                     f"Video stream ended for {self.camera_url}. Monitoring for recovery."
                 )
                 break
 
+            frame_start = time.perf_counter()
+            self.stage_timer.observe("frame_wait", frame_start - wait_start)
+            self.stage_timer.observe("frame_age", time.time() - timestamp)
+
             height, width, _ = frame.shape
+            with self.stage_timer.span("gallery_sync"):
+                self._sync_gallery(face_matcher)
 
             # Update regions if frame size changed
             block_regions = self.shared_data["block_regions"].get(self.ip_address)
             seat_regions = self.shared_data["seat_regions"].get(self.ip_address)
             region_detector.update_regions(block_regions, seat_regions, width, height)
 
-            # Process faces
-            faces = face_analyzer.get_faces(frame)
+            # Process faces, unless the motion gate finds nothing going on
+            faces = []
+            analyze = True
+            if self.motion_gate is not None:
+                with self.stage_timer.span("motion_gate"):
+                    analyze = self.motion_gate.should_analyze(frame)
+            if analyze:
+                rois = region_detector.detection_rois if ROI_DETECTION_ENABLED else None
+                faces = self._recognize_faces(frame, face_analyzer, face_matcher, rois)
+                if self.motion_gate is not None:
+                    self.motion_gate.record_faces(len(faces))
             if faces:
                 self._process_faces(
                     frame,
                     faces,
                     width,
                     height,
-                    face_matcher,
                     region_detector,
                     track_manager,
                     image_manager,
                 )
 
             # Display frame
-            cv2.imshow(window_name, frame)
-            if cv2.waitKey(1) == ord("q"):
-                print("Exit command received.")
-                self.stop_event.set()
-                break
+            with self.stage_timer.span("display"):
+                if self.viewer is not None:
+                    self.viewer.publish(self.camera_url, frame)
+                elif window_name is not None:
+                    cv2.imshow(window_name, frame)
+                    if cv2.waitKey(1) == ord("q"):
+                        print("Exit command received.")
+                        self.stop_event.set()
+                        break
+
+            frame_time = time.perf_counter() - frame_start
+            self.stage_timer.observe("frame_total", frame_time)
+            if self.load is not None:
+                self.load.add(frame_time)
+
+            self._report_frame_stats(grabber, image_manager, timestamp)
+
+    def _match_faces(self, faces, face_matcher):
+        """Match all faces of the frame with a single matrix multiply"""
+        with self.stage_timer.span("match"):
+            top_ids, top_scores = face_matcher.match_batch(
+                [face.normed_embedding for face in faces], k=MATCHER_TOP_K
+            )
+        return [
+            (face_ids[0], float(face_scores[0]))
+            for face_ids, face_scores in zip(top_ids, top_scores)
+        ]
+
+    def _recognize_faces(self, frame, face_analyzer, face_matcher, rois=None):
+        """
+        Detect and identify the faces of a frame
+
+        With the tracker enabled only new tracks and tracks due for a refresh
+        are embedded and matched; the others reuse their cached identity.
+        With rois, detection only looks inside those crops of the frame.
+        Faces failing the quality gate are never embedded; without the
+        tracker they come back as "Unknown".
+
+        Returns:
+            List of (face, id_name, similarity) tuples
+        """
+        if self.face_tracker is None:
+            rejected = []
+            if self.quality_gate is None:
+                with self.stage_timer.span("analyze"):
+                    faces = face_analyzer.get_faces(frame, rois) or []
+            else:
+                with self.stage_timer.span("detect"):
+                    faces = face_analyzer.detect(frame, rois)
+                with self.stage_timer.span("quality"):
+                    faces, rejected = self.quality_gate.filter(frame, faces)
+                if faces:
+                    with self.stage_timer.span("embed"):
+                        faces = face_analyzer.embed(frame, faces)
+            self.faces_detected += len(faces) + len(rejected)
+            self.faces_embedded += len(faces)
+            matches = self._match_faces(faces, face_matcher) if faces else []
+            return [(face, *match) for face, match in zip(faces, matches)] + [
+                (face, "Unknown", 0.0) for face in rejected
+            ]
+
+        with self.stage_timer.span("detect"):
+            faces = face_analyzer.detect(frame, rois)
+        tracks = self.face_tracker.update(faces)
+        self.faces_detected += len(faces)
+
+        now = time.time()
+        pending = [
+            track for track in tracks if self.face_tracker.needs_recognition(track, now)
+        ]
+        if pending and self.quality_gate is not None:
+            # Rejected tracks stay due and are retried on a better frame
+            with self.stage_timer.span("quality"):
+                pending = [
+                    track
+                    for track in pending
+                    if self.quality_gate.accept(frame, track.face)
+                ]
+        if pending:
+            with self.stage_timer.span("embed"):
+                embedded = face_analyzer.embed(frame, [track.face for track in pending])
+            # A failed embedding leaves the tracks due for the next frame
+            if len(embedded) == len(pending):
+                self.faces_embedded += len(pending)
+                for track, face, (id_name, sim) in zip(
+                    pending, embedded, self._match_faces(embedded, face_matcher)
+                ):
+                    self.face_tracker.set_identity(track, id_name, sim, now)
+
+        return [
+            (track.face, track.identity, track.score)
+            for track in tracks
+            if track.identity is not None
+        ]
 
     def _process_faces(
         self,
@@ -118,23 +376,28 @@ class VideoProcessor:
         faces,
         width,
         height,
-        face_matcher,
         region_detector,
         track_manager,
         image_manager,
     ):
-        """Process detected faces in the frame"""
-        copy_image = frame.copy()
-        user_ids, feature_matrix = self.shared_data["features"]
+        """Process recognized faces in the frame"""
+        # Nothing draws on the frame when headless, so crops can share it
+        copy_image = frame if HEADLESS else frame.copy()
         names_list = self.shared_data["names"]
 
-        for face in faces:
-            # Match face
-            id_name, sim = face_matcher.match(
-                face.normed_embedding, user_ids, feature_matrix
+        # Resolve the regions of all faces with one label-map lookup
+        boxes = [
+            image_manager.get_coordinates(width, height, face.bbox)
+            for face, _, _ in faces
+        ]
+        with self.stage_timer.span("regions"):
+            block_nos, seat_nos = region_detector.lookup_regions(
+                [image_manager.get_face_center(box) for box in boxes]
             )
-            box = image_manager.get_coordinates(width, height, face.bbox)
 
+        for (face, id_name, sim), box, block_no, seat_no in zip(
+            faces, boxes, block_nos, seat_nos
+        ):
             name = None
             if id_name != "Unknown":
                 name = names_list[id_name]
@@ -143,6 +406,8 @@ class VideoProcessor:
                     name,
                     sim,
                     box,
+                    block_no,
+                    seat_no,
                     width,
                     height,
                     copy_image,
@@ -154,12 +419,16 @@ class VideoProcessor:
             # Draw bounding box
             image_manager.draw_bounding_box(frame, box, id_name, name, sim)
 
+        region_detector.draw_regions(frame)
+
     def _handle_recognized_face(
         self,
         id_name,
         name,
         sim,
         box,
+        block_no,
+        seat_no,
         width,
         height,
         copy_image,
@@ -168,35 +437,24 @@ class VideoProcessor:
         image_manager,
     ):
         """Handle logic for recognized faces"""
-        last_recognition_time, last_camera = self.last_recognition_times.get(
-            id_name, (0, None)
+        # Track if in any region or no regions defined
+        in_region = (
+            block_no is not None
+            or seat_no is not None
+            or (
+                region_detector.block_points is None
+                and region_detector.seat_points is None
+            )
         )
-        current_time = time.time()
-
-        if current_time - last_recognition_time >= RECOGNITION_COOLDOWN or (
-            self.ip_address != last_camera
-        ):
-            face_center = image_manager.get_face_center(box)
-
-            # Check regions
-            block_no = region_detector.check_block_region(copy_image, face_center)
-            seat_no = region_detector.check_seat_region(copy_image, face_center)
-
-            # Track if in any region or no regions defined
-            if (
-                block_no is not None
-                or seat_no is not None
-                or (
-                    region_detector.block_points is None
-                    and region_detector.seat_points is None
-                )
-            ):
 
+        # The cooldown is shared with the other cameras
+        if in_region and self.cooldown.should_fire(id_name, self.ip_address, block_no):
+            with self.stage_timer.span("track_event"):
                 track_manager.mark_track_data(
                     id_name, self.ip_address, block_no, seat_no
                 )
-                self.last_recognition_times[id_name] = (current_time, self.ip_address)
 
-                # Save face image
+            # Save face image
+            with self.stage_timer.span("image_write"):
                 face_image = image_manager.add_padding(copy_image, width, height, box)
                 image_manager.save_track_face(face_image, id_name, name, sim)
@@ -1 +0,0 @@
-json_manager
\ No newline at end of file
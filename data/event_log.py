@@ -0,0 +1,184 @@
+import argparse
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from config.settings import TRACK_RECORDS_DIR
+from config.constants import (
+    EVENT_LOG_FLUSH_EVENTS,
+    EVENT_LOG_FLUSH_INTERVAL,
+    EVENT_LOG_FSYNC,
+)
+
+
+class EventLog:
+    """Append-only JSON-lines event log, one segment per process and day"""
+
+    def __init__(
+        self,
+        records_dir=TRACK_RECORDS_DIR,
+        flush_events=EVENT_LOG_FLUSH_EVENTS,
+        flush_interval=EVENT_LOG_FLUSH_INTERVAL,
+        fsync=EVENT_LOG_FSYNC,
+    ):
+        self.records_dir = Path(records_dir)
+        self.flush_events = flush_events
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.buffer = []
+        self.fd = None
+        self.segment_date = None
+        self.lock = threading.Lock()
+        self.flusher = None
+
+    def append(self, event):
+        """Buffer an event; commit the group when it is full"""
+        line = json.dumps(event, separators=(",", ":")) + "\n"
+        with self.lock:
+            if event.get("date") != self.segment_date:
+                self._flush_locked()
+                self._open_segment(event.get("date"))
+            self.buffer.append(line)
+            if len(self.buffer) >= self.flush_events:
+                self._flush_locked()
+        self._ensure_flusher()
+
+    def flush(self):
+        """Commit all buffered events"""
+        with self.lock:
+            self._flush_locked()
+
+    def close(self):
+        with self.lock:
+            self._flush_locked()
+            if self.fd is not None:
+                os.close(self.fd)
+                self.fd = None
+
+    def _flush_locked(self):
+        if not self.buffer or self.fd is None:
+            return
+        os.write(self.fd, "".join(self.buffer).encode())
+        if self.fsync:
+            os.fsync(self.fd)
+        self.buffer.clear()
+
+    def _open_segment(self, date):
+        if self.fd is not None:
+            os.close(self.fd)
+        day_dir = self.records_dir / date
+        day_dir.mkdir(parents=True, exist_ok=True)
+        path = day_dir / f"events-{os.getpid()}.jsonl"
+        self.recover(path)
+        self.fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        self.segment_date = date
+
+    def _ensure_flusher(self):
+        """Start the interval flusher lazily, inside the writing process"""
+        if self.flusher is None or not self.flusher.is_alive():
+            self.flusher = threading.Thread(
+                target=self._flush_periodically, name="event-log-flusher", daemon=True
+            )
+            self.flusher.start()
+
+    def _flush_periodically(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except OSError as e:
+                print(f"Error flushing event log: {e}")
+
+    @staticmethod
+    def recover(path):
+        """Truncate a partially written tail record left by a crash"""
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return 0
+        with open(path, "rb+") as file:
+            file.seek(0, os.SEEK_END)
+            size = file.tell()
+            position = size
+            while position > 0:
+                step = min(4096, position)
+                file.seek(position - step)
+                chunk = file.read(step)
+                newline = chunk.rfind(b"\n")
+                if newline != -1:
+                    position = position - step + newline + 1
+                    break
+                position -= step
+            if position < size:
+                file.truncate(position)
+            return size - position
+
+    def __getstate__(self):
+        # Lock, file descriptor and flusher are per process
+        state = self.__dict__.copy()
+        state.update(buffer=[], fd=None, segment_date=None, lock=None, flusher=None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+
+class EventLogReader:
+    """Derived views over the event log segments"""
+
+    def __init__(self, records_dir=TRACK_RECORDS_DIR):
+        self.records_dir = Path(records_dir)
+
+    def segments(self, date=None):
+        pattern = f"{date}/events-*.jsonl" if date else "*/events-*.jsonl"
+        return sorted(self.records_dir.glob(pattern))
+
+    @staticmethod
+    def read_segment(path, offset=0):
+        """Complete records from offset on, and the offset past the last one"""
+        with open(path, "rb") as file:
+            file.seek(offset)
+            data = file.read()
+        end = data.rfind(b"\n") + 1
+        events = []
+        for line in data[:end].splitlines():
+            try:
+                events.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+        return events, offset + end
+
+    def day_view(self, date):
+        """All events of a day in time order"""
+        events = []
+        for path in self.segments(date):
+            events.extend(self.read_segment(path)[0])
+        return sorted(events, key=lambda event: event.get("time", ""))
+
+    def employee_view(self, date, employee_id):
+        """Events of one employee for a day in time order"""
+        return [
+            event
+            for event in self.day_view(date)
+            if str(event.get("userPin")) == str(employee_id)
+        ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print views of the track event log")
+    parser.add_argument("--date", default=datetime.now().strftime("%Y-%m-%d"))
+    parser.add_argument("--employee", default=None)
+    args = parser.parse_args()
+
+    reader = EventLogReader()
+    events = (
+        reader.employee_view(args.date, args.employee)
+        if args.employee
+        else reader.day_view(args.date)
+    )
+    print(json.dumps(events, indent=4))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from multiprocessing import Queue
+from config.settings import EVENT_OUTBOX_FILE
+from config.constants import EVENT_QUEUE_SIZE, EVENT_OUTBOX_SYNCHRONOUS
+
+
+class EventOutbox:
+    """SQLite outbox from camera processes to DataSender, acked after delivery"""
+
+    def __init__(self, db_path=EVENT_OUTBOX_FILE, queue_size=EVENT_QUEUE_SIZE):
+        self.db_path = str(db_path)
+        self.notify_queue = Queue(maxsize=queue_size)
+        self._local = threading.local()
+
+    @property
+    def connection(self):
+        """SQLite connection owned by the current process and thread"""
+        local = self._local
+        if getattr(local, "pid", None) != os.getpid():
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            connection = sqlite3.connect(self.db_path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(f"PRAGMA synchronous={EVENT_OUTBOX_SYNCHRONOUS}")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS outbox ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "payload TEXT NOT NULL, "
+                "created REAL NOT NULL)"
+            )
+            connection.commit()
+            local.connection, local.pid = connection, os.getpid()
+        return local.connection
+
+    def put(self, event):
+        """Durably enqueue an event and wake the consumer"""
+        with self.connection:
+            self.connection.execute(
+                "INSERT INTO outbox (payload, created) VALUES (?, ?)",
+                (json.dumps(event), time.time()),
+            )
+        try:
+            self.notify_queue.put_nowait(None)
+        except queue.Full:
+            pass  # The consumer is already awake with work pending
+
+    def wait(self, timeout):
+        """Block until a producer signals new events or the timeout expires"""
+        try:
+            self.notify_queue.get(timeout=timeout)
+        except queue.Empty:
+            return False
+        # Coalesce the tokens of events that arrived together
+        while True:
+            try:
+                self.notify_queue.get_nowait()
+            except queue.Empty:
+                return True
+
+    def fetch(self, limit):
+        """Oldest unacknowledged events as (row_id, event) tuples"""
+        rows = self.connection.execute(
+            "SELECT id, payload FROM outbox ORDER BY id LIMIT ?", (limit,)
+        ).fetchall()
+        return [(row_id, json.loads(payload)) for row_id, payload in rows]
+
+    def ack(self, row_ids):
+        """Delete delivered events"""
+        with self.connection:
+            self.connection.executemany(
+                "DELETE FROM outbox WHERE id = ?", [(row_id,) for row_id in row_ids]
+            )
+
+    def pending(self):
+        return self.connection.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_local"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
@@ -0,0 +1,365 @@
+import argparse
+import json
+import os
+from multiprocessing import Value, shared_memory
+
+import numpy as np
+from data.json_manager import JSONManager
+from config.settings import FEATURES_FILE, GALLERY_MATRIX_FILE, GALLERY_IDS_FILE
+from config.constants import GALLERY_DTYPE, MATCHER_PRECISION
+
+
+class GalleryStore:
+    """
+    Compact on-disk gallery: an L2-normalized .npy matrix plus a JSON id table
+
+    Row i of the matrix belongs to entry i of the id table. An identity with
+    several templates has one row per template, on consecutive rows that
+    repeat its id. The matrix is contiguous float32 or float16 so it can be
+    memory-mapped directly.
+    """
+
+    @staticmethod
+    def templates(value):
+        """
+        Template rows of one JSON gallery entry
+
+        A list of vectors (shape (templates, dim)) holds several templates;
+        anything else is flattened into a single template, as before.
+        """
+        vectors = np.asarray(value, dtype=np.float32)
+        if vectors.ndim == 2 and vectors.shape[0] > 1 and vectors.shape[1] > 1:
+            return vectors
+        return vectors.reshape(1, -1)
+
+    @staticmethod
+    def load_json_features(features_file):
+        """
+        Parse the {user_id: vector or [vector, ...]} JSON gallery
+
+        Returns:
+            Tuple of (row ids, matrix) with one row per template
+        """
+        features_list = JSONManager.safe_load_json(features_file, default={})
+        if not features_list:
+            return [], np.zeros((0, 0), dtype=np.float32)
+        row_ids, rows = [], []
+        for user_id, value in features_list.items():
+            templates = GalleryStore.templates(value)
+            row_ids.extend([user_id] * len(templates))
+            rows.append(templates)
+        return row_ids, np.concatenate(rows).astype(np.float32, copy=False)
+
+    @staticmethod
+    def normalize(matrix):
+        """L2-normalize rows in float32"""
+        matrix = np.asarray(matrix, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.maximum(norms, 1e-12)
+
+    @staticmethod
+    def quantize(matrix, precision, block=16384):
+        """
+        Low-precision copy of a normalized gallery for scanning
+
+        int8 uses one symmetric scale per row, so a score is the int8 dot
+        product times the row's scale.
+
+        Returns:
+            Tuple of (quantized matrix, per-row float32 scales or None)
+        """
+        matrix = np.asarray(matrix)
+        if precision == "float16":
+            return matrix.astype(np.float16), None
+        if precision != "int8":
+            raise ValueError(f"Unknown gallery precision: {precision}")
+        quantized = np.empty(matrix.shape, dtype=np.int8)
+        scales = np.empty(len(matrix), dtype=np.float32)
+        for start in range(0, len(matrix), block):
+            rows = np.asarray(matrix[start : start + block], dtype=np.float32)
+            row_scales = np.maximum(np.abs(rows).max(axis=1), 1e-12) / 127
+            quantized[start : start + block] = np.round(rows / row_scales[:, None])
+            scales[start : start + block] = row_scales
+        return quantized, scales
+
+    @staticmethod
+    def quantized_files(matrix_file, precision):
+        """Paths of the quantized matrix and its scales next to matrix_file"""
+        base = str(matrix_file)
+        base = base[:-4] if base.endswith(".npy") else base
+        return f"{base}.{precision}.npy", f"{base}.{precision}.scales.npy"
+
+    @staticmethod
+    def save_quantized(matrix, matrix_file=GALLERY_MATRIX_FILE, precision="int8"):
+        """Write the quantized copy of a normalized gallery atomically"""
+        quantized, scales = GalleryStore.quantize(matrix, precision)
+        for path, array in zip(
+            GalleryStore.quantized_files(matrix_file, precision), (quantized, scales)
+        ):
+            if array is None:
+                continue
+            with open(f"{path}.tmp", "wb") as file:
+                np.save(file, array)
+            os.replace(f"{path}.tmp", path)
+
+    @staticmethod
+    def load_quantized(matrix_file=GALLERY_MATRIX_FILE, precision="int8"):
+        """
+        Memory-map the quantized gallery, (re)writing it first when it is
+        missing or older than the matrix
+
+        Returns:
+            Tuple of (quantized matrix, per-row scales or None)
+        """
+        quantized_file, scales_file = GalleryStore.quantized_files(
+            matrix_file, precision
+        )
+        needed = [quantized_file] + ([scales_file] if precision == "int8" else [])
+        if not all(
+            os.path.exists(path)
+            and os.stat(path).st_mtime_ns >= os.stat(matrix_file).st_mtime_ns
+            for path in needed
+        ):
+            GalleryStore.save_quantized(
+                np.load(matrix_file, mmap_mode="r"), matrix_file, precision
+            )
+        scales = np.load(scales_file) if precision == "int8" else None
+        return np.load(quantized_file, mmap_mode="r"), scales
+
+    @staticmethod
+    def save(
+        user_ids,
+        matrix,
+        matrix_file=GALLERY_MATRIX_FILE,
+        ids_file=GALLERY_IDS_FILE,
+        dtype=GALLERY_DTYPE,
+        precision=MATCHER_PRECISION,
+    ):
+        """
+        Write the binary gallery atomically (temp file + rename), plus its
+        quantized copy when the matcher scans in low precision
+        """
+        os.makedirs(os.path.dirname(matrix_file), exist_ok=True)
+        matrix = GalleryStore.normalize(matrix).astype(dtype)
+
+        tmp_matrix = f"{matrix_file}.tmp"
+        with open(tmp_matrix, "wb") as file:
+            np.save(file, np.ascontiguousarray(matrix))
+        tmp_ids = f"{ids_file}.tmp"
+        with open(tmp_ids, "w") as file:
+            json.dump(list(user_ids), file)
+
+        os.replace(tmp_matrix, matrix_file)
+        os.replace(tmp_ids, ids_file)
+        if precision != "float32":
+            GalleryStore.save_quantized(matrix, matrix_file, precision)
+
+    @staticmethod
+    def convert_json(
+        features_file=FEATURES_FILE,
+        matrix_file=GALLERY_MATRIX_FILE,
+        ids_file=GALLERY_IDS_FILE,
+        dtype=GALLERY_DTYPE,
+    ):
+        """One-shot conversion of the JSON gallery to the binary format"""
+        user_ids, matrix = GalleryStore.load_json_features(features_file)
+        GalleryStore.save(user_ids, matrix, matrix_file, ids_file, dtype)
+        return user_ids, matrix
+
+    @staticmethod
+    def exists(matrix_file=GALLERY_MATRIX_FILE, ids_file=GALLERY_IDS_FILE):
+        return os.path.exists(matrix_file) and os.path.exists(ids_file)
+
+    @staticmethod
+    def is_stale(
+        features_file=FEATURES_FILE,
+        matrix_file=GALLERY_MATRIX_FILE,
+        ids_file=GALLERY_IDS_FILE,
+    ):
+        """True when the binary gallery is missing or older than the JSON"""
+        if not GalleryStore.exists(matrix_file, ids_file):
+            return True
+        if not os.path.exists(features_file):
+            return False
+        return os.stat(features_file).st_mtime_ns > min(
+            os.stat(matrix_file).st_mtime_ns, os.stat(ids_file).st_mtime_ns
+        )
+
+    @staticmethod
+    def load(matrix_file=GALLERY_MATRIX_FILE, ids_file=GALLERY_IDS_FILE, mmap=True):
+        """Load the id table and the (memory-mapped) matrix"""
+        user_ids = JSONManager.safe_load_json(ids_file, default=[])
+        matrix = np.load(matrix_file, mmap_mode="r" if mmap else None)
+        return user_ids, matrix
+
+
+class SharedGallery:
+    """
+    Picklable handle to a gallery shared by all camera processes
+
+    Only the id table and the location of the matrix travel with the handle;
+    each process maps the same physical pages on first access, either from
+    the .npy file (mode "mmap") or from a multiprocessing shared memory
+    block (mode "shm"). Unpacks like the legacy [user_ids, feature_matrix].
+
+    `version` is a shared counter bumped by GalleryWatcher whenever a delta is
+    published; deltas are idempotent, so a process replays every version
+    after the one it last applied on top of whichever base it mapped.
+
+    With a low matcher precision the quantized copy written by the loader is
+    memory-mapped from its file in both modes and exposed as `quantized`.
+    open() maps it together with the matrix, so forked processes inherit one
+    snapshot even after a reload replaces the files.
+    """
+
+    normalized = True
+
+    def __init__(
+        self,
+        user_ids,
+        shape,
+        dtype,
+        matrix_file=None,
+        shm_name=None,
+        version=None,
+        precision="float32",
+    ):
+        self.version = version if version is not None else Value("i", 0)
+        self.user_ids = list(user_ids)
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype).str
+        self.matrix_file = str(matrix_file) if matrix_file else None
+        self.shm_name = shm_name
+        self.precision = precision
+        self._matrix = None
+        self._quantized = None
+        self._shm = None
+        self._owner = False
+
+    @classmethod
+    def open(
+        cls,
+        matrix_file=GALLERY_MATRIX_FILE,
+        ids_file=GALLERY_IDS_FILE,
+        mode="mmap",
+        precision=MATCHER_PRECISION,
+    ):
+        """
+        Open a binary gallery for sharing
+
+        Args:
+            matrix_file: Path of the .npy matrix
+            ids_file: Path of the JSON id table
+            mode: "mmap" to map the file, "shm" to copy it once into shared memory
+            precision: Matcher scan precision; other than float32, the
+                quantized copy is written now if missing or stale and
+                mapped along with the matrix
+
+        Returns:
+            SharedGallery handle
+        """
+        user_ids, matrix = GalleryStore.load(matrix_file, ids_file, mmap=True)
+        quantized = None
+        if precision != "float32":
+            quantized = GalleryStore.load_quantized(matrix_file, precision)
+        if mode == "mmap":
+            gallery = cls(
+                user_ids,
+                matrix.shape,
+                matrix.dtype,
+                matrix_file=matrix_file,
+                precision=precision,
+            )
+            gallery._matrix, gallery._quantized = matrix, quantized
+            return gallery
+        if mode != "shm":
+            raise ValueError(f"Unknown gallery sharing mode: {mode}")
+
+        shm = shared_memory.SharedMemory(create=True, size=max(1, matrix.nbytes))
+        gallery = cls(
+            user_ids,
+            matrix.shape,
+            matrix.dtype,
+            matrix_file=matrix_file,
+            shm_name=shm.name,
+            precision=precision,
+        )
+        gallery._shm, gallery._owner = shm, True
+        gallery._matrix = np.ndarray(matrix.shape, dtype=matrix.dtype, buffer=shm.buf)
+        gallery._matrix[:] = matrix
+        gallery._quantized = quantized
+        return gallery
+
+    @property
+    def matrix(self):
+        """The gallery matrix, mapped into this process on first access"""
+        if self._matrix is None:
+            if self.shm_name:
+                # Workers share the parent's resource tracker, so attaching
+                # here does not register a second owner of the block
+                self._shm = shared_memory.SharedMemory(name=self.shm_name)
+                self._matrix = np.ndarray(
+                    self.shape, dtype=self.dtype, buffer=self._shm.buf
+                )
+            else:
+                self._matrix = np.load(self.matrix_file, mmap_mode="r")
+        return self._matrix
+
+    @property
+    def quantized(self):
+        """
+        (quantized matrix, scales), None at float32
+
+        Mapped by open(); a handle received by pickling maps the current
+        files on first access instead.
+        """
+        if self.precision == "float32":
+            return None
+        if self._quantized is None:
+            self._quantized = GalleryStore.load_quantized(
+                self.matrix_file, self.precision
+            )
+        return self._quantized
+
+    def __iter__(self):
+        return iter((self.user_ids, self.matrix))
+
+    def __len__(self):
+        return len(self.user_ids)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.update(_matrix=None, _quantized=None, _shm=None, _owner=False)
+        return state
+
+    def close(self):
+        """Release this process's mapping; the creating process also unlinks"""
+        self._matrix = None
+        self._quantized = None
+        if self._shm is not None:
+            self._shm.close()
+            if self._owner:
+                self._shm.unlink()
+            self._shm = None
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Convert the JSON face gallery to the binary gallery format"
+    )
+    parser.add_argument("--features", default=str(FEATURES_FILE))
+    parser.add_argument("--matrix", default=str(GALLERY_MATRIX_FILE))
+    parser.add_argument("--ids", default=str(GALLERY_IDS_FILE))
+    parser.add_argument(
+        "--dtype", default=GALLERY_DTYPE, choices=["float32", "float16"]
+    )
+    args = parser.parse_args()
+
+    user_ids, matrix = GalleryStore.convert_json(
+        args.features, args.matrix, args.ids, args.dtype
+    )
+    print(f"Converted {len(user_ids)} identities ({args.dtype}) to {args.matrix}")
+
+
+if __name__ == "__main__":
+    main()
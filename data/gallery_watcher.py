@@ -0,0 +1,220 @@
+import json
+import os
+import time
+import threading
+
+import numpy as np
+from data.json_manager import JSONManager
+from data.gallery_store import GalleryStore
+from config.settings import FEATURES_FILE, NAMES_FILE, GALLERY_DELTAS_DIR
+from config.constants import GALLERY_RELOAD_INTERVAL
+
+
+class GalleryDelta:
+    """Identity changes between two gallery versions"""
+
+    def __init__(
+        self,
+        version,
+        removed_ids=(),
+        upsert_ids=(),
+        upsert_vectors=None,
+        names=None,
+        removed_names=(),
+        created=None,
+    ):
+        self.version = version
+        self.removed_ids = list(removed_ids)
+        self.upsert_ids = list(upsert_ids)
+        self.upsert_vectors = (
+            upsert_vectors
+            if upsert_vectors is not None
+            else np.zeros((0, 0), dtype=np.float32)
+        )
+        self.names = names or {}
+        self.removed_names = list(removed_names)
+        self.created = created or time.time()
+
+    @property
+    def affected_rows(self):
+        return len(self.removed_ids) + len(self.upsert_ids)
+
+    def is_empty(self):
+        return not (
+            self.removed_ids or self.upsert_ids or self.names or self.removed_names
+        )
+
+    @staticmethod
+    def compute(
+        version, old_ids, old_matrix, new_ids, new_matrix, old_names, new_names
+    ):
+        """
+        Diff two galleries (normalized matrices) and two name tables
+
+        Returns:
+            GalleryDelta with removed ids, added or changed ids and their
+            vectors (one id per template row), and changed or removed names
+        """
+        old_rows, new_rows = {}, {}
+        for rows, ids in ((old_rows, old_ids), (new_rows, new_ids)):
+            for row, user_id in enumerate(ids):
+                rows.setdefault(user_id, []).append(row)
+
+        removed_ids = [user_id for user_id in old_rows if user_id not in new_rows]
+        upsert_ids, upsert_rows = [], []
+        for user_id, rows in new_rows.items():
+            old = old_rows.get(user_id)
+            if (
+                old is None
+                or len(old) != len(rows)
+                or not np.allclose(old_matrix[old], new_matrix[rows], atol=1e-3)
+            ):
+                upsert_ids.extend([user_id] * len(rows))
+                upsert_rows.extend(rows)
+        upsert_vectors = np.asarray(new_matrix[upsert_rows], dtype=np.float32)
+
+        names = {
+            user_id: name
+            for user_id, name in new_names.items()
+            if old_names.get(user_id) != name
+        }
+        removed_names = [user_id for user_id in old_names if user_id not in new_names]
+        return GalleryDelta(
+            version, removed_ids, upsert_ids, upsert_vectors, names, removed_names
+        )
+
+    def save(self, deltas_dir=GALLERY_DELTAS_DIR):
+        """Write the delta atomically as <version>.npz"""
+        os.makedirs(deltas_dir, exist_ok=True)
+        path = os.path.join(deltas_dir, f"{self.version}.npz")
+        with open(f"{path}.tmp", "wb") as file:
+            np.savez(
+                file,
+                removed_ids=np.array(self.removed_ids, dtype=str),
+                upsert_ids=np.array(self.upsert_ids, dtype=str),
+                upsert_vectors=self.upsert_vectors,
+                names=np.array(json.dumps(self.names)),
+                removed_names=np.array(self.removed_names, dtype=str),
+                created=np.array(self.created),
+            )
+        os.replace(f"{path}.tmp", path)
+        return path
+
+    @staticmethod
+    def load(version, deltas_dir=GALLERY_DELTAS_DIR):
+        """Read the delta for a version"""
+        with np.load(os.path.join(deltas_dir, f"{version}.npz")) as data:
+            return GalleryDelta(
+                version,
+                data["removed_ids"].tolist(),
+                data["upsert_ids"].tolist(),
+                data["upsert_vectors"],
+                json.loads(str(data["names"])),
+                data["removed_names"].tolist(),
+                float(data["created"]),
+            )
+
+
+class GalleryWatcher:
+    """
+    Watch FEATURES_FILE and NAMES_FILE and publish deltas to running processes
+
+    On a change the watcher parses the files once, diffs them against the
+    last published state, rewrites the binary gallery for future restarts,
+    writes the delta journal entry and only then bumps the shared version
+    counter. Camera processes see the new version on their next frame and
+    apply the journal entries they have not seen yet.
+    """
+
+    def __init__(
+        self,
+        gallery,
+        names,
+        stop_event,
+        features_file=FEATURES_FILE,
+        names_file=NAMES_FILE,
+        interval=GALLERY_RELOAD_INTERVAL,
+        deltas_dir=GALLERY_DELTAS_DIR,
+    ):
+        self.gallery = gallery
+        self.stop_event = stop_event
+        self.features_file = features_file
+        self.names_file = names_file
+        self.interval = interval
+        self.deltas_dir = deltas_dir
+        self.user_ids = list(gallery.user_ids)
+        self.matrix = np.asarray(gallery.matrix, dtype=np.float32)
+        self.names = dict(names)
+        self.mtimes = self._get_mtimes()
+        self._clear_deltas()
+
+    def _clear_deltas(self):
+        """Drop journal entries left over from a previous run"""
+        if os.path.isdir(self.deltas_dir):
+            for filename in os.listdir(self.deltas_dir):
+                os.remove(os.path.join(self.deltas_dir, filename))
+
+    def _get_mtimes(self):
+        mtimes = []
+        for file_path in (self.features_file, self.names_file):
+            try:
+                mtimes.append(os.stat(file_path).st_mtime_ns)
+            except OSError:
+                mtimes.append(None)
+        return mtimes
+
+    def start(self):
+        thread = threading.Thread(target=self.run, name="gallery-watcher", daemon=True)
+        thread.start()
+        return thread
+
+    def run(self):
+        """Poll the source files until the stop event is set"""
+        while not self.stop_event.wait(self.interval):
+            mtimes = self._get_mtimes()
+            if mtimes == self.mtimes:
+                continue
+            self.mtimes = mtimes
+            try:
+                self.reload()
+            except Exception as e:
+                print(f"Error reloading gallery: {e}")
+
+    def reload(self):
+        """Diff the source files against the published state and publish a delta"""
+        start = time.perf_counter()
+        new_ids, new_matrix = GalleryStore.load_json_features(self.features_file)
+        new_matrix = GalleryStore.normalize(new_matrix)
+        new_names = JSONManager.safe_load_json(self.names_file, default={})
+        if self.user_ids and not new_ids:
+            # An unreadable or half-written file parses as empty; wait for
+            # the next modification instead of removing everyone
+            print(f"Gallery reload skipped: no identities in {self.features_file}")
+            return None
+
+        version = self.gallery.version.value + 1
+        delta = GalleryDelta.compute(
+            version,
+            self.user_ids,
+            self.matrix,
+            new_ids,
+            new_matrix,
+            self.names,
+            new_names,
+        )
+        if delta.is_empty():
+            return None
+
+        GalleryStore.save(new_ids, new_matrix)
+        delta.save(self.deltas_dir)
+        self.gallery.version.value = version
+        self.user_ids, self.matrix, self.names = new_ids, new_matrix, new_names
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        print(
+            f"Gallery v{version} published in {elapsed_ms:.1f} ms: "
+            f"{delta.affected_rows} rows ({len(delta.upsert_ids)} added/changed, "
+            f"{len(delta.removed_ids)} removed), "
+            f"{len(delta.names) + len(delta.removed_names)} names updated"
+        )
+        return delta
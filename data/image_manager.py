@@ -1,7 +1,6 @@
-import os
-import cv2
 from datetime import datetime
 from config.settings import TRACK_IMAGES_DIR
+from data.image_writer import ImageWriter
 from utils.image_utils import ImageUtils
 
 
@@ -11,14 +10,18 @@ class ImageManager(ImageUtils):
         self.current_date = datetime.now().strftime("%Y-%m-%d")
         self.track_images_path = TRACK_IMAGES_DIR / self.current_date
         self.track_images_path.mkdir(exist_ok=True)
+        self.image_writer = ImageWriter()
 
     def save_track_face(self, face_image, id_name, name, sim):
-        """Save tracked face images"""
+        """Queue tracked face images for the background writer"""
         folder_path = self.track_images_path / f"{name}_{id_name}"
-        folder_path.mkdir(exist_ok=True)
 
         track_image_time = datetime.now().strftime("%H_%M_%S")
         filename = f"{name}_{track_image_time}_{sim:.2f}.jpg"
         file_path = folder_path / filename
 
-        cv2.imwrite(str(file_path), face_image)
+        self.image_writer.submit(file_path, face_image)
+
+    def close(self):
+        """Write out face images still queued"""
+        self.image_writer.flush()
@@ -0,0 +1,180 @@
+import os
+import queue
+import threading
+import time
+import cv2
+from config.constants import (
+    IMAGE_WRITER_QUEUE_SIZE,
+    IMAGE_WRITER_THREADS,
+    IMAGE_WRITER_OVERFLOW,
+    IMAGE_JPEG_QUALITY,
+    IMAGE_MAX_DIMENSION,
+)
+
+
+class ImageWriter:
+    """Background JPEG writer fed by a bounded queue"""
+
+    # When the queue is full: wait for room, or drop the oldest or new crop
+    OVERFLOW_POLICIES = ("block", "drop_oldest", "drop_new")
+
+    def __init__(
+        self,
+        queue_size=IMAGE_WRITER_QUEUE_SIZE,
+        threads=IMAGE_WRITER_THREADS,
+        overflow=IMAGE_WRITER_OVERFLOW,
+        jpeg_quality=IMAGE_JPEG_QUALITY,
+        max_dimension=IMAGE_MAX_DIMENSION,
+    ):
+        if overflow not in self.OVERFLOW_POLICIES:
+            raise ValueError(
+                f"Unknown overflow policy {overflow!r}, "
+                f"expected one of {', '.join(self.OVERFLOW_POLICIES)}"
+            )
+        self.queue_size = queue_size
+        self.threads = threads
+        self.overflow = overflow
+        self.jpeg_quality = jpeg_quality
+        self.max_dimension = max_dimension
+        self._reset_process_state()
+
+    def _reset_process_state(self):
+        self.queue = queue.Queue(maxsize=self.queue_size)
+        self.workers = []
+        self.lock = threading.Lock()
+        self.created_dirs = set()
+        self.counters = {
+            "enqueued": 0,
+            "written": 0,
+            "dropped": 0,
+            "failed": 0,
+            "max_depth": 0,
+            "write_seconds": 0.0,
+            "max_write_seconds": 0.0,
+            "latency_seconds": 0.0,
+        }
+
+    def submit(self, path, image):
+        """Queue an image as JPEG; False if it (or an older one) was dropped"""
+        self._ensure_workers()
+        # The crop is usually a view into a frame the camera loop reuses
+        item = (str(path), image.copy(), time.perf_counter())
+
+        accepted = True
+        if self.overflow == "block":
+            self.queue.put(item)
+        elif self.overflow == "drop_new":
+            try:
+                self.queue.put_nowait(item)
+            except queue.Full:
+                accepted = False
+        else:
+            while True:
+                try:
+                    self.queue.put_nowait(item)
+                    break
+                except queue.Full:
+                    try:
+                        self.queue.get_nowait()
+                        self.queue.task_done()
+                        accepted = False
+                    except queue.Empty:
+                        pass
+
+        with self.lock:
+            if accepted or self.overflow == "drop_oldest":
+                self.counters["enqueued"] += 1
+            if not accepted:
+                self.counters["dropped"] += 1
+            self.counters["max_depth"] = max(
+                self.counters["max_depth"], self.queue.qsize()
+            )
+        return accepted
+
+    def _ensure_workers(self):
+        """Start the writer threads lazily, inside the writing process"""
+        if len(self.workers) == self.threads and all(
+            worker.is_alive() for worker in self.workers
+        ):
+            return
+        self.workers = [worker for worker in self.workers if worker.is_alive()]
+        while len(self.workers) < self.threads:
+            worker = threading.Thread(
+                target=self._write_loop,
+                name=f"image-writer-{len(self.workers)}",
+                daemon=True,
+            )
+            worker.start()
+            self.workers.append(worker)
+
+    def _write_loop(self):
+        while True:
+            path, image, enqueued_at = self.queue.get()
+            try:
+                start = time.perf_counter()
+                self._write(path, image)
+                finished = time.perf_counter()
+                with self.lock:
+                    self.counters["written"] += 1
+                    self.counters["write_seconds"] += finished - start
+                    self.counters["max_write_seconds"] = max(
+                        self.counters["max_write_seconds"], finished - start
+                    )
+                    self.counters["latency_seconds"] += finished - enqueued_at
+            except Exception as e:
+                print(f"Error writing image {path}: {e}")
+                with self.lock:
+                    self.counters["failed"] += 1
+            finally:
+                self.queue.task_done()
+
+    def _write(self, path, image):
+        height, width = image.shape[:2]
+        if self.max_dimension and max(height, width) > self.max_dimension:
+            scale = self.max_dimension / max(height, width)
+            image = cv2.resize(
+                image,
+                (max(1, int(width * scale)), max(1, int(height * scale))),
+                interpolation=cv2.INTER_AREA,
+            )
+
+        directory = os.path.dirname(path)
+        if directory not in self.created_dirs:
+            os.makedirs(directory, exist_ok=True)
+            self.created_dirs.add(directory)
+
+        if not cv2.imwrite(path, image, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality]):
+            raise OSError("cv2.imwrite failed")
+
+    def flush(self):
+        """Wait until every queued image has been written"""
+        if self.workers:
+            self.queue.join()
+
+    def stats(self):
+        """Queue depth, drop and write-latency counters"""
+        with self.lock:
+            counters = dict(self.counters)
+        written = max(counters["written"], 1)
+        return {
+            "depth": self.queue.qsize(),
+            "max_depth": counters["max_depth"],
+            "enqueued": counters["enqueued"],
+            "written": counters["written"],
+            "dropped": counters["dropped"],
+            "failed": counters["failed"],
+            "avg_write_ms": counters["write_seconds"] / written * 1000,
+            "max_write_ms": counters["max_write_seconds"] * 1000,
+            "avg_latency_ms": counters["latency_seconds"] / written * 1000,
+        }
+
+    def __getstate__(self):
+        # Queue, threads and counters are per process
+        state = self.__dict__.copy()
+        for key in ("queue", "workers", "lock", "created_dirs", "counters"):
+            state.pop(key)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._reset_process_state()
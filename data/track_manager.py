@@ -1,47 +1,37 @@
-import os
+import uuid
 from datetime import datetime
-from data.json_manager import JSONManager
-from config.settings import TRACK_TEMP_FILE, CHECK_TRACK_TEMP_FILE, TRACK_RECORDS_DIR
+from data.event_log import EventLog
 
 
 class TrackManager:
-    def __init__(self):
-        self.current_date = datetime.now().strftime("%Y-%m-%d")
-        self.track_records_path = TRACK_RECORDS_DIR / self.current_date
-        self.track_records_path.mkdir(exist_ok=True)
+    def __init__(self, event_outbox=None, event_log=None):
+        self.event_outbox = event_outbox
+        self.event_log = event_log or EventLog()
 
     def mark_track_data(self, employee_id, camera_ip, block_no, seat_no):
         """Mark track data for recognized individuals"""
         try:
-            employee_file_path = self.track_records_path / f"{employee_id}.json"
-            current_time = datetime.now().strftime("%H:%M:%S")
+            now = datetime.now()
 
-            # Create new entry
+            # eventId identifies the event in the log and the outbox only;
+            # DataSender strips it before posting
             new_entry = {
+                "eventId": uuid.uuid4().hex,
                 "userPin": employee_id,
-                "date": self.current_date,
-                "time": current_time,
+                "date": now.strftime("%Y-%m-%d"),
+                "time": now.strftime("%H:%M:%S"),
                 "camIP": camera_ip,
                 "region": block_no,
                 "seat": seat_no,
             }
 
-            # Update employee-specific file
-            employee_data = JSONManager.safe_load_json(employee_file_path, default=[])
-            employee_data.append(new_entry)
-            JSONManager.safe_write_json(employee_file_path, employee_data)
+            # Append to the event log; per-employee and per-day views are
+            # derived from it
+            self.event_log.append(new_entry)
 
-            # Update temporary track files
-            track_data = JSONManager.safe_load_json(TRACK_TEMP_FILE, default=[])
-            check_track_data = JSONManager.safe_load_json(
-                CHECK_TRACK_TEMP_FILE, default=[]
-            )
-
-            track_data.append(new_entry)
-            check_track_data.append(new_entry)
-
-            JSONManager.safe_write_json(TRACK_TEMP_FILE, track_data)
-            JSONManager.safe_write_json(CHECK_TRACK_TEMP_FILE, check_track_data)
+            # Hand off to DataSender
+            if self.event_outbox is not None:
+                self.event_outbox.put(new_entry)
 
         except Exception as e:
             print(f"Error in mark_track_data: {e}")
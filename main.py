@@ -1,5 +1,5 @@
 import os
-import cupy as cp
+import threading
 from multiprocessing import Process, Event
 from dotenv import load_dotenv
 
@@ -10,90 +10,185 @@ load_dotenv()
 from config.constants import *
 from config.settings import *
 
+# Split the cores between the processes running models; BLAS sizes its
+# thread pool when numpy loads, so this comes before the imports below
+from utils.thread_budget import ThreadBudget
+
+# OpenCV windows cannot be shared by the camera threads of a worker
+STREAM_WORKERS = (
+    min(MAX_PROCESSES, len(CAMERA_URLS))
+    if MAX_PROCESSES > 0 and DISPLAY_MODE != "window"
+    else len(CAMERA_URLS)
+)
+THREAD_BUDGET = ThreadBudget(
+    STREAM_WORKERS, INFERENCE_WORKERS if INFERENCE_MODE == "server" else 0
+)
+THREAD_BUDGET.export_env()
+
 # Import modules
+from functools import partial
 from core.face_analyzer import FaceAnalyzer
-from core.face_matcher import FaceMatcher
-from core.region_detector import RegionDetector
-from core.video_processor import VideoProcessor
+from core.inference_server import InferenceServer
+from core.mosaic_viewer import MosaicViewer
+from core.stream_scheduler import StreamScheduler, StreamWorker
+from core.recognition_cooldown import RecognitionCooldown
 from data.json_manager import JSONManager
-from data.track_manager import TrackManager
-from data.image_manager import ImageManager
+from data.event_outbox import EventOutbox
+from data.gallery_store import GalleryStore, SharedGallery
+from data.gallery_watcher import GalleryWatcher
 from api.data_sender import DataSender
 from utils.signal_handler import SignalHandler
+from utils.metrics import StageMetrics, MetricsServer
 
 # Set API configuration from environment
 API_URL = os.getenv("API_URL")
 HEADERS = {"Content-Type": "application/json", "ApiKey": os.getenv("API_KEY")}
 
 
+def load_gallery():
+    """Load the face gallery, sharing one physical copy across processes"""
+    if GALLERY_SHARING == "json":
+        return list(GalleryStore.load_json_features(FEATURES_FILE))
+
+    if not GalleryStore.exists():
+        print(f"Binary gallery not found, converting {FEATURES_FILE} once...")
+        GalleryStore.convert_json()
+    elif GalleryStore.is_stale():
+        print(f"{FEATURES_FILE} changed since the last conversion, reconverting...")
+        GalleryStore.convert_json()
+    return SharedGallery.open(mode=GALLERY_SHARING)
+
+
 def load_shared_data():
     """Load all shared data for processes"""
-    features_list = JSONManager.safe_load_json(FEATURES_FILE, default={})
     names_list = JSONManager.safe_load_json(NAMES_FILE, default={})
     block_regions_list = JSONManager.safe_load_json(BLOCK_REGIONS_FILE, default={})
     seat_regions_list = JSONManager.safe_load_json(SEAT_REGIONS_FILE, default={})
     camera_list = JSONManager.safe_load_json(CAMERA_FILE, default={})
 
-    # Prepare feature matrix
-    user_ids = list(features_list.keys())
-    feature_matrix = cp.array([cp.array(v).flatten() for v in features_list.values()])
-    if feature_matrix.ndim > 2:
-        feature_matrix = feature_matrix.reshape(feature_matrix.shape[0], -1)
-
     return {
-        "features": [user_ids, feature_matrix],
+        "features": load_gallery(),
         "block_regions": block_regions_list,
         "seat_regions": seat_regions_list,
         "names": names_list,
         "camera_status": camera_list,
+        "recognition_cooldown": RecognitionCooldown(),
     }
 
 
+def create_face_analyzers():
+    """
+    Clients of a shared inference server; otherwise each stream worker loads
+    its own FaceAnalyzer, or inherits the pre-warmed one
+
+    Returns:
+        Tuple of (analyzer factory for forked workers, per-camera clients or
+        None, inference server or None)
+    """
+    face_analyzer_factory = (
+        FaceAnalyzer.shared_factory()
+        if MODEL_PREWARM
+        else partial(FaceAnalyzer, thread_budget=THREAD_BUDGET)
+    )
+    if INFERENCE_MODE != "server":
+        return face_analyzer_factory, None, None
+
+    server = InferenceServer(range(len(CAMERA_URLS)))
+    clients = [server.client(i) for i in range(len(CAMERA_URLS))]
+    return face_analyzer_factory, clients, server
+
+
 def main():
     # Initialize
     stop_event = Event()
     signal_handler = SignalHandler(stop_event)
 
-    # Clear existing data and setup signal handlers
-    signal_handler.clear_cache_and_data()
+    # Setup signal handlers
     signal_handler.setup_signal_handlers()
 
+    print(THREAD_BUDGET.describe())
+    if DISPLAY_MODE == "window" and 0 < MAX_PROCESSES < len(CAMERA_URLS):
+        print(
+            f"DISPLAY_MODE=window runs one stream worker per camera; "
+            f"MAX_PROCESSES={MAX_PROCESSES} applies to mosaic and headless only"
+        )
+    if DISPLAY_MODE != "headless" and not HAS_DISPLAY:
+        print(f"DISPLAY_MODE={DISPLAY_MODE} but no display is available")
+
     # Load shared data
     shared_data = load_shared_data()
 
-    # Create and start processes
-    processes = []
-    for camera_url in CAMERA_URLS:
-        processor = VideoProcessor(camera_url, shared_data, stop_event)
-        process = Process(
-            target=processor.process_stream,
-            args=(
-                FaceAnalyzer(),
-                FaceMatcher(),
-                RegionDetector(),
-                TrackManager(),
-                ImageManager(),
-            ),
-        )
-        processes.append(process)
+    # Hot-reload gallery and names changes into running processes
+    if isinstance(shared_data["features"], SharedGallery) and GALLERY_RELOAD_INTERVAL:
+        GalleryWatcher(
+            shared_data["features"], shared_data["names"], stop_event
+        ).start()
+
+    # Durable channel from camera processes to the data sender
+    event_outbox = EventOutbox()
+
+    # Face analysis per camera or through shared inference workers
+    face_analyzer_factory, face_analyzers, inference_server = create_face_analyzers()
+
+    # Per-stage latency histograms, written by every process and served here
+    metrics = None
+    if METRICS_ENABLED:
+        metrics = StageMetrics(CAMERA_URLS + ["data_sender"])
+        MetricsServer(metrics).start()
+
+    # One rate-limited mosaic window instead of a window per camera
+    viewer = MosaicViewer(CAMERA_URLS) if DISPLAY_MODE == "mosaic" else None
+    viewer_processes = []
+    if viewer is not None:
+        viewer_processes.append(Process(target=viewer.run, args=(stop_event,)))
+
+    # A fixed pool of stream workers runs all cameras
+    stream_worker = StreamWorker(
+        shared_data,
+        event_outbox,
+        viewer,
+        metrics,
+        face_analyzer_factory=face_analyzer_factory,
+        face_analyzers=face_analyzers,
+        thread_budget=THREAD_BUDGET,
+    )
+    scheduler = StreamScheduler(CAMERA_URLS, stream_worker, workers=STREAM_WORKERS)
 
     # Start data sender
-    data_sender = DataSender()
+    data_sender = DataSender(event_outbox, metrics=metrics)
     track_process = Process(target=data_sender.send_track_data, args=(stop_event,))
     track_process.start()
 
-    # Start camera processes
-    for process in processes:
+    # Start inference workers, viewer and stream workers; inference workers
+    # take the budget slots after the stream workers
+    if inference_server is not None:
+        inference_server.start(
+            stop_event, face_analyzer_factory, THREAD_BUDGET, STREAM_WORKERS
+        )
+        threading.Thread(
+            target=inference_server.supervise, args=(stop_event,), daemon=True
+        ).start()
+    for process in viewer_processes:
         process.start()
+    scheduler.start(stop_event)
 
-    # Wait for processes to complete
+    # Supervise stream workers, then wait for processes to complete
     try:
-        for process in processes:
+        scheduler.supervise(stop_event)
+        scheduler.join()
+        if inference_server is not None:
+            inference_server.join()
+        for process in viewer_processes:
             process.join()
         track_process.join()
     except KeyboardInterrupt:
         print("Shutting down...")
         stop_event.set()
+    finally:
+        if isinstance(shared_data["features"], SharedGallery):
+            shared_data["features"].close()
+        if inference_server is not None:
+            inference_server.pool.close(unlink=True)
 
     print("System stopped.")
 
@@ -0,0 +1,53 @@
+import numpy as np
+
+from benchmarks.common import noisy_queries, synthetic_embeddings
+from core.ann_index import IVFIndex
+from core.face_matcher import FaceMatcher
+
+
+def brute_force_top1(gallery, queries):
+    return np.argmax(queries @ gallery.T, axis=1)
+
+
+def test_recall_against_brute_force():
+    gallery = synthetic_embeddings(5000, dim=64)
+    queries = noisy_queries(gallery, 200)
+    index = IVFIndex(nlist=64, nprobe=8).build(gallery)
+
+    indices, scores = index.search(queries, k=1)
+    recall = np.mean(indices[:, 0] == brute_force_top1(gallery, queries))
+    assert recall >= 0.95
+    # Scores are exact inner products of the returned rows
+    np.testing.assert_allclose(
+        scores[:, 0], np.sum(gallery[indices[:, 0]] * queries, axis=1), rtol=1e-5
+    )
+
+
+def test_probing_every_list_is_brute_force():
+    gallery = synthetic_embeddings(2000, dim=32)
+    queries = noisy_queries(gallery, 50)
+    index = IVFIndex(nlist=16).build(gallery)
+
+    indices, _ = index.search(queries, k=1, nprobe=16)
+    assert np.array_equal(indices[:, 0], brute_force_top1(gallery, queries))
+
+
+def test_index_references_the_gallery_instead_of_copying_it():
+    gallery = synthetic_embeddings(1000, dim=32)
+    index = IVFIndex(nlist=8).build(gallery)
+    assert index.vectors is gallery
+    assert index.row_ids.dtype == np.int32
+    assert sorted(index.row_ids.tolist()) == list(range(len(gallery)))
+
+
+def test_matcher_searches_a_quantized_gallery_through_the_index(monkeypatch):
+    monkeypatch.setattr("core.face_matcher.IVF_MIN_GALLERY_SIZE", 100)
+    gallery = synthetic_embeddings(3000, dim=64)
+    queries = noisy_queries(gallery, 100)
+    face_matcher = FaceMatcher(backend="numpy", index="ivf", precision="int8")
+    face_matcher.set_gallery([str(i) for i in range(len(gallery))], gallery, True)
+
+    assert face_matcher.index.vectors is gallery
+    indices, _ = face_matcher.search(queries)
+    recall = np.mean(indices[:, 0] == brute_force_top1(gallery, queries))
+    assert recall >= 0.9
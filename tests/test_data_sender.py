@@ -0,0 +1,25 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from api.data_sender import DataSender
+
+
+class FakeOutbox:
+    def __init__(self):
+        self.acked = []
+
+    def ack(self, row_ids):
+        self.acked.extend(row_ids)
+
+
+def test_local_event_id_is_not_posted():
+    outbox = FakeOutbox()
+    data_sender = DataSender(outbox, api_url="http://api.invalid")
+    data_sender.executor = ThreadPoolExecutor(max_workers=1)
+    posted = []
+    data_sender._send_with_retry = lambda data: posted.extend(data) or True
+
+    event = {"eventId": "abc", "userPin": "42", "camIP": "10.0.0.1"}
+    assert data_sender._deliver([(7, event)]) == (1, 0)
+    assert posted == [{"userPin": "42", "camIP": "10.0.0.1"}]
+    assert event["eventId"] == "abc"  # the outbox row keeps it
+    assert outbox.acked == [7]
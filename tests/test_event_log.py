@@ -0,0 +1,56 @@
+import json
+
+from data.event_log import EventLog, EventLogReader
+
+
+def make_event(i, date="2026-01-02"):
+    return {"userPin": str(i % 3), "date": date, "time": f"{date} 08:00:{i:02d}"}
+
+
+def test_torn_tail_is_skipped_and_truncated_on_reopen(tmp_path):
+    event_log = EventLog(tmp_path, flush_events=100, fsync=False)
+    for i in range(3):
+        event_log.append(make_event(i))
+    event_log.close()
+
+    # A crash mid-write leaves a record without its newline
+    (segment,) = EventLogReader(tmp_path).segments()
+    with open(segment, "ab") as file:
+        file.write(b'{"userPin": "9", "da')
+    events, offset = EventLogReader.read_segment(segment)
+    assert [event["time"] for event in events] == [
+        make_event(i)["time"] for i in range(3)
+    ]
+    assert offset < segment.stat().st_size
+
+    # Reopening the segment replays the complete records and appends after them
+    event_log = EventLog(tmp_path, flush_events=100, fsync=False)
+    event_log.append(make_event(3))
+    event_log.close()
+    assert len(EventLogReader(tmp_path).day_view("2026-01-02")) == 4
+    assert EventLogReader.read_segment(segment)[1] == segment.stat().st_size
+
+
+def test_unflushed_events_are_committed_at_the_group_size(tmp_path):
+    event_log = EventLog(tmp_path, flush_events=2, flush_interval=60, fsync=False)
+    event_log.append(make_event(0))
+    assert EventLogReader(tmp_path).day_view("2026-01-02") == []
+    event_log.append(make_event(1))
+    assert len(EventLogReader(tmp_path).day_view("2026-01-02")) == 2
+
+
+def test_employee_view_merges_segments_in_time_order(tmp_path):
+    event_log = EventLog(tmp_path, fsync=False)
+    for i in (0, 3, 6):
+        event_log.append(make_event(i))
+    event_log.close()
+
+    # Another process's segment of the same day
+    (segment,) = EventLogReader(tmp_path).segments()
+    other = segment.with_name("events-1.jsonl")
+    other.write_text("".join(json.dumps(make_event(i)) + "\n" for i in (1, 4)))
+
+    view = EventLogReader(tmp_path).employee_view("2026-01-02", 0)
+    assert [event["time"][-2:] for event in view] == ["00", "03", "06"]
+    view = EventLogReader(tmp_path).employee_view("2026-01-02", 1)
+    assert [event["time"][-2:] for event in view] == ["01", "04"]
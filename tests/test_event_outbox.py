@@ -0,0 +1,35 @@
+import os
+from multiprocessing import Process
+
+from data.event_outbox import EventOutbox
+
+
+def produce_and_die(outbox, count):
+    for i in range(count):
+        outbox.put({"seq": i})
+    os._exit(1)  # no cleanup, as in a crash
+
+
+def test_unacked_events_are_replayed_after_a_crash(tmp_path):
+    outbox = EventOutbox(tmp_path / "outbox.sqlite3")
+    producer = Process(target=produce_and_die, args=(outbox, 5))
+    producer.start()
+    producer.join()
+    # Its wake-up tokens may die with it; the committed rows do not
+    assert outbox.pending() == 5
+
+    # The sender fetches a page and dies before acknowledging it
+    page = outbox.fetch(3)
+    assert [event["seq"] for _, event in page] == [0, 1, 2]
+
+    restarted = EventOutbox(tmp_path / "outbox.sqlite3")
+    replayed = restarted.fetch(10)
+    assert [event["seq"] for _, event in replayed] == [0, 1, 2, 3, 4]
+    restarted.ack([row_id for row_id, _ in replayed[:2]])
+    assert [event["seq"] for _, event in restarted.fetch(10)] == [2, 3, 4]
+    assert restarted.pending() == 3
+
+
+def test_wait_times_out_without_events(tmp_path):
+    outbox = EventOutbox(tmp_path / "outbox.sqlite3")
+    assert not outbox.wait(0.05)
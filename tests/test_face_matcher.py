@@ -0,0 +1,45 @@
+import numpy as np
+
+from benchmarks.common import noisy_queries, synthetic_embeddings
+from core.face_matcher import FaceMatcher
+
+
+def ivf_matcher(monkeypatch, gallery, precision="float32"):
+    monkeypatch.setattr("core.face_matcher.IVF_MIN_GALLERY_SIZE", 100)
+    face_matcher = FaceMatcher(backend="numpy", index="ivf", precision=precision)
+    face_matcher.set_gallery([str(i) for i in range(len(gallery))], gallery, True)
+    return face_matcher
+
+
+def test_delta_updates_the_ivf_index_without_retraining(monkeypatch):
+    gallery = synthetic_embeddings(3000, dim=64)
+    face_matcher = ivf_matcher(monkeypatch, gallery)
+    centroids = face_matcher.index.centroids
+    monkeypatch.setattr(
+        "core.ann_index.IVFIndex._train",
+        lambda *args: (_ for _ in ()).throw(AssertionError("retrained")),
+    )
+
+    added = synthetic_embeddings(5, dim=64, seed=7)
+    face_matcher.apply_delta(["0", "1"], ["new-a", "new-b", "2"], added[:3])
+
+    assert face_matcher.index.centroids is centroids
+    assert len(face_matcher.index.row_ids) == len(face_matcher.row_ids) == 3000
+    ids, _ = face_matcher.match_batch(added[:3], threshold=0.99)
+    assert [row[0] for row in ids] == ["new-a", "new-b", "2"]
+    ids, _ = face_matcher.match_batch(gallery[:2], threshold=0.99)
+    assert "0" not in ids[0] and "1" not in ids[1]
+
+
+def test_delta_keeps_the_ivf_index_consistent_with_the_gallery(monkeypatch):
+    gallery = synthetic_embeddings(3000, dim=64)
+    face_matcher = ivf_matcher(monkeypatch, gallery, precision="int8")
+    face_matcher.apply_delta(["10"], ["20"], synthetic_embeddings(1, dim=64, seed=3))
+
+    queries = noisy_queries(gallery, 100)
+    indices, scores = face_matcher.index.search(queries, k=1, nprobe=10**6)
+    vectors = np.asarray(face_matcher.exact, dtype=np.float32)
+    np.testing.assert_allclose(
+        scores[:, 0], np.sum(vectors[indices[:, 0]] * queries, axis=1), rtol=1e-5
+    )
+    assert np.array_equal(indices[:, 0], np.argmax(queries @ vectors.T, axis=1))
@@ -0,0 +1,25 @@
+import numpy as np
+import pytest
+
+from core.face_quality import FaceQualityGate
+
+# Eyes, nose tip and mouth corners of a frontal face, eye distance 1
+FACE = np.array([[-0.5, 0, 0], [0.5, 0, 0], [0, 0.5, 0.4], [-0.35, 1, 0], [0.35, 1, 0]])
+
+
+def landmarks(pitch=0.0, yaw=0.0):
+    a, b = np.radians(pitch), np.radians(yaw)
+    tilt = np.array([[1, 0, 0], [0, np.cos(a), -np.sin(a)], [0, np.sin(a), np.cos(a)]])
+    turn = np.array([[np.cos(b), 0, np.sin(b)], [0, 1, 0], [-np.sin(b), 0, np.cos(b)]])
+    return (FACE @ tilt.T @ turn.T)[:, :2] * 100 + 300
+
+
+@pytest.mark.parametrize("yaw", [0, 15, 30, 45, 60])
+def test_yaw_estimate_is_within_a_degree(yaw):
+    assert FaceQualityGate().pose(landmarks(yaw=yaw))[0] == pytest.approx(yaw, abs=1)
+
+
+def test_default_pitch_limit_keeps_faces_of_ceiling_cameras():
+    gate = FaceQualityGate()
+    assert gate.pose(landmarks(pitch=40))[1] <= gate.max_pitch
+    assert gate.pose(landmarks(pitch=60))[1] > gate.max_pitch
@@ -0,0 +1,52 @@
+from types import SimpleNamespace
+
+from core.face_tracker import FaceTracker
+
+
+def face(x, score=0.9):
+    return SimpleNamespace(bbox=[x, 0, x + 50, 50], det_score=score)
+
+
+def test_moving_face_keeps_its_track():
+    tracker = FaceTracker(iou_threshold=0.3)
+    (track,) = tracker.update([face(0)])
+    for x in (20, 40, 60, 80):
+        (seen,) = tracker.update([face(x)])
+        assert seen is track
+    assert track.hits == 5
+
+
+def test_low_score_detection_keeps_a_track_but_starts_none():
+    tracker = FaceTracker(high_score=0.6)
+    (track,) = tracker.update([face(0)])
+    seen = tracker.update([face(5, score=0.3), face(300, score=0.3)])
+    assert seen == [track]
+    assert len(tracker.tracks) == 1
+
+
+def test_track_expires_after_max_misses():
+    tracker = FaceTracker(max_misses=2)
+    tracker.update([face(0)])
+    assert tracker.update([]) == [] and len(tracker.tracks) == 1
+    tracker.update([])
+    assert len(tracker.tracks) == 1
+    tracker.update([])
+    assert tracker.tracks == []
+
+
+def test_recognition_refresh_and_retry_intervals():
+    tracker = FaceTracker(refresh_interval=10, retry_interval=1, min_confidence=0.6)
+    known, unknown, weak = tracker.update([face(0), face(200), face(400)])
+    for track in (known, unknown, weak):
+        assert tracker.needs_recognition(track, now=0.0)
+    tracker.set_identity(known, "42", 0.8, now=0.0)
+    tracker.set_identity(unknown, "Unknown", 0.2, now=0.0)
+    tracker.set_identity(weak, "7", 0.5, now=0.0)
+
+    assert not tracker.needs_recognition(known, now=9.9)
+    assert tracker.needs_recognition(known, now=10.0)
+    assert tracker.needs_recognition(unknown, now=1.0)
+    assert tracker.needs_recognition(weak, now=1.0)
+
+    tracker.invalidate_identities()
+    assert tracker.needs_recognition(known, now=0.0)
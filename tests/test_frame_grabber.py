@@ -0,0 +1,49 @@
+import threading
+
+import numpy as np
+
+import core.frame_grabber
+from core.frame_grabber import FrameGrabber
+
+
+class FakeCapture:
+    def __init__(self, *args):
+        self.released = threading.Event()
+
+    def set(self, *args):
+        return True
+
+    def get(self, prop):
+        return 0
+
+    def isOpened(self):
+        return True
+
+    def read(self):
+        return True, np.zeros((2, 2, 3), dtype=np.uint8)
+
+    def release(self):
+        self.released.set()
+
+
+def test_skipped_frames_are_not_counted_as_dropped():
+    grabber = FrameGrabber("rtsp://camera")
+    grabber.seq = 5
+    grabber.frame = "frame"
+    assert grabber.read(skip_frames=2, timeout=0)[0] == "frame"
+    grabber.seq = 8
+    assert grabber.read(skip_frames=2, timeout=0)[0] == "frame"
+    stats = grabber.stats()
+    assert stats["read"] == 2
+    assert stats["skipped"] == 4
+    assert stats["dropped"] == 2
+
+
+def test_capture_is_released_by_the_exiting_thread(monkeypatch):
+    monkeypatch.setattr(core.frame_grabber.cv2, "VideoCapture", FakeCapture)
+    grabber = FrameGrabber("rtsp://camera")
+    assert grabber.start()
+    assert grabber.read(timeout=1)[0] is not None
+    grabber.stop()
+    assert not grabber.thread.is_alive()
+    assert grabber.capture.released.is_set()
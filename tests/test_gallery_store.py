@@ -0,0 +1,24 @@
+import json
+import os
+
+from data.gallery_store import GalleryStore
+
+
+def test_binary_gallery_is_stale_once_the_json_changes(tmp_path):
+    features_file = tmp_path / "features.json"
+    matrix_file, ids_file = tmp_path / "gallery.npy", tmp_path / "gallery_ids.json"
+    assert GalleryStore.is_stale(features_file, matrix_file, ids_file)
+
+    features_file.write_text(json.dumps({"1": [1.0, 0.0]}))
+    GalleryStore.convert_json(features_file, matrix_file, ids_file)
+    assert not GalleryStore.is_stale(features_file, matrix_file, ids_file)
+
+    # The JSON is edited after the conversion
+    for path in (matrix_file, ids_file):
+        os.utime(path, ns=(1_000_000_000, 1_000_000_000))
+    features_file.write_text(json.dumps({"1": [1.0, 0.0], "2": [0.0, 1.0]}))
+    assert GalleryStore.is_stale(features_file, matrix_file, ids_file)
+
+    user_ids, matrix = GalleryStore.convert_json(features_file, matrix_file, ids_file)
+    assert user_ids == ["1", "2"] and matrix.shape == (2, 2)
+    assert not GalleryStore.is_stale(features_file, matrix_file, ids_file)
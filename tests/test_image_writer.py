@@ -0,0 +1,63 @@
+import threading
+
+import cv2
+import numpy as np
+import pytest
+
+from data.image_writer import ImageWriter
+
+
+def blocked_writer(overflow, queue_size=2):
+    """A writer whose single thread stalls on its first image until released"""
+    writer = ImageWriter(queue_size=queue_size, threads=1, overflow=overflow)
+    release, started, written = threading.Event(), threading.Event(), []
+
+    def write(path, image):
+        started.set()
+        release.wait(5)
+        written.append(path)
+
+    writer._write = write
+    image = np.zeros((4, 4, 3), dtype=np.uint8)
+    writer.submit("stalled", image)
+    started.wait(5)
+    return writer, release, written, image
+
+
+def test_drop_new_rejects_crops_while_the_queue_is_full():
+    writer, release, written, image = blocked_writer("drop_new")
+    assert writer.submit("a", image) and writer.submit("b", image)
+    assert not writer.submit("c", image)
+    release.set()
+    writer.flush()
+    assert written == ["stalled", "a", "b"]
+    assert writer.stats()["dropped"] == 1
+
+
+def test_drop_oldest_keeps_the_newest_crops():
+    writer, release, written, image = blocked_writer("drop_oldest")
+    assert writer.submit("a", image) and writer.submit("b", image)
+    assert not writer.submit("c", image)
+    release.set()
+    writer.flush()
+    assert written == ["stalled", "b", "c"]
+    stats = writer.stats()
+    assert stats["dropped"] == 1 and stats["max_depth"] == 2
+
+
+def test_writes_a_copy_resized_to_the_max_dimension(tmp_path):
+    writer = ImageWriter(max_dimension=32)
+    image = np.full((64, 128, 3), 200, dtype=np.uint8)
+    path = tmp_path / "day" / "face.jpg"
+    writer.submit(path, image)
+    image[...] = 0  # the camera loop reuses its frame buffer
+    writer.flush()
+
+    written = cv2.imread(str(path))
+    assert written.shape == (16, 32, 3)
+    assert abs(int(written.mean()) - 200) <= 2
+
+
+def test_unknown_overflow_policy_is_rejected():
+    with pytest.raises(ValueError):
+        ImageWriter(overflow="drop_all")
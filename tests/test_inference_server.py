@@ -0,0 +1,134 @@
+import os
+import signal
+import sys
+import time
+from types import SimpleNamespace
+from multiprocessing import Event, Process
+
+import numpy as np
+
+from core.inference_server import FrameSlotPool, InferenceServer, ReaderQueue
+
+
+class FakeFace:
+    def __init__(self, kps):
+        self.kps = kps
+        self.embedding = None
+
+
+class FakeAnalyzer:
+    def detect(self, frame, rois=None):
+        return [FakeFace(int(frame.sum()))]
+
+    def crop(self, frame, faces):
+        return [frame] * len(faces)
+
+    def embed_crops(self, crops, faces):
+        for face, crop in zip(faces, crops):
+            face.embedding = int(crop.sum())
+
+
+def test_acquire_times_out_when_every_slot_is_taken():
+    pool = FrameSlotPool(slots=1, slot_bytes=16)
+    try:
+        assert pool.acquire(timeout=0.05) == 0
+        assert pool.acquire(timeout=0.05) is None
+        pool.release(0)
+        assert pool.acquire(timeout=0.05) == 0
+    finally:
+        pool.close(unlink=True)
+
+
+def test_frames_travel_inline_when_no_slot_frees_up():
+    server = InferenceServer([0], workers=0)
+    client = server.client(0)
+    try:
+        taken = [server.pool.acquire() for _ in range(server.pool.slots)]
+        assert None not in taken
+        frame = np.ones((2, 2, 3), dtype=np.uint8)
+        assert client.get_faces(frame, timeout=0.05) == []  # nobody serves
+        request = server.request_queue.get(timeout=1)
+        assert request[3] is None
+        assert np.array_equal(request[6], frame)
+    finally:
+        server.pool.close(unlink=True)
+
+
+def test_dead_worker_is_restarted_and_its_slots_reclaimed():
+    server = InferenceServer([0], workers=1)
+    server.RESTART_DELAY = 0.0
+    stop_event = Event()
+    client = server.client(0)
+    try:
+        server.start(stop_event, FakeAnalyzer)
+        frame = np.ones((2, 2, 3), dtype=np.uint8)
+        assert [face.kps for face in client.get_faces(frame, timeout=5)] == [12]
+
+        # The worker dies holding a slot, blocked reading requests; the pause
+        # lets its queue feeder thread finish and drop the write lock
+        slot = server.pool.acquire()
+        server.pool.take(slot, 0)
+        time.sleep(0.2)
+        os.kill(server.processes[0].pid, signal.SIGKILL)
+        server.processes[0].join()
+        server._restart_crashed(stop_event)
+        server._recover_readers()
+        assert server.pool.holders[slot] == -1
+        assert server.processes[0].is_alive()
+
+        faces = client.get_faces(frame * 2, timeout=5)
+        assert [face.embedding for face in faces] == [24]
+        free = [server.pool.acquire(timeout=0.05) for _ in range(server.pool.slots)]
+        assert None not in free
+    finally:
+        stop_event.set()
+        server.join()
+        server.pool.close(unlink=True)
+
+
+def test_embed_sends_only_the_aligned_crops(monkeypatch):
+    server = InferenceServer([0], workers=0)
+    client = server.client(0)
+    server.crop_size.value = 4
+
+    def norm_crop(frame, kps, size):
+        return np.full((size, size, 3), kps, dtype=np.uint8)
+
+    face_align = SimpleNamespace(norm_crop=norm_crop)
+    monkeypatch.setitem(sys.modules, "insightface", SimpleNamespace())
+    monkeypatch.setitem(
+        sys.modules, "insightface.utils", SimpleNamespace(face_align=face_align)
+    )
+    try:
+        frame = np.zeros((480, 640, 3), dtype=np.uint8)
+        faces = [FakeFace(1), FakeFace(2)]
+        assert client.embed(frame, faces, timeout=0.05) == []  # nobody serves
+        request = server.request_queue.get(1)
+        assert request[2] == "embed_crops" and request[3] is None
+        assert request[6].shape == (2, 4, 4, 3)
+
+        server._process_batch(FakeAnalyzer(), [request])
+        seq, embedded = server.result_queues[0].get(1)
+        assert [face.embedding for face in embedded] == [48, 96]
+    finally:
+        server.pool.close(unlink=True)
+
+
+def blocked_reader(reader_queue):
+    reader_queue.get(60)
+
+
+def test_dead_reader_locks_are_freed():
+    reader_queue = ReaderQueue()
+    reader = Process(target=blocked_reader, args=(reader_queue,))
+    reader.start()
+    while reader_queue.reader.value != reader.pid:
+        time.sleep(0.01)
+    assert not reader_queue.recover()  # still alive
+
+    os.kill(reader.pid, signal.SIGKILL)
+    reader.join()
+    reader_queue.put("item")
+    assert reader_queue.get(0.05) is None  # starved behind the dead reader
+    assert reader_queue.recover()
+    assert reader_queue.get(1) == "item"
@@ -0,0 +1,12 @@
+import socket
+
+from utils.metrics import MetricsServer, StageMetrics
+
+
+def test_taken_port_leaves_the_endpoint_off():
+    with socket.socket() as taken:
+        taken.bind(("127.0.0.1", 0))
+        taken.listen()
+        port = taken.getsockname()[1]
+        server = MetricsServer(StageMetrics(["cam"]), "127.0.0.1", port)
+        assert server.start() is None
@@ -0,0 +1,84 @@
+from multiprocessing import Process, Queue
+
+import pytest
+
+from core.recognition_cooldown import RecognitionCooldown
+
+
+def test_alternating_cameras_respect_per_camera_cooldown():
+    cooldown = RecognitionCooldown(cooldown=60, policy="camera", slots=64, stripes=4)
+    fired = [
+        cooldown.should_fire("42", camera, "1", now=1000 + i)
+        for i, camera in enumerate(["cam-a", "cam-b"] * 3)
+    ]
+    assert fired == [True, True, False, False, False, False]
+
+
+def test_alternating_blocks_respect_per_block_cooldown():
+    cooldown = RecognitionCooldown(cooldown=60, policy="block", slots=64, stripes=4)
+    fired = [
+        cooldown.should_fire("42", "cam-a", block, now=1000 + i)
+        for i, block in enumerate(["1", "2"] * 3)
+    ]
+    assert fired == [True, True, False, False, False, False]
+
+
+def test_overlapping_cameras_report_a_block_once():
+    cooldown = RecognitionCooldown(cooldown=60, policy="block", slots=64, stripes=4)
+    assert cooldown.should_fire("42", "cam-a", "1", now=1000)
+    assert not cooldown.should_fire("42", "cam-b", "1", now=1001)
+
+
+def test_identity_policy_fires_once_everywhere():
+    cooldown = RecognitionCooldown(cooldown=60, policy="identity", slots=64, stripes=4)
+    assert cooldown.should_fire("42", "cam-a", "1", now=1000)
+    assert not cooldown.should_fire("42", "cam-b", "2", now=1001)
+
+
+def test_fires_again_after_cooldown():
+    cooldown = RecognitionCooldown(cooldown=60, policy="camera", slots=64, stripes=4)
+    assert cooldown.should_fire("42", "cam-a", now=1000)
+    assert not cooldown.should_fire("42", "cam-a", now=1059)
+    assert cooldown.should_fire("42", "cam-a", now=1061)
+
+
+def test_full_stripe_evicts_the_oldest_entry():
+    cooldown = RecognitionCooldown(cooldown=60, policy="identity", slots=2, stripes=1)
+    assert cooldown.should_fire("1", "cam-a", now=1000)
+    assert cooldown.should_fire("2", "cam-a", now=1001)
+    assert cooldown.should_fire("3", "cam-a", now=1002)  # evicts "1"
+    assert cooldown.should_fire("1", "cam-a", now=1003)
+    assert not cooldown.should_fire("3", "cam-a", now=1004)
+
+
+def test_expired_slots_are_reused():
+    cooldown = RecognitionCooldown(cooldown=10, policy="identity", slots=2, stripes=1)
+    for i in range(100):
+        assert cooldown.should_fire(str(i), "cam-a", now=1000 + 20 * i)
+    assert len(set(cooldown.table["key"].ravel()) - {0}) <= 2
+    assert cooldown.stats() == {"fired": 100, "suppressed": 0}
+
+
+def fire_many(cooldown, results):
+    results.put(
+        sum(cooldown.should_fire(str(i), "cam", now=1000.0) for i in range(200))
+    )
+
+
+def test_racing_processes_fire_each_key_once():
+    cooldown = RecognitionCooldown(
+        cooldown=60, policy="identity", slots=1024, stripes=8
+    )
+    results = Queue()
+    processes = [Process(target=fire_many, args=(cooldown, results)) for _ in range(4)]
+    for process in processes:
+        process.start()
+    fired = sum(results.get(timeout=30) for _ in processes)
+    for process in processes:
+        process.join()
+    assert fired == 200
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        RecognitionCooldown(policy="seat")
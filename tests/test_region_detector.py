@@ -0,0 +1,57 @@
+import cv2
+import numpy as np
+
+from core.region_detector import RegionDetector
+
+BLOCKS = [
+    {"A": [[0.1, 0.1], [0.5, 0.1], [0.5, 0.5], [0.1, 0.5]]},
+    {"B": [[0.3, 0.3], [0.8, 0.3], [0.6, 0.9]]},  # overlaps A
+]
+SEATS = [{"S1": [0.6, 0.1, 0.2, 0.1]}, {"S2": [0.65, 0.12, 0.2, 0.1]}]
+
+
+def make_detector():
+    detector = RegionDetector(draw=False, map_scale=1.0)
+    detector.update_regions(BLOCKS, SEATS, 640, 480)
+    return detector
+
+
+def brute_force_block(detector, center):
+    for block_no, points in detector.block_points:
+        if cv2.pointPolygonTest(points, center, False) >= 0:
+            return block_no
+    return None
+
+
+def brute_force_seat(detector, center):
+    x, y = center
+    for seat_no, x_min, y_min, x_max, y_max in detector.seat_points:
+        if x_min < x < x_max and y_min < y < y_max:
+            return seat_no
+    return None
+
+
+def test_batch_lookup_matches_the_sequential_checks():
+    detector = make_detector()
+    rng = np.random.default_rng(0)
+    centers = [
+        (int(x), int(y))
+        for x, y in zip(rng.integers(0, 640, 2000), rng.integers(0, 480, 2000))
+    ]
+    blocks, seats = detector.lookup_regions(centers)
+    mismatches = sum(
+        block != brute_force_block(detector, center)
+        for block, center in zip(blocks, centers)
+    )
+    # Only polygon edge pixels may rasterize differently
+    assert mismatches <= 20
+    assert seats == [brute_force_seat(detector, center) for center in centers]
+
+
+def test_first_region_wins_an_overlap_and_outside_is_none():
+    detector = make_detector()
+    blocks, seats = detector.lookup_regions([(256, 192), (600, 470), (-5, 900)])
+    assert blocks == ["A", None, None]
+    assert seats == [None, None, None]
+    assert detector.lookup_regions([(400, 60)])[1] == ["S1"]
+    assert detector.lookup_regions([]) == ([], [])
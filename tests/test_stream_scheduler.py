@@ -0,0 +1,69 @@
+import numpy as np
+
+from core.stream_scheduler import StreamScheduler
+
+
+class FakeProcess:
+    def __init__(self, alive=True):
+        self.alive = alive
+        self.exitcode = None if alive else -9
+
+    def is_alive(self):
+        return self.alive
+
+
+class FakeStopEvent:
+    def is_set(self):
+        return False
+
+
+def make_scheduler(loads, workers, threshold=0.2):
+    scheduler = StreamScheduler(
+        [f"cam-{i}" for i in range(len(loads))],
+        stream_worker=None,
+        workers=workers,
+        rebalance_threshold=threshold,
+    )
+    scheduler.loads = np.array(loads, dtype=float)
+    scheduler.owners[:] = scheduler.assignment
+    scheduler._start_worker = lambda worker, stop_event: FakeProcess()
+    return scheduler
+
+
+def test_cameras_are_dealt_round_robin_to_at_most_one_worker_each():
+    scheduler = StreamScheduler(["a", "b", "c"], stream_worker=None, workers=8)
+    assert scheduler.workers == 3
+    assert scheduler.assignment.tolist() == [0, 1, 2]
+
+
+def test_rebalance_moves_the_camera_that_best_narrows_the_gap():
+    # Worker 0 runs cameras 0 and 2 (1.0 + 0.6), worker 1 runs 1 and 3 (0.1 + 0.1)
+    scheduler = make_scheduler([1.0, 0.1, 0.6, 0.1], workers=2)
+    scheduler._rebalance()
+    assert scheduler.assignment.tolist() == [0, 1, 1, 1]
+
+
+def test_rebalance_leaves_a_small_gap_alone():
+    scheduler = make_scheduler([0.5, 0.4, 0.5, 0.4], workers=2, threshold=0.25)
+    scheduler._rebalance()
+    assert scheduler.assignment.tolist() == [0, 1, 0, 1]
+
+
+def test_rebalance_waits_for_a_move_in_progress():
+    scheduler = make_scheduler([1.0, 0.1, 0.6, 0.1], workers=2)
+    scheduler.owners[2] = -1  # released by its old worker, not yet opened
+    scheduler._rebalance()
+    assert scheduler.assignment.tolist() == [0, 1, 0, 1]
+
+
+def test_crashed_worker_cameras_go_to_the_least_loaded_workers():
+    scheduler = make_scheduler([0.1, 0.9, 0.1, 0.1, 0.8, 0.1], workers=3)
+    scheduler.RESTART_DELAY = 0.0
+    scheduler.processes = [FakeProcess(), FakeProcess(alive=False), FakeProcess()]
+
+    scheduler._restart_crashed(FakeStopEvent())
+    assert scheduler.processes[1].is_alive()
+    # Heaviest first: camera 1 to the restarted, idle worker, camera 4 to the
+    # least loaded of the others
+    assert scheduler.assignment.tolist() == [0, 1, 2, 0, 0, 2]
+    assert scheduler.owners.tolist() == [0, -1, 2, 0, -1, 2]
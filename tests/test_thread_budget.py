@@ -0,0 +1,39 @@
+import os
+
+import pytest
+
+from utils.thread_budget import ThreadBudget
+
+
+@pytest.fixture
+def cores_32(monkeypatch):
+    monkeypatch.setattr(os, "sched_getaffinity", lambda pid: set(range(32)))
+
+
+def test_stream_workers_share_the_cores_equally_without_inference_workers(cores_32):
+    budget = ThreadBudget(8, enabled=True)
+    assert [budget.threads_for(slot) for slot in range(8)] == [4] * 8
+    assert set().union(*(budget.cpu_set(slot) for slot in range(8))) == set(range(32))
+
+
+def test_server_mode_gives_inference_workers_most_cores(cores_32):
+    budget = ThreadBudget(8, 2, enabled=True, stream_threads=1)
+    assert [budget.threads_for(slot) for slot in range(8)] == [1] * 8
+    assert [budget.threads_for(slot) for slot in (8, 9)] == [12, 12]
+
+    stream_cpus = set().union(*(budget.cpu_set(slot) for slot in range(8)))
+    assert stream_cpus == set(range(8))
+    assert budget.cpu_set(8) == set(range(8, 20))
+    assert budget.cpu_set(9) == set(range(20, 32))
+
+
+def test_stream_share_is_capped_at_half_the_cores(cores_32):
+    budget = ThreadBudget(24, 2, enabled=True, stream_threads=2)
+    assert budget.stream_threads == 1
+    assert budget.inference_threads == 8
+
+
+def test_apply_sizes_sessions_for_the_worker_role(cores_32):
+    budget = ThreadBudget(8, 2, enabled=False)
+    budget.apply(9)
+    assert budget.threads == 12
@@ -46,6 +46,33 @@ def calculate_iou(box1: List[int], box2: List[int]) -> float:
     return intersection / union if union > 0 else 0
 
 
+def calculate_iou_matrix(boxes1: np.ndarray, boxes2: np.ndarray) -> np.ndarray:
+    """
+    Pairwise IoU between two sets of bounding boxes
+
+    Args:
+        boxes1: Array of shape (n, 4) with [x1, y1, x2, y2] rows
+        boxes2: Array of shape (m, 4) with [x1, y1, x2, y2] rows
+
+    Returns:
+        Array of shape (n, m) with IoU scores
+    """
+    boxes1 = np.asarray(boxes1, dtype=np.float32).reshape(-1, 4)
+    boxes2 = np.asarray(boxes2, dtype=np.float32).reshape(-1, 4)
+
+    x1 = np.maximum(boxes1[:, None, 0], boxes2[None, :, 0])
+    y1 = np.maximum(boxes1[:, None, 1], boxes2[None, :, 1])
+    x2 = np.minimum(boxes1[:, None, 2], boxes2[None, :, 2])
+    y2 = np.minimum(boxes1[:, None, 3], boxes2[None, :, 3])
+    intersection = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+
+    area1 = (boxes1[:, 2] - boxes1[:, 0]) * (boxes1[:, 3] - boxes1[:, 1])
+    area2 = (boxes2[:, 2] - boxes2[:, 0]) * (boxes2[:, 3] - boxes2[:, 1])
+    union = area1[:, None] + area2[None, :] - intersection
+
+    return np.where(union > 0, intersection / np.maximum(union, 1e-9), 0.0)
+
+
 def is_point_in_polygon(point: Tuple[int, int], polygon: np.ndarray) -> bool:
     """
     Check if a point is inside a polygon
@@ -80,3 +107,54 @@ def calculate_polygon_center(polygon: np.ndarray) -> Tuple[int, int]:
         cx = int(np.mean(points[:, 0]))
         cy = int(np.mean(points[:, 1]))
     return (cx, cy)
+
+
+def merge_rectangles(rects: List[List[int]], max_count: int = 0) -> List[List[int]]:
+    """
+    Merge rectangles into disjoint bounding rectangles
+
+    Overlapping rectangles are replaced by their bounding rectangle until
+    none overlap; then, while more than max_count remain, the pair whose
+    bounding rectangle adds the least area is merged.
+
+    Args:
+        rects: Rectangles as [x1, y1, x2, y2]
+        max_count: Maximum number of rectangles returned, 0 for no limit
+
+    Returns:
+        List of [x1, y1, x2, y2] rectangles
+    """
+
+    def union(a, b):
+        return [min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])]
+
+    def area(r):
+        return (r[2] - r[0]) * (r[3] - r[1])
+
+    merged = [list(rect) for rect in rects]
+    changed = True
+    while changed:
+        changed = False
+        for i in range(len(merged)):
+            for j in range(i + 1, len(merged)):
+                a, b = merged[i], merged[j]
+                if a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]:
+                    merged[i] = union(a, b)
+                    del merged[j]
+                    changed = True
+                    break
+            if changed:
+                break
+
+    while max_count and len(merged) > max_count:
+        _, i, j = min(
+            (area(union(a, b)) - area(a) - area(b), i, j)
+            for i, a in enumerate(merged)
+            for j, b in enumerate(merged)
+            if i < j
+        )
+        merged[i] = union(merged[i], merged[j])
+        del merged[j]
+        # The merged rectangle may now overlap others
+        merged = merge_rectangles(merged)
+    return merged
@@ -1,6 +1,7 @@
 import cv2
 import numpy as np
 from typing import Tuple, List, Optional
+from config.constants import HEADLESS
 
 
 class ImageUtils:
@@ -36,6 +37,9 @@ class ImageUtils:
             name: User name (optional)
             sim: Similarity score
         """
+        if HEADLESS:
+            return
+
         xmin, ymin, xmax, ymax = box
 
         # Choose color: green for known, red for unknown
@@ -211,7 +215,9 @@ class ImageUtils:
 
     @staticmethod
     def create_montage(
-        images: List[np.ndarray], grid_size: Tuple[int, int] = (4, 4)
+        images: List[np.ndarray],
+        grid_size: Tuple[int, int] = (4, 4),
+        tile_size: Tuple[int, int] = (100, 100),
     ) -> np.ndarray:
         """
         Create a montage of multiple face images
@@ -219,30 +225,35 @@ class ImageUtils:
         Args:
             images: List of face images
             grid_size: Grid size for montage (rows, cols)
+            tile_size: Size of each cell (width, height)
 
         Returns:
             Montage image
         """
+        tile_width, tile_height = tile_size
         if not images:
-            return np.zeros((100, 100, 3), dtype=np.uint8)
+            return np.zeros((tile_height, tile_width, 3), dtype=np.uint8)
 
         rows, cols = grid_size
-        montage_height = rows * 100
-        montage_width = cols * 100
+        montage_height = rows * tile_height
+        montage_width = cols * tile_width
         montage = np.zeros((montage_height, montage_width, 3), dtype=np.uint8)
 
         for idx, image in enumerate(images):
             if idx >= rows * cols:
                 break
 
-            # Resize image
-            resized = cv2.resize(image, (100, 100))
+            # Resize image unless it already fits the cell
+            if image.shape[:2] != (tile_height, tile_width):
+                resized = cv2.resize(image, (tile_width, tile_height))
+            else:
+                resized = image
 
             # Calculate position
             row = idx // cols
             col = idx % cols
-            y1, y2 = row * 100, (row + 1) * 100
-            x1, x2 = col * 100, (col + 1) * 100
+            y1, y2 = row * tile_height, (row + 1) * tile_height
+            x1, x2 = col * tile_width, (col + 1) * tile_width
 
             montage[y1:y2, x1:x2] = resized
 
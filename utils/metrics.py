@@ -0,0 +1,203 @@
+import bisect
+import re
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing import RawArray
+
+import numpy as np
+from config.constants import METRICS_HOST, METRICS_PORT
+
+
+class StageMetrics:
+    """
+    Per-source, per-stage latency histograms in shared memory
+
+    Every source (a camera process or the data sender) owns one row of a
+    shared array and is the only process writing it, so recording needs no
+    cross-process locking. The main process reads all rows to render them
+    in the Prometheus text format.
+    """
+
+    STAGES = (
+        "frame_wait",
+        "frame_age",
+        "gallery_sync",
+        "motion_gate",
+        "analyze",
+        "detect",
+        "quality",
+        "embed",
+        "match",
+        "regions",
+        "track_event",
+        "image_write",
+        "display",
+        "frame_total",
+        "api_fetch",
+        "api_post",
+        "api_ack",
+    )
+    BUCKETS = (
+        0.0005,
+        0.001,
+        0.0025,
+        0.005,
+        0.01,
+        0.025,
+        0.05,
+        0.1,
+        0.25,
+        0.5,
+        1.0,
+        2.5,
+        5.0,
+        10.0,
+    )
+
+    def __init__(self, sources):
+        self.sources = list(sources)
+        # Per stage: one count per bucket, the +Inf bucket, sum and count
+        self.width = len(self.BUCKETS) + 3
+        self.raw = RawArray("d", len(self.sources) * len(self.STAGES) * self.width)
+        self._table = None
+
+    @property
+    def table(self):
+        if self._table is None:
+            self._table = np.frombuffer(self.raw, dtype=np.float64).reshape(
+                len(self.sources), len(self.STAGES), self.width
+            )
+        return self._table
+
+    def recorder(self, source):
+        """Span recorder writing the row of one source"""
+        return StageRecorder(self, self.sources.index(source))
+
+    @staticmethod
+    def _label(source):
+        ip_match = re.search(r"(\d+\.\d+\.\d+\.\d+)", source)
+        label = ip_match.group(1) if ip_match else source
+        return label.replace("\\", "\\\\").replace('"', '\\"')
+
+    def render(self):
+        """All non-empty histograms in the Prometheus text exposition format"""
+        name = "face_tracking_stage_seconds"
+        lines = [
+            f"# HELP {name} Time spent in each pipeline stage",
+            f"# TYPE {name} histogram",
+        ]
+        table = self.table.copy()
+        bounds = [str(bound) for bound in self.BUCKETS] + ["+Inf"]
+        for source_index, source in enumerate(self.sources):
+            for stage_index, stage in enumerate(self.STAGES):
+                counts = table[source_index, stage_index]
+                if not counts[-1]:
+                    continue
+                labels = f'source="{self._label(source)}",stage="{stage}"'
+                cumulative = np.cumsum(counts[: len(bounds)])
+                for bound, count in zip(bounds, cumulative):
+                    lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count:.0f}')
+                lines.append(f"{name}_sum{{{labels}}} {counts[-2]:.6f}")
+                lines.append(f"{name}_count{{{labels}}} {counts[-1]:.0f}")
+        return "\n".join(lines) + "\n"
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_table"] = None
+        return state
+
+
+class StageRecorder:
+    """Records stage durations into one source's histograms"""
+
+    def __init__(self, metrics, source_index):
+        self.metrics = metrics
+        self.source_index = source_index
+        self.stage_index = {stage: i for i, stage in enumerate(metrics.STAGES)}
+        self.buckets = metrics.BUCKETS
+        self.row = None
+        # Pool threads of one process may share a recorder
+        self.lock = threading.Lock()
+
+    def observe(self, stage, seconds):
+        if self.row is None:
+            self.row = self.metrics.table[self.source_index]
+        counts = self.row[self.stage_index[stage]]
+        bucket = bisect.bisect_left(self.buckets, seconds)
+        with self.lock:
+            counts[bucket] += 1
+            counts[-2] += seconds
+            counts[-1] += 1
+
+    @contextmanager
+    def span(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.update(row=None, lock=None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+
+class NullRecorder:
+    """Recorder used when metrics are disabled"""
+
+    def observe(self, stage, seconds):
+        pass
+
+    def span(self, stage):
+        return nullcontext()
+
+
+class MetricsServer:
+    """Local HTTP endpoint serving /metrics from the main process"""
+
+    def __init__(self, metrics, host=METRICS_HOST, port=METRICS_PORT):
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+
+    def start(self):
+        """Serve in a daemon thread; returns the server, or None if the bind fails"""
+        metrics = self.metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        try:
+            server = ThreadingHTTPServer((self.host, self.port), Handler)
+        except OSError as e:
+            # A taken port must not keep the cameras from starting
+            print(
+                f"Metrics endpoint disabled, cannot bind {self.host}:{self.port}: {e}"
+            )
+            return None
+        server.daemon_threads = True
+        thread = threading.Thread(
+            target=server.serve_forever, name="metrics-server", daemon=True
+        )
+        thread.start()
+        print(f"Metrics available at http://{self.host}:{server.server_port}/metrics")
+        return server
@@ -1,6 +1,4 @@
 import signal
-from config.settings import TRACK_TEMP_FILE, TRACKING_DATA_FILE
-from data.json_manager import JSONManager
 
 
 class SignalHandler:
@@ -16,14 +14,3 @@ class SignalHandler:
         """Handle shutdown signals"""
         print("Signal received, stopping processes...")
         self.stop_event.set()
-
-    @staticmethod
-    def clear_cache_and_data():
-        """Clear track data files"""
-        try:
-            for file_path in [TRACK_TEMP_FILE, TRACKING_DATA_FILE]:
-                if file_path.exists():
-                    JSONManager.safe_write_json(file_path, [])
-            print("Data cleared.")
-        except Exception as e:
-            print(f"Error clearing cache and data: {e}")
@@ -0,0 +1,149 @@
+import os
+from config.constants import (
+    THREAD_BUDGET_ENABLED,
+    THREAD_BUDGET_AFFINITY,
+    THREAD_BUDGET_CORES,
+    THREAD_BUDGET_STREAM_THREADS,
+)
+
+# Thread pool sizes read by the BLAS / OpenMP runtimes when they load
+BLAS_ENV_VARS = (
+    "OMP_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "BLIS_NUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+)
+
+
+class ThreadBudget:
+    """
+    Split the host's cores between the processes that run models
+
+    Left alone, every ONNX Runtime session, BLAS call and OpenCV function
+    sizes its thread pool to all cores, so N worker processes run N times
+    more threads than cores and spend their time context switching. The
+    budget gives each worker a fixed number of threads: the intra-op pool of
+    its sessions (inter-op parallelism is off, and idle threads do not
+    spin), its BLAS and OpenCV pools and, optionally, a pinned slice of
+    cores of that size.
+
+    The split follows what each role runs. Without inference workers the
+    stream workers run the models and share the cores equally. With them,
+    stream workers only decode, match and encode, so each keeps
+    `stream_threads` (at most half the cores between them) and the
+    inference workers split the rest. Slots 0 .. stream_workers - 1 are the
+    stream workers, the inference workers follow.
+
+    BLAS pools are sized when numpy loads, so export_env() must run before
+    the first numpy import; apply() then pins and resizes what it can in the
+    worker itself (BLAS through threadpoolctl, when installed).
+    """
+
+    def __init__(
+        self,
+        stream_workers,
+        inference_workers=0,
+        cores=THREAD_BUDGET_CORES,
+        enabled=THREAD_BUDGET_ENABLED,
+        affinity=THREAD_BUDGET_AFFINITY,
+        stream_threads=THREAD_BUDGET_STREAM_THREADS,
+    ):
+        self.cpus = sorted(os.sched_getaffinity(0))
+        if cores:
+            self.cpus = self.cpus[:cores]
+        self.stream_workers = max(1, stream_workers)
+        self.inference_workers = max(0, inference_workers)
+        self.enabled = enabled
+        self.affinity = affinity
+        # Slot of the calling process, set by apply()
+        self.slot = None
+
+        cores = len(self.cpus)
+        if self.inference_workers:
+            self.stream_cores = min(self.stream_workers * stream_threads, cores // 2)
+        else:
+            self.stream_cores = cores
+        self.stream_threads = max(1, self.stream_cores // self.stream_workers)
+        self.inference_threads = max(
+            1, (cores - self.stream_cores) // max(1, self.inference_workers)
+        )
+
+    def threads_for(self, slot):
+        """Threads of the worker in a slot; None is a stream worker"""
+        if slot is None or slot < self.stream_workers:
+            return self.stream_threads
+        return self.inference_threads
+
+    @property
+    def threads(self):
+        """Threads of the calling process"""
+        return self.threads_for(self.slot)
+
+    def cpu_set(self, slot):
+        """Cores of one worker; slots beyond their role's cores wrap around"""
+        if slot < self.stream_workers:
+            first, size = 0, self.stream_cores
+            start = slot * self.stream_threads
+        else:
+            first, size = self.stream_cores, len(self.cpus) - self.stream_cores
+            start = (slot - self.stream_workers) * self.inference_threads
+        if size <= 0:
+            first, size = 0, len(self.cpus)
+        threads = self.threads_for(slot)
+        return {
+            self.cpus[first + (start + i) % size] for i in range(min(threads, size))
+        }
+
+    def export_env(self):
+        """Size BLAS / OpenMP pools of this process and its children"""
+        if not self.enabled:
+            return
+        # The gallery GEMM runs in the stream workers
+        for name in BLAS_ENV_VARS:
+            os.environ.setdefault(name, str(self.stream_threads))
+
+    def apply(self, slot):
+        """Pin the calling worker process and size its native thread pools"""
+        self.slot = slot
+        if not self.enabled:
+            return
+        if self.affinity:
+            os.sched_setaffinity(0, self.cpu_set(slot))
+
+        import cv2
+
+        cv2.setNumThreads(self.threads)
+        try:
+            from threadpoolctl import threadpool_limits
+        except ImportError:
+            pass  # BLAS keeps the size exported before numpy loaded
+        else:
+            threadpool_limits(self.threads)
+
+    def session_options(self, options):
+        """Apply the calling worker's budget to onnxruntime SessionOptions"""
+        if not self.enabled:
+            return options
+        import onnxruntime
+
+        options.intra_op_num_threads = self.threads
+        options.inter_op_num_threads = 1
+        options.execution_mode = onnxruntime.ExecutionMode.ORT_SEQUENTIAL
+        # Idle pool threads sleep instead of spinning on the shared cores
+        options.add_session_config_entry("session.intra_op.allow_spinning", "0")
+        return options
+
+    def describe(self):
+        if not self.enabled:
+            return "Thread budget off"
+        pinned = ", pinned" if self.affinity else ""
+        split = (
+            f"{self.stream_workers} stream workers, {self.stream_threads} threads each"
+        )
+        if self.inference_workers:
+            split += (
+                f"; {self.inference_workers} inference workers, "
+                f"{self.inference_threads} threads each"
+            )
+        return f"Thread budget: {len(self.cpus)} cores over {split}{pinned}"